@@ -1,32 +1,53 @@
 import os
-from flask import Flask, request, jsonify, send_from_directory, session, redirect, url_for
+from flask import Flask, request, jsonify, send_from_directory, session, redirect, url_for, Response, stream_with_context
 from flask_cors import CORS
 from flask_dance.contrib.google import make_google_blueprint, google
 from flask_session import Session
 from werkzeug.utils import secure_filename
-import fitz  # PyMuPDF
-from langchain_openai import ChatOpenAI
-from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.chains import ConversationalRetrievalChain
-from langchain.chains.summarize import load_summarize_chain
-from langchain.docstore.document import Document
 from dotenv import load_dotenv
 import re
 import uuid
 import hashlib
 from datetime import datetime, timedelta
 import json
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-import pandas as pd
-import PyPDF2
 from functools import wraps
-import docx
 import time
+import threading
+from collections import OrderedDict
+from rag.hybrid_search import BM25Index, reciprocal_rank_fusion, reciprocal_rank_scores
+from rag.context_packer import count_tokens, pack_context, render_context
+from rag.user_index import UserIndex
+from rag.embedding_store import EmbeddingStore, embeddings_namespace
+from rag.document_index import (
+    build_document_index,
+    save_document_index,
+    load_document_index,
+    load_document_vectors,
+    delete_document_index,
+    search_by_vectors,
+)
+from utils.upload_cache import UploadCache, content_hash
+from llm.map_reduce import split_into_groups, map_groups
+from llm.response_cache import LLMResponseCache
+from llm.answer_cache import SemanticAnswerCache
+from utils.text_extraction import extract_document_chunks, extract_document_text, locate_chunk_pages
+from utils.benefit_rules import (
+    NOT_SPECIFIED,
+    extract_benefit_fields,
+    retrieve_field_chunks,
+    field_excerpts,
+    build_fallback_prompt,
+    parse_fallback_response,
+    locate_sources,
+)
+from privacy.phi_sanitizer import sanitize_text
+from concurrent.futures import ThreadPoolExecutor
+from utils.job_queue import JobQueue
+from utils.user_store import UserDataStore, document_key
+from utils.shared_state import create_state_backend
+from utils.tracing import init_tracing, metrics, stage, record_stage, record_llm_call
+from utils.lazy import Lazy
+from utils.process_pool import new_process_pool
 os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1' 
 
 # Load environment variables
@@ -70,20 +91,123 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
-# Initialize OpenAI and embeddings
-llm = ChatOpenAI(
-    model_name="gpt-3.5-turbo",
-    temperature=0,
+# Initialize OpenAI and embeddings. LLM_BACKEND=fake swaps in deterministic
+# offline stand-ins (see llm/fakes.py) for load testing without API calls.
+if os.getenv('LLM_BACKEND', 'openai') == 'fake':
+    from llm.fakes import FakeChatModel, FakeEmbeddings
+    llm = FakeChatModel(latency=float(os.getenv('FAKE_LLM_LATENCY_MS', '0')) / 1000)
+    embeddings_client = FakeEmbeddings(
+        dim=int(os.getenv('FAKE_EMBEDDING_DIM', '256')),
+        latency=float(os.getenv('FAKE_EMBEDDING_LATENCY_MS', '0')) / 1000
+    )
+    embedding_namespace = embeddings_namespace(embeddings_client)
+    lazy_clients = []
+else:
+    # langchain_openai takes over a second to import, so the clients are only
+    # built on the first request that needs them (or by warm_up())
+    def create_chat_model():
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0)
+
+    def create_embeddings():
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings(model=OPENAI_EMBEDDING_MODEL)
+
+    OPENAI_EMBEDDING_MODEL = os.getenv('OPENAI_EMBEDDING_MODEL', 'text-embedding-ada-002')
+    llm = Lazy(create_chat_model)
+    embeddings_client = Lazy(create_embeddings)
+    # Built by warm_up(), along with the `embeddings` wrapping the client below
+    lazy_clients = [llm, embeddings_client]
+    # Same namespace embeddings_namespace() gives the built client, without building it
+    embedding_namespace = f"OpenAIEmbeddings:{OPENAI_EMBEDDING_MODEL}:"
+
+# Chunk vectors are shared across users and documents by content hash, so
+# boilerplate sections are embedded once; only misses reach the model
+embedding_store = EmbeddingStore() if os.getenv('EMBEDDING_STORE_ENABLED', '1') == '1' else None
+
+def build_embeddings():
+    """The client every embedding goes through: counted for /metrics and, with the
+    embedding store, looked up there by chunk content first"""
+    # Imported on first use; both wrappers subclass langchain_core's Embeddings, which is slow to import
+    from utils.llm_tracing import TracedEmbeddings
+    wrapped = TracedEmbeddings(embeddings_client)
+    if embedding_store is not None:
+        from rag.cached_embeddings import CachedEmbeddings
+        wrapped = CachedEmbeddings(wrapped, embedding_store, namespace=embedding_namespace)
+    return wrapped
+
+# FAISS needs the built object (embeddings.get()); everything else calls through the Lazy
+embeddings = Lazy(build_embeddings)
+lazy_clients.append(embeddings)
+
+# Cache of LLM responses for repeated prompts (same plan summarized or compared again).
+# LLM_CACHE_DISABLED_SITES takes a comma-separated list of call sites that bypass it.
+llm_cache = LLMResponseCache(
+    os.getenv('LLM_CACHE_PATH', os.path.join(os.getcwd(), 'cache', 'llm_responses.sqlite3')),
+    max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', '10000')),
+    ttl_seconds=int(os.getenv('LLM_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+) if os.getenv('LLM_CACHE_ENABLED', '1') == '1' else None
+LLM_CACHE_DISABLED_SITES = {site.strip() for site in os.getenv('LLM_CACHE_DISABLED_SITES', '').split(',') if site.strip()}
+
+# /ask answers per document content (see answer_cache_key()),
+# reused for questions at least SEMANTIC_CACHE_THRESHOLD similar to one already answered
+answer_cache = SemanticAnswerCache(
+    os.getenv('SEMANTIC_CACHE_PATH', os.path.join(os.getcwd(), 'cache', 'answers.sqlite3')),
+    threshold=float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.95')),
+    max_entries=int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', '20000')),
+    max_entries_per_document=int(os.getenv('SEMANTIC_CACHE_MAX_PER_DOCUMENT', '500')),
+    ttl_seconds=int(os.getenv('SEMANTIC_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+) if os.getenv('SEMANTIC_CACHE_ENABLED', '1') == '1' else None
+
+# State every worker process must agree on (documents, conversations, upload jobs).
+# The default SQLite file is shared by all workers on this host; see utils/shared_state.py.
+state_backend = create_state_backend(
+    os.getenv('STATE_BACKEND_URL', 'sqlite:///' + os.path.join(os.getcwd(), 'cache', 'state.sqlite3'))
+)
+
+# Per-user documents and conversations. Recently used documents stay in memory
+# up to USER_DATA_MEMORY_BUDGET_MB; the rest are reloaded from the state backend on access.
+user_store = UserDataStore(
+    state_backend,
+    memory_budget_bytes=int(float(os.getenv('USER_DATA_MEMORY_BUDGET_MB', '256')) * 1024 * 1024)
 )
-embeddings = OpenAIEmbeddings()
 
-# Store document vectors and conversations per user
-user_data = {}
+# Processing results of previously seen uploads, shared across users by content hash
+upload_cache = UploadCache(max_entries=int(os.getenv('UPLOAD_CACHE_MAX_ENTRIES', '128')))
+
+def invoke_llm(prompt, site, use_cache=True):
+    """llm.invoke with the response cache in front of it.
+
+    `site` names the call site so it can be excluded through LLM_CACHE_DISABLED_SITES;
+    use_cache=False skips the cache for a single call. Calls and token usage are
+    recorded per site for /metrics.
+    """
+    cacheable = llm_cache is not None and use_cache and site not in LLM_CACHE_DISABLED_SITES
+    if cacheable:
+        key = LLMResponseCache.make_key(getattr(llm, 'model_name', type(llm).__name__), getattr(llm, 'temperature', None), prompt)
+        content = llm_cache.get(key)
+        if content is not None:
+            from langchain_core.messages import AIMessage
+            record_llm_call(site, cached=True)
+            return AIMessage(content=content)
+    
+    # Imported on first use; langchain_core is slow to import
+    from utils.llm_tracing import TokenUsageHandler
+    usage = TokenUsageHandler()
+    with stage(f"llm_{site}"):
+        response = llm.invoke(prompt, config={'callbacks': [usage]})
+    record_llm_call(site, usage.prompt_tokens, usage.completion_tokens)
+    if cacheable:
+        llm_cache.put(key, str(response.content) if hasattr(response, 'content') else str(response))
+    return response
+
+init_tracing(app)
 
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if not google.authorized:
+        # LOGIN_DISABLED is only ever set in code, e.g. by benchmarks/load_test.py
+        if not app.config.get('LOGIN_DISABLED') and not google.authorized:
             return jsonify({'error': 'Not authenticated'}), 401
         return f(*args, **kwargs)
     return decorated_function
@@ -109,14 +233,6 @@ def google_authorized():
         session['user_name'] = user_info['name']
         session['user_email'] = user_info['email']
         session.permanent = True
-        
-        # Initialize user data if needed
-        if user_info['email'] not in user_data:
-            user_data[user_info['email']] = {
-                'document_vectors': {},
-                'conversations': [],
-                'summaries': {}
-            }
     
     return redirect("http://localhost:3000")  # Redirect to frontend
 
@@ -143,87 +259,75 @@ def get_user_id():
         session['user_id'] = str(datetime.now().timestamp())  # Create new user ID
     return session['user_id']
 
-def init_user_data(user_id):
-    """Initialize user data structure if not exists"""
-    if user_id not in user_data:
-        user_data[user_id] = {
-            'document_vectors': {},
-            'conversations': [],
-            'summaries': {}
-        }
-
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def sanitize_text(text):
-    """Enhanced HIPAA-compliant PII/PHI sanitization"""
-    patterns = {
-        'ssn': r'\b\d{3}[-.]?\d{2}[-.]?\d{4}\b',
-        'email': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-        'phone': r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b',
-        'dob': r'\b(0[1-9]|1[0-2])[-/](0[1-9]|[12]\d|3[01])[-/](\d{2}|\d{4})\b',
-        'name': r'\b(?:Mr\.|Mrs\.|Ms\.|Dr\.|Prof\.) [A-Z][a-z]+ [A-Z][a-z]+\b',
-        'address': r'\b\d{1,5} [A-Za-z\s]{1,30}(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd)\b',
-        'mrn': r'\b(?:MRN|Medical Record Number):\s*\d{6,}\b'
-    }
-    
-    for phi_type, pattern in patterns.items():
-        text = re.sub(pattern, f'[{phi_type.upper()}]', text)
-    
-    return text
+# Fields behind extract_benefits and the compare-plans table
+EXTRACT_BENEFIT_FIELDS = [
+    'individual_deductible', 'family_deductible', 'individual_out_of_pocket_max', 'family_out_of_pocket_max',
+    'primary_care_copay', 'specialist_copay', 'emergency_room_copay', 'urgent_care_copay',
+    'prescription_coverage', 'mental_health_coverage',
+]
+
+def extract_benefit_values(text, fields, site, chunks=None, bm25=None):
+    """Benefit fields of a document and the chunks they come from: ({field: value}, {field: [chunk ids]}).
+
+    The SBC rules read what they can. The LLM is asked only for the rest, and only
+    sees the chunks BM25 retrieves for each missing field's query terms, so the
+    prompt does not grow with the document. Pass the document's chunks and BM25
+    index to reuse them and to get the sources; without chunks, the text is only
+    chunked when the LLM is needed and no sources are returned.
+    """
+    with stage('benefit_rules'):
+        values = extract_benefit_fields(text, fields)
+    missing = [field for field in fields if field not in values]
+    if not missing and chunks is None:
+        return values, {}
+
+    traced = chunks is not None
+    if chunks is None:
+        chunks = chunk_text(text)
+    with stage('field_retrieval'):
+        if bm25 is None:
+            bm25 = BM25Index(chunks)
+        candidates = retrieve_field_chunks(bm25, fields)
+    # Fields the document never mentions are not worth asking about
+    missing = [field for field in missing if candidates[field]]
+    if missing:
+        excerpts = field_excerpts(chunks, {field: candidates[field] for field in missing})
+        response = invoke_llm(build_fallback_prompt(missing, excerpts), site=site)
+        values.update(parse_fallback_response(str(response.content), missing))
+    if not traced:
+        return values, {}
+    return values, {field: locate_sources(value, candidates[field], chunks) for field, value in values.items()}
 
 def extract_benefits(text):
     """Extract key insurance benefits and format as a table"""
-    prompt = """Extract the following insurance benefits from the text and format as a JSON object with this exact structure:
-    {
+    values, _ = extract_benefit_values(text, EXTRACT_BENEFIT_FIELDS, site='extract_benefits')
+    value = lambda field: values.get(field, NOT_SPECIFIED)
+    return {
         "deductible": {
-            "individual": "amount or 'Not specified'",
-            "family": "amount or 'Not specified'"
+            "individual": value('individual_deductible'),
+            "family": value('family_deductible')
         },
         "out-of-pocket maximum": {
-            "individual": "amount or 'Not specified'",
-            "family": "amount or 'Not specified'"
+            "individual": value('individual_out_of_pocket_max'),
+            "family": value('family_out_of_pocket_max')
         },
-        "primary care copay": "amount or 'Not specified'",
-        "specialist copay": "amount or 'Not specified'",
-        "emergency room copay": "amount or 'Not specified'",
-        "urgent care copay": "amount or 'Not specified'",
-        "prescription drug coverage": "description or 'Not specified'",
-        "mental health copay": "amount or 'Not specified'"
+        "primary care copay": value('primary_care_copay'),
+        "specialist copay": value('specialist_copay'),
+        "emergency room copay": value('emergency_room_copay'),
+        "urgent care copay": value('urgent_care_copay'),
+        "prescription drug coverage": value('prescription_coverage'),
+        "mental health copay": value('mental_health_coverage')
     }
-    
-    Extract exact amounts when available. Include dollar signs and any relevant notes about limitations."""
-    
-    response = llm.invoke(f"{prompt}\n\nText: {text}")
-    try:
-        benefits = json.loads(response.content)
-    except:
-        # Fallback default structure if parsing fails
-        benefits = {
-            "deductible": {
-                "individual": "Not specified",
-                "family": "Not specified"
-            },
-            "out-of-pocket maximum": {
-                "individual": "Not specified",
-                "family": "Not specified"
-            },
-            "primary care copay": "Not specified",
-            "specialist copay": "Not specified",
-            "emergency room copay": "Not specified",
-            "urgent care copay": "Not specified",
-            "prescription drug coverage": "Not specified",
-            "mental health copay": "Not specified"
-        }
-    
-    return benefits
 
 def generate_suggested_questions(text):
     """Generate relevant questions based on the document content"""
     prompt = """Based on this insurance document, generate 5 common questions that a person might ask. 
     Return them as a JSON array of strings. Make them specific to the actual content."""
     
-    response = llm.invoke(f"{prompt}\n\nText: {text}")
+    response = invoke_llm(f"{prompt}\n\nText: {text}", site='suggested_questions')
     try:
         questions = json.loads(response.content)
     except:
@@ -235,46 +339,154 @@ def generate_suggested_questions(text):
     
     return questions
 
-def process_pdf(file_path):
-    """Extract text from PDF file"""
-    try:
-        text = ""
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n\n"
-        return text
-    except Exception as e:
-        print(f"Error processing PDF: {str(e)}")
-        raise
-
-def process_docx(file_path):
-    """Extract text from DOCX file"""
-    try:
-        doc = docx.Document(file_path)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    text += cell.text + " "
-                text += "\n"
-        return text
-    except Exception as e:
-        print(f"Error processing DOCX: {str(e)}")
-        raise
-
 def chunk_text(text, chunk_size=500, chunk_overlap=50):
     """Split text into smaller chunks"""
+    # Imported on first use; langchain's text splitter is slow to import
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap
     )
     return text_splitter.split_text(text)
 
+def index_document(user_id, filename, chunks, vectors=None, pages=None):
+    """Embed a document's chunks once and keep the index in memory and on disk"""
+    if vectors is None:
+        vectors = embeddings.embed_documents(chunks)
+    save_document_index(user_id, filename, chunks, vectors, pages)
+    return build_document_index(chunks, vectors, filename, embeddings.get(), pages)
+
+def get_document_index(user_id, filename):
+    """Return the document's vector index, loading or building it on first use"""
+    doc_data = user_store.get_document(user_id, filename)
+    if doc_data.get('index') is None:
+        index = load_document_index(user_id, filename, embeddings.get())
+        if index is None:
+            index = index_document(user_id, filename, doc_data['chunks'], pages=doc_data.get('chunk_pages'))
+        user_store.update_document(user_id, filename, index=index)
+        return index
+    return doc_data['index']
+
+# Retrieval for /ask: 'hybrid' fuses BM25 and vector rankings, 'vector' and 'lexical' use one.
+# In hybrid mode a confident BM25 result is returned without embedding the question.
+RETRIEVAL_MODES = ('hybrid', 'vector', 'lexical')
+RETRIEVAL_MODE = os.getenv('RETRIEVAL_MODE', 'hybrid')
+RETRIEVAL_CANDIDATES = int(os.getenv('RETRIEVAL_CANDIDATES', '10'))
+LEXICAL_FAST_PATH_CONFIDENCE = float(os.getenv('LEXICAL_FAST_PATH_CONFIDENCE', '0.9'))  # above 1 disables it
+# The fast path needs BM25 to cover the question within this many top chunks
+LEXICAL_FAST_PATH_DEPTH = 3
+# Ranked chunks handed to pack_context(), which keeps as many as its token budget allows
+ASK_CONTEXT_CANDIDATES = int(os.getenv('ASK_CONTEXT_CANDIDATES', '8'))
+
+def get_bm25_index(user_id, filename, doc_data):
+    """Return the document's BM25 index, building it from the chunks on first use"""
+    if doc_data.get('bm25') is None:
+        bm25 = BM25Index(doc_data['chunks'])
+        user_store.update_document(user_id, filename, bm25=bm25)
+        return bm25
+    return doc_data['bm25']
+
+def chunk_as_document(doc_data, filename, chunk_id, relevance=None):
+    from langchain.docstore.document import Document
+    metadata = {'source': filename, 'chunk_id': chunk_id}
+    if relevance is not None:
+        metadata['relevance'] = relevance
+    pages = doc_data.get('chunk_pages')
+    if pages:
+        metadata['page'] = pages[chunk_id]
+    return Document(page_content=doc_data['chunks'][chunk_id], metadata=metadata)
+
+def retrieve_lexical(user_id, filename, doc_data, question, k, mode):
+    """BM25 step of retrieval: (candidates, final chunks or None if a vector search is still needed)"""
+    if mode == 'vector':
+        return [], None
+    with stage('bm25'):
+        bm25 = get_bm25_index(user_id, filename, doc_data)
+        lexical = bm25.search(question, k=RETRIEVAL_CANDIDATES)
+    fast_path = (mode == 'hybrid' and lexical
+                 and bm25.confidence(question, lexical[:LEXICAL_FAST_PATH_DEPTH]) >= LEXICAL_FAST_PATH_CONFIDENCE)
+    if mode == 'lexical' or fast_path:
+        metrics.inc('coveredai_retrieval_total', mode='lexical_fast_path' if fast_path else 'lexical')
+        top_score = lexical[0][1] if lexical else 0.0
+        return lexical, [chunk_as_document(doc_data, filename, chunk_id, score / top_score if top_score else 1.0)
+                         for chunk_id, score in lexical[:k]]
+    return lexical, None
+
+def retrieve_dense(user_id, filename, doc_data, lexical, query_vector, k, mode):
+    """Vector step of retrieval, fused with the BM25 candidates from retrieve_lexical(): top-k
+    chunks as Documents with source/page metadata and a relevance relative to the best chunk (1.0)"""
+    with stage('load_index'):
+        vectorstore = get_document_index(user_id, filename)
+    with stage('vector_search'):
+        candidates = k if mode == 'vector' else RETRIEVAL_CANDIDATES
+        vector_results = vectorstore.similarity_search_by_vector(query_vector, k=candidates)
+    return fuse_retrieval(doc_data, filename, lexical, vector_results, k, mode)
+
+def retrieve_or_cached(user_id, filename, doc_data, question, cache_document, mode):
+    """(cached answer, candidates, question vector) for /ask and /ask-stream.
+
+    An exact repeat is answered before any retrieval. Otherwise the question is
+    only embedded when the BM25 fast path is not confident, and that one vector
+    serves both the semantic cache lookup and the vector search (and is stored
+    with the answer). Candidates are None when the answer came from the cache.
+    """
+    if answer_cache is not None:
+        with stage('answer_cache'):
+            cached = answer_cache.lookup_exact(cache_document, mode, question)
+        if cached is not None:
+            return cached, None, None
+    
+    lexical, chunks = retrieve_lexical(user_id, filename, doc_data, question, ASK_CONTEXT_CANDIDATES, mode)
+    question_vector = None
+    if chunks is None:
+        with stage('embed_question'):
+            question_vector = embeddings.embed_query(question)
+    
+    if answer_cache is not None:
+        with stage('answer_cache'):
+            cached = answer_cache.lookup_similar(cache_document, mode, question_vector)
+        if cached is not None:
+            return cached, None, question_vector
+    
+    if chunks is None:
+        chunks = retrieve_dense(user_id, filename, doc_data, lexical, question_vector, ASK_CONTEXT_CANDIDATES, mode)
+    return None, chunks, question_vector
+
+def fuse_retrieval(doc_data, filename, lexical, vector_results, k, mode):
+    metrics.inc('coveredai_retrieval_total', mode=mode)
+    if mode == 'vector':
+        from langchain.docstore.document import Document
+        # Scores by rank; the stored Documents are copied rather than annotated
+        scores = reciprocal_rank_scores([[doc.metadata['chunk_id'] for doc in vector_results]])
+        top_score = max(scores.values(), default=1.0)
+        return [Document(page_content=doc.page_content,
+                         metadata={**doc.metadata, 'relevance': scores[doc.metadata['chunk_id']] / top_score})
+                for doc in vector_results[:k]]
+    
+    scores = reciprocal_rank_scores([
+        [doc.metadata['chunk_id'] for doc in vector_results],
+        [chunk_id for chunk_id, _ in lexical]
+    ])
+    fused = sorted(scores, key=lambda chunk_id: (-scores[chunk_id], chunk_id))[:k]
+    top_score = scores[fused[0]] if fused else 1.0
+    return [chunk_as_document(doc_data, filename, chunk_id, scores[chunk_id] / top_score) for chunk_id in fused]
+
+def pack_chunks(candidates):
+    """The retrieved candidates that fit the context token budget (see rag/context_packer.py)"""
+    with stage('pack_context'):
+        context = pack_context(candidates)
+    metrics.inc('coveredai_context_tokens_total', context.tokens)
+    metrics.inc('coveredai_context_chunks_total', len(context.documents))
+    if context.duplicates:
+        metrics.inc('coveredai_context_duplicates_total', context.duplicates)
+    return context
+
 def generate_pdf_report(conversation, filename):
     """Generate a PDF report of the conversation"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    
     report_path = os.path.join(app.config['UPLOAD_FOLDER'], f'report_{filename}.pdf')
     doc = SimpleDocTemplate(report_path, pagesize=letter)
     styles = getSampleStyleSheet()
@@ -359,7 +571,7 @@ def validate_insurance_document(text):
         Text to analyze:
         """
         
-        response = llm.invoke(validation_prompt + "\n\n" + text[:2000])  # Use first 2000 chars for better assessment
+        response = invoke_llm(validation_prompt + "\n\n" + text[:2000], site='validation')  # Use first 2000 chars for better assessment
         result = json.loads(str(response.content))
         
         is_insurance = result.get("is_insurance", False)
@@ -388,54 +600,298 @@ def validate_insurance_document(text):
         print(f"Error in document validation: {str(e)}")
         return False, "Error during validation"
 
+# Key insurance terms and phrases to look for
+INSURANCE_INDICATORS = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    r'\b(health|medical)\s+insurance\b',
+    r'\b(plan|policy|coverage)\s+(summary|details|information)\b',
+    r'\bbenefits?\s+(summary|overview|details)\b',
+    r'\b(in|out)\s*-?\s*of\s*-?\s*network\b',
+    r'\bdeductible\b',
+    r'\bcopay(ment)?\b',
+    r'\bcoinsurance\b',
+    r'\b(covered|eligible)\s+services\b',
+    r'\b(prescription|rx)\s+drugs?\b',
+    r'\b(prior\s+)?authorization\b',
+    r'\bpreventive\s+care\b',
+    r'\bemergency\s+(room|services)\b',
+    r'\bout\s*-?\s*of\s*-?\s*pocket\s+(maximum|limit)\b',
+    r'\bpremium\b',
+    r'\bprovider\s+network\b',
+    r'\bclaims?\b',
+    r'\benrollment\b',
+    r'\beligibility\b'
+]]
+
+# Phrases the opening of a Summary of Benefits and Coverage carries. Regulations and
+# reports about health plans match many generic indicators too, so a local accept needs these
+SBC_INDICATORS = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    r'\bsummary\s+of\s+benefits\s+(and|&)\s+coverage\b',
+    r'\bcoverage\s+period\b',
+    r'\bdeductible\b'
+]]
+
+def insurance_indicator_score(text, indicators=INSURANCE_INDICATORS):
+    """
+    Count how many insurance indicators appear in the first 2000 characters.
+    Returns (score, found_terms).
+    """
+    # Take first 2000 characters for analysis to avoid processing entire large documents
+    sample_text = text[:2000].lower()
+    found_terms = {indicator.pattern for indicator in indicators if indicator.search(sample_text)}
+    return len(found_terms), found_terms
+
 def is_insurance_document(text, min_confidence=3):
     """
     Validate if a document is an insurance document by checking for key insurance-related terms and patterns.
     Returns True if the document appears to be an insurance document, False otherwise.
     """
-    # Key insurance terms and phrases to look for
-    insurance_indicators = [
-        r'\b(health|medical)\s+insurance\b',
-        r'\b(plan|policy|coverage)\s+(summary|details|information)\b',
-        r'\bbenefits?\s+(summary|overview|details)\b',
-        r'\b(in|out)\s*-?\s*of\s*-?\s*network\b',
-        r'\bdeductible\b',
-        r'\bcopay(ment)?\b',
-        r'\bcoinsurance\b',
-        r'\b(covered|eligible)\s+services\b',
-        r'\b(prescription|rx)\s+drugs?\b',
-        r'\b(prior\s+)?authorization\b',
-        r'\bpreventive\s+care\b',
-        r'\bemergency\s+(room|services)\b',
-        r'\bout\s*-?\s*of\s*-?\s*pocket\s+(maximum|limit)\b',
-        r'\bpremium\b',
-        r'\bprovider\s+network\b',
-        r'\bclaims?\b',
-        r'\benrollment\b',
-        r'\beligibility\b'
-    ]
-    
-    # Count how many insurance indicators are found
-    confidence_score = 0
-    found_terms = set()
-    
-    # Take first 2000 characters for analysis to avoid processing entire large documents
-    sample_text = text[:2000].lower()
-    
-    for pattern in insurance_indicators:
-        matches = re.findall(pattern, sample_text, re.IGNORECASE)
-        if matches:
-            confidence_score += 1
-            found_terms.add(pattern)
+    confidence_score, found_terms = insurance_indicator_score(text)
     
     print(f"Insurance document validation - Score: {confidence_score}, Found terms: {found_terms}")
     
     # Return True if we found at least min_confidence number of insurance terms
     return confidence_score >= min_confidence
 
+# Tiered validation: indicator scores at or above ACCEPT (with at least ACCEPT_SBC of the
+# SBC indicators) or at or below REJECT are decided locally; the rest pays for an LLM call
+VALIDATION_ACCEPT_SCORE = int(os.getenv('VALIDATION_ACCEPT_SCORE', '6'))
+VALIDATION_ACCEPT_SBC_SCORE = int(os.getenv('VALIDATION_ACCEPT_SBC_SCORE', '2'))
+VALIDATION_REJECT_SCORE = int(os.getenv('VALIDATION_REJECT_SCORE', '1'))
+VALIDATION_CACHE_MAX_ENTRIES = 1024
+
+# LLM verdicts keyed by the hash of the text the LLM sees. Uploads are validated
+# on the job pool, so the cache and the counters are only touched under validation_lock
+llm_validation_cache = OrderedDict()
+validation_stats = {
+    'regex_accept': 0,
+    'regex_reject': 0,
+    'llm': 0,
+    'llm_cache_hit': 0
+}
+validation_lock = threading.Lock()
+
+def count_validation(tier):
+    with validation_lock:
+        validation_stats[tier] += 1
+
+def regex_validation_tier(text):
+    """
+    The validation tier that decides a document locally: 'regex_accept',
+    'regex_reject', or 'llm' when its indicator scores are ambiguous.
+    Returns (tier, score)
+    """
+    score, _ = insurance_indicator_score(text)
+    sbc_score, _ = insurance_indicator_score(text, SBC_INDICATORS)
+    if score >= VALIDATION_ACCEPT_SCORE and sbc_score >= VALIDATION_ACCEPT_SBC_SCORE:
+        return 'regex_accept', score
+    if score <= VALIDATION_REJECT_SCORE:
+        return 'regex_reject', score
+    return 'llm', score
+
+def validate_document_tiered(text):
+    """
+    Validate an uploaded document, calling the LLM validator only when the local
+    indicator score is ambiguous. Returns (is_valid, reason)
+    """
+    tier, score = regex_validation_tier(text)
+    
+    if tier == 'regex_accept':
+        count_validation('regex_accept')
+        return True, f"This appears to be a health insurance document. Found {score} insurance indicators."
+    
+    if tier == 'regex_reject':
+        count_validation('regex_reject')
+        return False, f"This appears to be a document without health insurance terminology (found {score} insurance indicators)."
+    
+    key = hashlib.sha256(text[:2000].encode('utf-8')).hexdigest()
+    with validation_lock:
+        verdict = llm_validation_cache.get(key)
+        if verdict is not None:
+            validation_stats['llm_cache_hit'] += 1
+            llm_validation_cache.move_to_end(key)
+            return verdict
+        validation_stats['llm'] += 1
+    
+    # The LLM call runs outside the lock so other uploads are not held up by it
+    verdict = validate_insurance_document(text)
+    if verdict[1] != "Error during validation":
+        with validation_lock:
+            llm_validation_cache[key] = verdict
+            if len(llm_validation_cache) > VALIDATION_CACHE_MAX_ENTRIES:
+                llm_validation_cache.popitem(last=False)
+    return verdict
+
+@app.route('/cache-stats', methods=['GET'])
+@login_required
+def get_cache_stats():
+    """Hit/miss counters of the upload, LLM response, embedding and answer caches and the user data store"""
+    return jsonify({
+        'upload_cache': upload_cache.stats(),
+        'llm_cache': llm_cache.stats() if llm_cache is not None else None,
+        'embedding_store': embedding_store.stats() if embedding_store is not None else None,
+        'answer_cache': answer_cache.stats() if answer_cache is not None else None,
+        'user_store': user_store.stats()
+    })
+
+@app.route('/validation-stats', methods=['GET'])
+@login_required
+def get_validation_stats():
+    """How many uploads each validation tier resolved"""
+    with validation_lock:
+        stats = dict(validation_stats)
+    return jsonify({
+        **stats,
+        'accept_score': VALIDATION_ACCEPT_SCORE,
+        'accept_sbc_score': VALIDATION_ACCEPT_SBC_SCORE,
+        'reject_score': VALIDATION_REJECT_SCORE
+    })
+
+def collect_cache_metrics():
+    """Validation tier and cache counters, read at /metrics scrape time"""
+    with validation_lock:
+        stats = dict(validation_stats)
+    samples = [
+        ('coveredai_validation_total', 'counter', 'Uploads resolved by each validation tier', {'tier': tier}, count)
+        for tier, count in stats.items()
+    ]
+    caches = {'upload': upload_cache.stats()}
+    if llm_cache is not None:
+        caches['llm'] = llm_cache.stats()
+    if embedding_store is not None:
+        caches['embedding'] = embedding_store.stats()
+    if answer_cache is not None:
+        caches['answer'] = answer_cache.stats()
+    for cache, stats in caches.items():
+        samples.append(('coveredai_cache_entries', 'gauge', 'Entries held by each cache', {'cache': cache}, stats['entries']))
+        for result in ('hits', 'misses'):
+            samples.append(('coveredai_cache_lookups_total', 'counter', 'Cache lookups by result',
+                            {'cache': cache, 'result': result}, stats[result]))
+    store_stats = user_store.stats()
+    samples += [
+        ('coveredai_user_store_resident_bytes', 'gauge', 'Estimated bytes of documents held in memory', {}, store_stats['resident_bytes']),
+        ('coveredai_user_store_resident_documents', 'gauge', 'Documents held in memory', {}, store_stats['resident_documents']),
+        ('coveredai_user_store_evictions_total', 'counter', 'Documents evicted from memory', {}, store_stats['evictions']),
+        ('coveredai_user_store_loads_total', 'counter', 'Documents reloaded from disk', {}, store_stats['loads']),
+    ]
+    return samples
+
+metrics.add_collector(collect_cache_metrics)
+
+# Uploads are ingested in the background; /upload returns a job id to poll
+UPLOAD_MAX_WORKERS = int(os.getenv('UPLOAD_MAX_WORKERS', '2'))
+# Jobs of a worker that has not saved them for UPLOAD_JOB_STALE_SECONDS are reported as failed
+upload_jobs = JobQueue(state_backend, max_workers=UPLOAD_MAX_WORKERS, ttl_seconds=int(os.getenv('UPLOAD_JOB_TTL_SECONDS', '3600')),
+                       stale_seconds=int(os.getenv('UPLOAD_JOB_STALE_SECONDS', '60')))
+
+def upload_stage(job, name):
+    """Report `name` as the job's current stage and time it"""
+    job.set_stage(name)
+    return stage(name, endpoint='upload_file')
+
+def ingest_upload(job, user_id, filename, file_path, file_bytes):
+    """Extract, validate, chunk and embed a saved upload; runs on the upload job pool.
+
+    file_path is this upload's own copy, so a later upload with the same name can't
+    change or delete it while the job waits; once ingested it becomes uploads/<filename>.
+    """
+    try:
+        # Identical uploads (from any user) reuse extraction, validation and embeddings
+        upload_hash = content_hash(file_bytes)
+        cached = upload_cache.get(upload_hash)
+        text_chunks = None
+
+        if cached is not None:
+            full_text = cached['full_text']
+            page_offsets = cached['page_offsets']
+            is_insurance, reason = cached['is_valid'], cached['reason']
+        else:
+            # Extract page-indexed text, removing any PII/PHI before it is validated, stored or
+            # embedded; pages are sanitized and chunked as they arrive while later ones are still parsed
+            with upload_stage(job, 'extract'):
+                document, text_chunks, chunk_pages = extract_document_chunks(file_path, chunk_text,
+                                                                             map_page=sanitize_text)
+            full_text = document.text
+            page_offsets = document.page_offsets
+
+            # Validate if it's an insurance document
+            with upload_stage(job, 'validate'):
+                is_insurance, reason = validate_document_tiered(full_text)
+            # A failed validation call is retried on the next upload rather than cached as a rejection
+            if reason != "Error during validation":
+                upload_cache.put(upload_hash, full_text=full_text, page_offsets=page_offsets,
+                                 is_valid=is_insurance, reason=reason)
+        
+        if not is_insurance:
+            # Delete the temporary file if it's not insurance-related
+            os.remove(file_path)
+            job.fail({
+                'error': 'Insurance Document Required',
+                'message': f'This tool is specifically designed for insurance documents only. The uploaded file appears to be about something else. {reason} Please upload a health insurance policy, claims document, or benefits statement.'
+            }, 400)
+            return None
+
+        if cached is not None and 'chunks' in cached:
+            text_chunks = cached['chunks']
+            chunk_pages = cached['chunk_pages']
+            vectors = cached['vectors']
+            suggested_questions = cached['suggested_questions']
+        else:
+            if text_chunks is None:
+                # Text cached by an earlier upload that stopped before its chunks were cached
+                with upload_stage(job, 'chunk'):
+                    text_chunks = chunk_text(full_text)
+                    chunk_pages = locate_chunk_pages(full_text, text_chunks, page_offsets)
+            # Embed the chunks once
+            with upload_stage(job, 'embed'):
+                vectors = embeddings.embed_documents(text_chunks) if text_chunks else []
+
+            # Generate suggested questions only
+            job.set_stage('suggested_questions')
+            try:
+                questions_prompt = "Generate 3-5 relevant questions someone might ask about this insurance document. Return as a JSON array of strings."
+                questions_response = invoke_llm(questions_prompt + "\n\n" + "\n".join(text_chunks[:2]), site='suggested_questions')
+                questions_text = str(questions_response.content) if hasattr(questions_response, 'content') else str(questions_response)
+                suggested_questions = json.loads(questions_text) if questions_text else []
+            except:
+                suggested_questions = []
+
+            upload_cache.put(upload_hash, chunks=text_chunks, chunk_pages=chunk_pages, vectors=vectors,
+                             suggested_questions=suggested_questions)
+
+        # /ask reuses this index for every question
+        with upload_stage(job, 'index'):
+            document_index = index_document(user_id, filename, text_chunks, vectors, chunk_pages) if text_chunks else None
+
+        os.replace(file_path, os.path.join(app.config['UPLOAD_FOLDER'], filename))
+
+        # Store document data
+        user_store.put_document(user_id, filename, {
+            'full_text': full_text,
+            'chunks': text_chunks,
+            'chunk_pages': chunk_pages,
+            'page_offsets': page_offsets,
+            'index': document_index,
+            'content_hash': upload_hash
+        })
+
+        return {
+            'message': 'File uploaded successfully',
+            'filename': filename,
+            'reason': reason,
+            'suggested_questions': suggested_questions
+        }
+
+    except Exception as e:
+        # Clean up the file in case of processing error
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        print(f"Error in upload_file: {str(e)}")
+        raise
+
 @app.route('/upload', methods=['POST'])
 @login_required
 def upload_file():
+    """Save the file and queue its ingestion. Poll /upload-status/<job_id> for the result."""
     if 'file' not in request.files:
         return jsonify({'error': 'No file provided'}), 400
     
@@ -449,127 +905,580 @@ def upload_file():
 
     try:
         user_id = get_user_id()
-        init_user_data(user_id)  # Initialize user data structure
 
-        # Save the file temporarily
+        # Save the file under a name of its own until the job has ingested it
         filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
-
-        try:
-            # Process the file based on its type
-            if file_ext.endswith('.pdf'):
-                full_text = process_pdf(file_path)
-            else:  # .docx
-                full_text = process_docx(file_path)
-            
-            # Validate if it's an insurance document
-            is_insurance, reason = validate_insurance_document(full_text)
-            
-            if not is_insurance:
-                # Delete the temporary file if it's not insurance-related
-                os.remove(file_path)
-                return jsonify({
-                    'error': 'Insurance Document Required',
-                    'message': f'This tool is specifically designed for insurance documents only. The uploaded file appears to be about something else. {reason} Please upload a health insurance policy, claims document, or benefits statement.'
-                }), 400
-
-            # Split text into smaller chunks
-            text_chunks = chunk_text(full_text)
-            
-            # Store document data
-            user_data[user_id]['document_vectors'][filename] = {
-                'full_text': full_text,
-                'chunks': text_chunks
-            }
+        file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"upload_{uuid.uuid4().hex}_{filename}")
+        with stage('save'):
+            file_bytes = file.read()
+            with open(file_path, 'wb') as f:
+                f.write(file_bytes)
 
-            # Generate suggested questions only
-            try:
-                questions_prompt = "Generate 3-5 relevant questions someone might ask about this insurance document. Return as a JSON array of strings."
-                questions_response = llm.invoke(questions_prompt + "\n\n" + "\n".join(text_chunks[:2]))
-                questions_text = str(questions_response.content) if hasattr(questions_response, 'content') else str(questions_response)
-                suggested_questions = json.loads(questions_text) if questions_text else []
-            except:
-                suggested_questions = []
-
-            return jsonify({
-                'message': 'File uploaded successfully',
-                'filename': filename,
-                'suggested_questions': suggested_questions
-            })
-
-        except Exception as e:
-            # Clean up the file in case of processing error
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            raise e
+        job = upload_jobs.submit(
+            user_id, 'upload',
+            lambda job: ingest_upload(job, user_id, filename, file_path, file_bytes),
+            filename=filename
+        )
+        return jsonify({
+            'message': 'File accepted for processing',
+            'job_id': job.id,
+            'filename': filename,
+            'status': job.status
+        }), 202
 
     except Exception as e:
         print(f"Error in upload_file: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/upload-status/<job_id>', methods=['GET'])
+@login_required
+def get_upload_status(job_id):
+    """Stage progress of an upload job, with the result or error once it has finished"""
+    job = upload_jobs.get(job_id, owner=get_user_id())
+    if job is None:
+        return jsonify({'error': 'Upload job not found'}), 404
+    return jsonify(job)
+
+def build_answer_prompt(question, relevant_chunks):
+    """Build the /ask prompt from the retrieved chunks"""
+    # Neighbouring chunks are merged so their overlap is sent once
+    context = render_context(relevant_chunks)
+    
+    return f"""Based on the following insurance document excerpts, answer this question: {question}
+
+Context:
+{context}
+
+Answer:"""
+
+def format_sources(relevant_chunks):
+    sources = []
+    for doc in relevant_chunks:
+        source = {
+            'text': doc.page_content,
+            'document': doc.metadata['source']
+        }
+        if doc.metadata.get('page'):
+            source['page'] = doc.metadata['page']
+        sources.append(source)
+    return sources
+
+def answer_cache_key(user_id, filename, doc_data):
+    """Cached answers are shared by everyone who uploaded the same file, keyed by its content
+    hash (as the upload cache and embedding store are). doc_data must come from
+    user_store.get_document(user_id, filename), so only owners of that content reach them."""
+    return doc_data.get('content_hash') or document_key(user_id, filename)
+
+def cached_sources(sources, filename):
+    """Sources of a cached answer, attributed to the caller's document"""
+    return [{**source, 'document': filename} for source in sources]
+
+def sse_event(event, data):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @app.route('/ask', methods=['POST'])
 @login_required
 def ask_question():
     user_id = get_user_id()
-    init_user_data(user_id)  # Initialize user data structure
     
     data = request.json
     if not data or 'question' not in data or 'filename' not in data:
         return jsonify({'error': 'Missing question or filename'}), 400
     
+    # Optional per-request override of RETRIEVAL_MODE
+    retrieval_mode = data.get('retrieval_mode') or RETRIEVAL_MODE
+    if retrieval_mode not in RETRIEVAL_MODES:
+        return jsonify({'error': f"retrieval_mode must be one of {', '.join(RETRIEVAL_MODES)}"}), 400
+    
     filename = data['filename']
-    if filename not in user_data[user_id]['document_vectors']:
+    doc_data = user_store.get_document(user_id, filename)
+    if doc_data is None:
         return jsonify({'error': 'Selected document not found'}), 404
     
     try:
         # Get relevant chunks for the question from the selected document only
         question = data['question']
-        doc_data = user_data[user_id]['document_vectors'][filename]
         chunks = doc_data['chunks']
         
         if not chunks:
             return jsonify({'error': 'No content found in the selected document'}), 404
         
-        # Create documents for vectorstore
-        documents = [
-            Document(
-                page_content=chunk,
-                metadata={'source': filename, 'chunk_id': i}
-            ) for i, chunk in enumerate(chunks)
-        ]
+        # Near-duplicate questions about the same document reuse an earlier answer
+        # Candidates are ranked from the selected document only
+        cache_document = answer_cache_key(user_id, filename, doc_data)
+        cached, candidates, question_vector = retrieve_or_cached(user_id, filename, doc_data, question,
+                                                                 cache_document, retrieval_mode)
         
-        # Create vectorstore with chunks from selected document only
-        vectorstore = FAISS.from_documents(documents, embeddings)
+        context_tokens = 0
+        if cached is not None:
+            answer_text = cached['answer']
+            sources = cached_sources(cached['sources'], filename)
+        else:
+            # Keep the candidates that fit the token budget
+            context = pack_chunks(candidates)
+            relevant_chunks = context.documents
+            context_tokens = context.tokens
+            
+            # Get answer using relevant context only (the exact-prompt LLM cache is bypassed;
+            # answer_cache above already covers repeated questions)
+            answer = invoke_llm(build_answer_prompt(question, relevant_chunks), site='ask', use_cache=False)
+            answer_text = str(answer.content) if hasattr(answer, 'content') else str(answer)
+            
+            # Extract sources
+            sources = format_sources(relevant_chunks)
+            
+            if answer_cache is not None:
+                answer_cache.store(cache_document, retrieval_mode, question, answer_text, sources, vector=question_vector)
         
-        # Get most relevant chunks
-        relevant_chunks = vectorstore.similarity_search(
-            question,
-            k=3  # Limit to top 3 most relevant chunks
+        # Store conversation
+        user_store.append_conversation(user_id, {
+            'question': question,
+            'answer': answer_text,
+            'sources': sources,
+            'timestamp': datetime.now().isoformat()
+        })
+        
+        response = {
+            'answer': answer_text,
+            'sources': sources,
+            'cached': cached is not None,
+            'context_tokens': context_tokens
+        }
+        if cached is not None:
+            response['cache_similarity'] = round(cached['similarity'], 4)
+        return jsonify(response)
+    
+    except Exception as e:
+        print(f"Error in ask_question: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+# Several questions about one document in one request (e.g. all suggested questions)
+ASK_BATCH_MAX_QUESTIONS = int(os.getenv('ASK_BATCH_MAX_QUESTIONS', '20'))
+ASK_BATCH_MAX_WORKERS = int(os.getenv('ASK_BATCH_MAX_WORKERS', '4'))
+# Questions are answered in one structured LLM call while the packed prompt stays under this many characters
+ASK_BATCH_PACK_MAX_CHARS = int(os.getenv('ASK_BATCH_PACK_MAX_CHARS', '12000'))
+ASK_BATCH_MODES = ('auto', 'packed', 'parallel')
+
+def embed_questions(questions):
+    """Embed several questions with a single embeddings call"""
+    if embedding_store is not None:
+        # CachedEmbeddings; its embed_queries() skips the store lookups queries never hit
+        return embeddings.embed_queries(questions)
+    return embeddings.embed_documents(questions) if questions else []
+
+def build_packed_answer_prompt(questions, chunks_per_question):
+    """One prompt answering every question; excerpts shared by several questions appear once"""
+    excerpts = []
+    excerpt_numbers = {}
+    references = []
+    for chunks in chunks_per_question:
+        numbers = []
+        for doc in chunks:
+            key = doc.metadata.get('chunk_id', doc.page_content)
+            if key not in excerpt_numbers:
+                excerpts.append(doc.page_content)
+                excerpt_numbers[key] = len(excerpts)
+            numbers.append(excerpt_numbers[key])
+        references.append(numbers)
+    
+    excerpt_text = "\n\n".join(f"[{number}] {text}" for number, text in enumerate(excerpts, 1))
+    question_text = "\n".join(
+        f"{i}. {question} (excerpts {', '.join(str(n) for n in numbers)})"
+        for i, (question, numbers) in enumerate(zip(questions, references), 1)
+    )
+    return f"""Based on the following insurance document excerpts, answer each numbered question using the excerpts listed for it.
+
+Excerpts:
+{excerpt_text}
+
+Questions:
+{question_text}
+
+Respond with JSON only, in this format:
+{{"answers": [{{"id": 1, "answer": "..."}}]}}"""
+
+def parse_packed_answers(content, count):
+    """{question index: answer} from a packed response; questions it failed to answer are left out"""
+    content = content.strip()
+    if content.startswith('```'):
+        content = re.sub(r'^```(?:json)?\s*|\s*```$', '', content)
+    try:
+        answers = json.loads(content).get('answers', [])
+    except (ValueError, AttributeError):
+        return {}
+    parsed = {}
+    for item in answers:
+        if not isinstance(item, dict):
+            continue
+        try:
+            index = int(item.get('id')) - 1
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < count and isinstance(item.get('answer'), str) and item['answer'].strip():
+            parsed[index] = item['answer'].strip()
+    return parsed
+
+def answer_questions(questions, chunks_per_question, mode='auto'):
+    """Answers for several questions with their retrieved chunks: one packed call when the
+    prompt fits (or mode='packed'), otherwise one call per question with bounded concurrency.
+    Returns (answers, how they were produced: 'packed', 'parallel', or 'packed+parallel' when
+    the packed response left some questions unanswered)."""
+    answers = {}
+    if len(questions) > 1 and mode != 'parallel':
+        prompt = build_packed_answer_prompt(questions, chunks_per_question)
+        if mode == 'packed' or len(prompt) <= ASK_BATCH_PACK_MAX_CHARS:
+            response = invoke_llm(prompt, site='ask_batch', use_cache=False)
+            answers = parse_packed_answers(str(response.content) if hasattr(response, 'content') else str(response),
+                                           len(questions))
+    
+    # Anything the packed call did not answer gets its own call
+    missing = [i for i in range(len(questions)) if i not in answers]
+    used = 'packed+parallel' if answers and missing else 'packed' if answers else 'parallel'
+    if missing:
+        responses = map_groups(
+            lambda i: invoke_llm(build_answer_prompt(questions[i], chunks_per_question[i]), site='ask', use_cache=False),
+            missing,
+            max_workers=ASK_BATCH_MAX_WORKERS
         )
+        for i, response in zip(missing, responses):
+            answers[i] = str(response.content) if hasattr(response, 'content') else str(response)
+    return [answers[i] for i in range(len(questions))], used
+
+@app.route('/ask-batch', methods=['POST'])
+@login_required
+def ask_batch():
+    """Answer a list of questions about one document.
+
+    Same result per question as /ask, but the document is loaded once, the
+    questions are embedded in one call and searched in one FAISS query, and
+    the answers come from one packed LLM call when they fit (`answer_mode`
+    'auto', 'packed' or 'parallel'). The response's `answer_mode` says how
+    they were actually produced.
+    """
+    user_id = get_user_id()
+    
+    data = request.json
+    if not data or 'questions' not in data or 'filename' not in data:
+        return jsonify({'error': 'Missing questions or filename'}), 400
+    questions = data['questions']
+    if (not isinstance(questions, list) or not questions
+            or not all(isinstance(q, str) and q.strip() for q in questions)):
+        return jsonify({'error': 'questions must be a non-empty list of questions'}), 400
+    if len(questions) > ASK_BATCH_MAX_QUESTIONS:
+        return jsonify({'error': f'At most {ASK_BATCH_MAX_QUESTIONS} questions per request'}), 400
+    
+    retrieval_mode = data.get('retrieval_mode') or RETRIEVAL_MODE
+    if retrieval_mode not in RETRIEVAL_MODES:
+        return jsonify({'error': f"retrieval_mode must be one of {', '.join(RETRIEVAL_MODES)}"}), 400
+    answer_mode = data.get('answer_mode') or 'auto'
+    if answer_mode not in ASK_BATCH_MODES:
+        return jsonify({'error': f"answer_mode must be one of {', '.join(ASK_BATCH_MODES)}"}), 400
+    
+    filename = data['filename']
+    doc_data = user_store.get_document(user_id, filename)
+    if doc_data is None:
+        return jsonify({'error': 'Selected document not found'}), 404
+    if not doc_data['chunks']:
+        return jsonify({'error': 'No content found in the selected document'}), 404
+    
+    try:
+        results = [None] * len(questions)
+        cache_document = answer_cache_key(user_id, filename, doc_data)
         
-        # Create context from relevant chunks
-        context = "\n\n".join([doc.page_content for doc in relevant_chunks])
+        # Exact repeats are answered from the cache without embedding them
+        pending = []
+        for i, question in enumerate(questions):
+            cached = answer_cache.lookup_exact(cache_document, retrieval_mode, question) if answer_cache is not None else None
+            if cached is not None:
+                results[i] = {'question': question, 'answer': cached['answer'],
+                              'sources': cached_sources(cached['sources'], filename), 'cached': True,
+                              'context_tokens': 0}
+            else:
+                pending.append(i)
+        
+        # BM25 first: confident lexical hits need no vector search
+        lexical = {}
+        chunks_per_question = {}
+        for i in pending:
+            lexical[i], chunks = retrieve_lexical(user_id, filename, doc_data, questions[i],
+                                                  ASK_CONTEXT_CANDIDATES, retrieval_mode)
+            if chunks is not None:
+                chunks_per_question[i] = chunks
+        
+        # One embeddings call for the questions the vector search needs; the semantic cache
+        # reuses their vectors, and the others could only have matched exactly
+        to_embed = [i for i in pending if i not in chunks_per_question]
+        vectors = {}
+        if to_embed:
+            with stage('embed_questions'):
+                vectors = dict(zip(to_embed, embed_questions([questions[i] for i in to_embed])))
+        
+        if answer_cache is not None and pending:
+            with stage('answer_cache'):
+                for i in pending:
+                    cached = answer_cache.lookup_similar(cache_document, retrieval_mode, vectors.get(i))
+                    if cached is not None:
+                        results[i] = {'question': questions[i], 'answer': cached['answer'],
+                                      'sources': cached_sources(cached['sources'], filename), 'cached': True,
+                                      'context_tokens': 0}
+            pending = [i for i in pending if results[i] is None]
+        
+        # One FAISS search for all the questions that still need vectors
+        vector_pending = [i for i in pending if i not in chunks_per_question]
+        if vector_pending:
+            with stage('load_index'):
+                vectorstore = get_document_index(user_id, filename)
+            with stage('vector_search'):
+                candidates = ASK_CONTEXT_CANDIDATES if retrieval_mode == 'vector' else RETRIEVAL_CANDIDATES
+                vector_results = search_by_vectors(vectorstore, [vectors[i] for i in vector_pending], candidates)
+            for i, found in zip(vector_pending, vector_results):
+                chunks_per_question[i] = fuse_retrieval(doc_data, filename, lexical[i], found,
+                                                        ASK_CONTEXT_CANDIDATES, retrieval_mode)
         
-        # Get answer using relevant context only
-        prompt = f"""Based on the following insurance document excerpts, answer this question: {question}
+        # Each question keeps the candidates that fit its token budget
+        context_tokens = {}
+        for i in pending:
+            context = pack_chunks(chunks_per_question[i])
+            chunks_per_question[i] = context.documents
+            context_tokens[i] = context.tokens
+        
+        answer_source = 'cached'
+        if pending:
+            answers, answer_source = answer_questions(
+                [questions[i] for i in pending], [chunks_per_question[i] for i in pending], mode=answer_mode
+            )
+            for i, answer_text in zip(pending, answers):
+                sources = format_sources(chunks_per_question[i])
+                results[i] = {'question': questions[i], 'answer': answer_text, 'sources': sources, 'cached': False,
+                              'context_tokens': context_tokens[i]}
+                if answer_cache is not None:
+                    answer_cache.store(cache_document, retrieval_mode, questions[i], answer_text, sources,
+                                       vector=vectors.get(i))
+        
+        # Store conversation, one entry per question as /ask does
+        for result in results:
+            user_store.append_conversation(user_id, {
+                'question': result['question'],
+                'answer': result['answer'],
+                'sources': result['sources'],
+                'timestamp': datetime.now().isoformat()
+            })
+        
+        return jsonify({'results': results, 'answer_mode': answer_source})
+    
+    except Exception as e:
+        print(f"Error in ask_batch: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/ask-stream', methods=['POST'])
+@login_required
+def ask_question_stream():
+    """Same as /ask, but streams the answer as Server-Sent Events.
+
+    Emits one `sources` event with the retrieved chunks and their size in
+    tokens (`context_tokens`), `token` events as the model produces text,
+    then `done` with the full answer (or `error`). Answers come from the same
+    answer cache as /ask; a cached answer is sent as a single `token` event,
+    and `sources` and `done` carry `cached`.
+    """
+    user_id = get_user_id()
+    
+    data = request.json
+    if not data or 'question' not in data or 'filename' not in data:
+        return jsonify({'error': 'Missing question or filename'}), 400
+    
+    # Optional per-request override of RETRIEVAL_MODE
+    retrieval_mode = data.get('retrieval_mode') or RETRIEVAL_MODE
+    if retrieval_mode not in RETRIEVAL_MODES:
+        return jsonify({'error': f"retrieval_mode must be one of {', '.join(RETRIEVAL_MODES)}"}), 400
+    
+    filename = data['filename']
+    doc_data = user_store.get_document(user_id, filename)
+    if doc_data is None:
+        return jsonify({'error': 'Selected document not found'}), 404
+    
+    question = data['question']
+    if not doc_data['chunks']:
+        return jsonify({'error': 'No content found in the selected document'}), 404
+    
+    def generate():
+        try:
+            # Near-duplicate questions about the same document reuse an earlier answer
+            cache_document = answer_cache_key(user_id, filename, doc_data)
+            cached, candidates, question_vector = retrieve_or_cached(user_id, filename, doc_data, question,
+                                                                     cache_document, retrieval_mode)
+            
+            if cached is not None:
+                answer_text = cached['answer']
+                sources = cached_sources(cached['sources'], filename)
+                yield sse_event('sources', {'sources': sources, 'context_tokens': 0, 'cached': True})
+                yield sse_event('token', {'token': answer_text})
+                user_store.append_conversation(user_id, {
+                    'question': question,
+                    'answer': answer_text,
+                    'sources': sources,
+                    'timestamp': datetime.now().isoformat()
+                })
+                yield sse_event('done', {'answer': answer_text, 'cached': True})
+                return
+            
+            context = pack_chunks(candidates)
+            relevant_chunks = context.documents
+            sources = format_sources(relevant_chunks)
+            yield sse_event('sources', {'sources': sources, 'context_tokens': context.tokens, 'cached': False})
+            
+            prompt = build_answer_prompt(question, relevant_chunks)
+            answer_parts = []
+            from utils.llm_tracing import TokenUsageHandler
+            usage = TokenUsageHandler()
+            stream_start = time.perf_counter()
+            first_token_at = None
+            for chunk in llm.stream(prompt, config={'callbacks': [usage]}):
+                token = str(chunk.content) if hasattr(chunk, 'content') else str(chunk)
+                if token:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        record_stage('first_token', first_token_at - stream_start, endpoint='ask_question_stream')
+                    answer_parts.append(token)
+                    yield sse_event('token', {'token': token})
+            record_stage('llm_ask_stream', time.perf_counter() - stream_start, endpoint='ask_question_stream')
+            answer_text = "".join(answer_parts)
+            # Streamed responses usually report no usage, so count it with the context tokenizer
+            record_llm_call('ask_stream', usage.prompt_tokens or count_tokens(prompt),
+                            usage.completion_tokens or count_tokens(answer_text))
+            
+            # Store conversation (and the cached answer) once the full answer is known
+            user_store.append_conversation(user_id, {
+                'question': question,
+                'answer': answer_text,
+                'sources': sources,
+                'timestamp': datetime.now().isoformat()
+            })
+            if answer_cache is not None and answer_text:
+                answer_cache.store(cache_document, retrieval_mode, question, answer_text, sources, vector=question_vector)
+            
+            yield sse_event('done', {'answer': answer_text, 'cached': False})
+        
+        except Exception as e:
+            print(f"Error in ask_question_stream: {str(e)}")
+            yield sse_event('error', {'error': str(e)})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# Per-user indexes over all of a user's documents for /ask-all, kept for the most recently active users
+USER_INDEX_MAX_USERS = int(os.getenv('USER_INDEX_MAX_USERS', '64'))
+CROSS_DOCUMENT_CHUNKS = int(os.getenv('CROSS_DOCUMENT_CHUNKS', '6'))
+user_indexes = OrderedDict()
+user_indexes_lock = threading.Lock()
+
+def load_user_document_vectors(user_id, filename):
+    """Saved (chunks, vectors, pages) of a document, embedding and saving them if missing"""
+    saved = load_document_vectors(user_id, filename)
+    if saved is not None:
+        return saved
+    doc_data = user_store.get_document(user_id, filename)
+    if doc_data is None or not doc_data['chunks']:
+        return None
+    vectors = embeddings.embed_documents(doc_data['chunks'])
+    save_document_index(user_id, filename, doc_data['chunks'], vectors, doc_data.get('chunk_pages'))
+    return doc_data['chunks'], vectors, doc_data.get('chunk_pages')
+
+def get_user_index(user_id):
+    """The user's combined index, with documents added or removed since the last call applied"""
+    with user_indexes_lock:
+        user_index = user_indexes.get(user_id)
+        if user_index is None:
+            user_index = user_indexes[user_id] = UserIndex(embeddings.get())
+            if len(user_indexes) > USER_INDEX_MAX_USERS:
+                user_indexes.popitem(last=False)
+        user_indexes.move_to_end(user_id)
+    user_index.sync(user_store.document_versions(user_id), lambda filename: load_user_document_vectors(user_id, filename))
+    return user_index
+
+def build_cross_document_prompt(question, chunks_by_document):
+    """Prompt for one answer over excerpts grouped by plan document"""
+    sections = []
+    for filename, chunks in chunks_by_document.items():
+        excerpts = "\n\n".join(doc.page_content for doc in chunks)
+        sections.append(f"Plan document: {filename}\n{excerpts}")
+    context = "\n\n---\n\n".join(sections)
+    
+    return f"""The following excerpts come from several insurance plan documents, grouped by document.
+Answer this question: {question}
+
+For every fact you state, name the plan document it came from in square brackets, e.g. [plan.pdf].
+If the plans differ, say how. If a document does not cover the question, say so.
 
 Context:
 {context}
 
 Answer:"""
+
+@app.route('/ask-all', methods=['POST'])
+@login_required
+def ask_all_documents():
+    """Answer a question from all of the user's documents with a single LLM call"""
+    user_id = get_user_id()
+    
+    data = request.json
+    if not data or 'question' not in data:
+        return jsonify({'error': 'Missing question'}), 400
+    
+    retrieval_mode = data.get('retrieval_mode') or RETRIEVAL_MODE
+    if retrieval_mode not in RETRIEVAL_MODES:
+        return jsonify({'error': f"retrieval_mode must be one of {', '.join(RETRIEVAL_MODES)}"}), 400
+    
+    filenames = user_store.list_documents(user_id)
+    if not filenames:
+        return jsonify({'error': 'No documents uploaded'}), 404
+    
+    try:
+        question = data['question']
+        
+        # Rank (filename, chunk_id) pairs: one vector ranking over the combined index
+        # and one BM25 ranking per document, fused as in /ask
+        rankings = []
+        documents = {}
+        if retrieval_mode != 'lexical':
+            with stage('load_index'):
+                user_index = get_user_index(user_id)
+            with stage('vector_search'):
+                results = user_index.search(question, k=RETRIEVAL_CANDIDATES * len(filenames))
+            rankings.append([(doc.metadata['source'], doc.metadata['chunk_id']) for doc in results])
+        if retrieval_mode != 'vector':
+            with stage('bm25'):
+                for filename in filenames:
+                    doc_data = user_store.get_document(user_id, filename)
+                    if doc_data is None or not doc_data['chunks']:
+                        continue
+                    documents[filename] = doc_data
+                    lexical = get_bm25_index(user_id, filename, doc_data).search(question, k=RETRIEVAL_CANDIDATES)
+                    rankings.append([(filename, chunk_id) for chunk_id, _ in lexical])
+        metrics.inc('coveredai_retrieval_total', mode=f"all_{retrieval_mode}")
         
-        answer = llm.invoke(prompt)
+        # Group the top chunks by source document, in order of each document's best chunk
+        chunks_by_document = {}
+        for filename, chunk_id in reciprocal_rank_fusion(rankings)[:CROSS_DOCUMENT_CHUNKS]:
+            doc_data = documents.get(filename) or user_store.get_document(user_id, filename)
+            if doc_data is None:
+                continue
+            documents[filename] = doc_data
+            chunks_by_document.setdefault(filename, []).append(chunk_as_document(doc_data, filename, chunk_id))
+        if not chunks_by_document:
+            return jsonify({'error': 'No content found in your documents'}), 404
+        
+        answer = invoke_llm(build_cross_document_prompt(question, chunks_by_document), site='ask_all', use_cache=False)
         answer_text = str(answer.content) if hasattr(answer, 'content') else str(answer)
         
-        # Extract sources
-        sources = [{
-            'text': doc.page_content,
-            'document': doc.metadata['source']
-        } for doc in relevant_chunks]
+        sources_by_document = {filename: format_sources(chunks) for filename, chunks in chunks_by_document.items()}
+        sources = [source for document_sources in sources_by_document.values() for source in document_sources]
         
-        # Store conversation
-        user_data[user_id]['conversations'].append({
+        user_store.append_conversation(user_id, {
             'question': question,
             'answer': answer_text,
             'sources': sources,
@@ -578,11 +1487,12 @@ Answer:"""
         
         return jsonify({
             'answer': answer_text,
-            'sources': sources
+            'sources': sources,
+            'sources_by_document': sources_by_document
         })
     
     except Exception as e:
-        print(f"Error in ask_question: {str(e)}")
+        print(f"Error in ask_all_documents: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/delete-file', methods=['POST'])
@@ -599,10 +1509,10 @@ def delete_file():
     
     try:
         # Remove from user data first to prevent new operations
-        if filename in user_data[user_id]['document_vectors']:
-            # Store file info before deleting from user_data
-            file_info = user_data[user_id]['document_vectors'][filename]
-            del user_data[user_id]['document_vectors'][filename]
+        file_info = user_store.delete_document(user_id, filename)
+        if file_info is not None:
+            # Cached answers are kept: they belong to the content, which other users may also hold
+            delete_document_index(user_id, filename)
             
             # Delete physical file with retries
             file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
@@ -636,8 +1546,8 @@ def delete_file():
                     # If file is already deleted, consider it a success
                     return jsonify({'message': 'File deleted successfully'})
                 except Exception as e:
-                    # Restore user_data if file deletion fails
-                    user_data[user_id]['document_vectors'][filename] = file_info
+                    # Restore the document record if file deletion fails
+                    user_store.put_document(user_id, filename, file_info)
                     raise
         else:
             return jsonify({'error': 'File not found'}), 404
@@ -646,71 +1556,66 @@ def delete_file():
         print(f"Error deleting file: {str(e)}")
         return jsonify({'error': f'Failed to delete file: {str(e)}'}), 500
 
+# /summarize benefits keys and the fields behind them
+PLAN_BENEFIT_FIELDS = {
+    'deductible': ['individual_deductible', 'family_deductible'],
+    'outOfPocketMax': ['individual_out_of_pocket_max', 'family_out_of_pocket_max'],
+    'coverageDetails': ['coverage_details'],
+    'Emergency Room': ['emergency_room_copay'],
+    'Inpatient Hospitalization': ['inpatient_hospitalization'],
+    'Mental Health Counseling': ['mental_health_coverage'],
+    'Outpatient Surgery': ['outpatient_surgery'],
+    'Primary Care Visits': ['primary_care_copay'],
+    'Specialist Visits': ['specialist_copay'],
+}
+SUMMARY_BENEFIT_FIELDS = [field for fields in PLAN_BENEFIT_FIELDS.values() for field in fields]
+
+def plan_benefit_sources(sources, doc_data):
+    """{benefits key or copay service: [{chunk_id, page}]} for the fields of /summarize that were found"""
+    pages = doc_data.get('chunk_pages')
+    traced = {}
+    for key, fields in PLAN_BENEFIT_FIELDS.items():
+        chunk_ids = list(dict.fromkeys(chunk_id for field in fields for chunk_id in sources.get(field, [])))
+        if chunk_ids:
+            traced[key] = [{'chunk_id': chunk_id, 'page': pages[chunk_id] if pages else None} for chunk_id in chunk_ids]
+    return traced
+
+def plan_benefits(values):
+    """/summarize's benefits object from extracted benefit fields, leaving out the ones not found"""
+    benefits = {}
+    for key in ('deductible', 'outOfPocketMax'):
+        individual, family = (values.get(field) for field in PLAN_BENEFIT_FIELDS[key])
+        if individual and family:
+            benefits[key] = individual if individual == family else f"{individual} individual / {family} family"
+        elif individual or family:
+            benefits[key] = f"{individual} individual" if individual else f"{family} family"
+    if values.get('coverage_details'):
+        benefits['coverageDetails'] = values['coverage_details']
+    copays = {
+        service: values[fields[0]] for service, fields in PLAN_BENEFIT_FIELDS.items()
+        if service not in ('deductible', 'outOfPocketMax', 'coverageDetails') and values.get(fields[0])
+    }
+    if copays:
+        benefits['copaysAndCoinsurance'] = copays
+    return benefits
+
 @app.route('/summarize', methods=['POST'])
 @login_required
 def summarize_plan():
     user_id = get_user_id()
-    init_user_data(user_id)  # Initialize user data structure
     
     data = request.json
     if not data or 'filename' not in data:
         return jsonify({'error': 'No filename provided'}), 400
         
     filename = data['filename']
-    if filename not in user_data[user_id]['document_vectors']:
+    doc_data = user_store.get_document(user_id, filename)
+    if doc_data is None:
         return jsonify({'error': 'File not found'}), 404
         
     try:
-        full_text = user_data[user_id]['document_vectors'][filename]['full_text']
-        
-        # Generate benefits using LLM
-        benefits_prompt = """
-        Analyze this insurance document and extract key benefits information.
-        Return a JSON object with the following structure:
-        {
-            "deductible": "Amount or 'Not specified'",
-            "outOfPocketMax": "Amount or 'Not specified'",
-            "coverageDetails": ["List of key coverage points"],
-            "copaysAndCoinsurance": {
-                "Emergency Room": "Cost or percentage",
-                "Inpatient Hospitalization": "Cost or percentage",
-                "Mental Health Counseling": "Cost or percentage",
-                "Outpatient Surgery": "Cost or percentage",
-                "Primary Care Visits": "Cost or percentage",
-                "Specialist Visits": "Cost or percentage"
-            }
-        }
+        full_text = doc_data['full_text']
         
-        Only include fields where information is explicitly found in the document.
-        For any cost/percentage, format it clearly (e.g., "$30 copay" or "20% coinsurance").
-        If a value is not found in the document, omit that field entirely.
-        """
-        
-        benefits_response = llm.invoke(benefits_prompt + "\n\n" + full_text)
-        benefits = json.loads(str(benefits_response.content))
-        
-        # Clean up the benefits object to remove any null or undefined values
-        if 'copaysAndCoinsurance' in benefits:
-            benefits['copaysAndCoinsurance'] = {
-                k: v for k, v in benefits['copaysAndCoinsurance'].items()
-                if v and v.lower() not in ['not specified', 'not found', 'null', 'undefined', 'none']
-            }
-            if not benefits['copaysAndCoinsurance']:
-                del benefits['copaysAndCoinsurance']
-                
-        if 'coverageDetails' in benefits:
-            benefits['coverageDetails'] = [
-                detail for detail in benefits['coverageDetails']
-                if detail and detail.lower() not in ['not specified', 'not found', 'null', 'undefined', 'none']
-            ]
-            if not benefits['coverageDetails']:
-                del benefits['coverageDetails']
-                
-        for key in ['deductible', 'outOfPocketMax']:
-            if key in benefits and (not benefits[key] or 
-                                  benefits[key].lower() in ['not specified', 'not found', 'null', 'undefined', 'none']):
-                del benefits[key]
-
         # Generate a human-readable summary
         summary_prompt = """
         Create a clear, concise summary of this insurance plan. Focus on:
@@ -722,11 +1627,41 @@ def summarize_plan():
         Keep it to 2-3 paragraphs maximum.
         """
         
-        summary_response = llm.invoke(summary_prompt + "\n\n" + full_text)
-        summary = str(summary_response.content)
+        # Map: summarize every group of the document in parallel. The benefits are read by the
+        # SBC rules, plus one LLM call on the chunks retrieved for any fields they miss, alongside.
+        groups = split_into_groups(full_text)
+        def run(task):
+            if task is None:
+                return extract_benefit_values(full_text, SUMMARY_BENEFIT_FIELDS, site='summarize_benefits',
+                                              chunks=doc_data['chunks'], bm25=get_bm25_index(user_id, filename, doc_data))
+            return invoke_llm(summary_prompt + "\n\n" + task, site='summarize_summary')
+        with stage('map'):
+            results = map_groups(run, [None] + groups)
+        values, sources = results[0]
+        benefits = plan_benefits(values)
+        summary_responses = results[1:]
+        
+        if len(summary_responses) == 1:
+            summary = str(summary_responses[0].content)
+        else:
+            partial_summaries = "\n\n".join(
+                f"Part {i}:\n{response.content}" for i, response in enumerate(summary_responses, 1)
+            )
+            reduce_prompt = """
+            These are summaries of consecutive parts of one insurance plan document.
+            Combine them into a single clear, concise summary of the whole plan, focusing on
+            the most important coverage details, key benefits and limitations, and notable provisions.
+            
+            Make it easy to understand for someone not familiar with insurance terminology.
+            Keep it to 2-3 paragraphs maximum. Do not mention the parts.
+            """
+            with stage('reduce'):
+                summary_response = invoke_llm(reduce_prompt + "\n\n" + partial_summaries, site='summarize_summary')
+            summary = str(summary_response.content)
         
         return jsonify({
             'benefits': benefits,
+            'sources': plan_benefit_sources(sources, doc_data),
             'summary': summary
         })
         
@@ -750,9 +1685,15 @@ def download_file(filename):
 @login_required
 def export_report():
     """Generate and export a PDF report of the Q&A session"""
+    # reportlab is only needed here and in generate_pdf_report, so it is not imported at startup
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    
     user_id = get_user_id()
+    conversations = user_store.get_conversations(user_id)
     
-    if not user_data[user_id]['conversations']:
+    if not conversations:
         return jsonify({'error': 'No Q&A history to export'}), 404
 
     try:
@@ -828,7 +1769,7 @@ def export_report():
             story.append(Spacer(1, 20))
         
         # Add conversations
-        for i, entry in enumerate(user_data[user_id]['conversations'], 1):
+        for i, entry in enumerate(conversations, 1):
             # Question section
             story.append(Paragraph(
                 f"Question {i}:",
@@ -868,7 +1809,7 @@ def export_report():
             story.append(Spacer(1, 20))
             
             # Add a divider between QA pairs (except for the last one)
-            if i < len(user_data[user_id]['conversations']):
+            if i < len(conversations):
                 story.append(Paragraph(
                     "_" * 50,  # Simple line divider
                     normal_style
@@ -876,7 +1817,8 @@ def export_report():
                 story.append(Spacer(1, 20))
         
         # Build the PDF
-        doc.build(story)
+        with stage('render_pdf'):
+            doc.build(story)
         
         return jsonify({
             'message': 'Report generated successfully',
@@ -892,78 +1834,81 @@ def export_report():
 def get_user_files():
     """Get list of files uploaded by the user"""
     user_id = get_user_id()
-    init_user_data(user_id)  # Initialize user data structure
     
-    files = list(user_data[user_id]['document_vectors'].keys())
+    files = user_store.list_documents(user_id)
     return jsonify({'files': files})
 
+# Concurrency limits for /api/compare-plans
+COMPARE_MAX_WORKERS = int(os.getenv('COMPARE_MAX_WORKERS', '3'))
+# Process pool for PDF/DOCX parsing, created on first use and reused
+compare_process_pool = Lazy(lambda: new_process_pool(min(COMPARE_MAX_WORKERS, os.cpu_count() or 1)))
+
 @app.route('/api/compare-plans', methods=['POST'])
 @login_required
 def compare_plans():
     """Compare multiple insurance plans"""
     user_id = get_user_id()
-    init_user_data(user_id)
 
     if 'file0' not in request.files:
         return jsonify({'error': 'No files provided'}), 400
 
-    results = []
+    plans = []
     temp_files = []
 
     try:
-        # Process each file
+        # Save every file first; request data is only available on this thread
         file_index = 0
         while f'file{file_index}' in request.files and f'label{file_index}' in request.form:
             file = request.files[f'file{file_index}']
             label = request.form[f'label{file_index}']
             
             if file and allowed_file(file.filename):
-                # Save and process the file
                 filename = secure_filename(file.filename)
-                temp_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(temp_path)
+                temp_path = os.path.join(app.config['UPLOAD_FOLDER'], f"compare_{uuid.uuid4().hex}_{filename}")
+                with stage('save'):
+                    file.save(temp_path)
                 temp_files.append(temp_path)
+                plans.append({'label': label, 'filename': filename, 'path': temp_path})
+
+            file_index += 1
 
-                # Convert DOCX to PDF if needed
-                if filename.lower().endswith('.docx'):
-                    pdf_path = convert_docx_to_pdf(temp_path)
-                    temp_files.append(pdf_path)
-                    temp_path = pdf_path
+        # CPU-bound text extraction runs in worker processes, one file each
+        with stage('extract'):
+            texts = list(compare_process_pool.get().map(extract_document_text, [plan['path'] for plan in plans]))
 
-                # Extract text and validate
-                text = extract_text_from_pdf(temp_path)
+        with stage('validate'):
+            for plan, text in zip(plans, texts):
                 if not is_insurance_document(text):
-                    return jsonify({'error': f'File {label} is not a valid insurance document'}), 400
-
-                # Process the document - but don't store in user_data
-                doc_data = process_document(text)
-
-                # Extract benefits summary
-                summary = extract_benefits_summary(text)
-                results.append({
-                    'label': label,
-                    'filename': filename,
-                    'summary': {
-                        'deductibles': {
-                            'individual': summary.get('individual_deductible', ''),
-                            'family': summary.get('family_deductible', '')
-                        },
-                        'outOfPocketMax': {
-                            'individual': summary.get('individual_out_of_pocket_max', ''),
-                            'family': summary.get('family_out_of_pocket_max', '')
-                        },
-                        'copays': {
-                            'primaryCare': summary.get('primary_care_copay', ''),
-                            'specialist': summary.get('specialist_copay', ''),
-                            'emergencyRoom': summary.get('emergency_room_copay', ''),
-                            'urgentCare': summary.get('urgent_care_copay', '')
-                        },
-                        'prescriptionCoverage': summary.get('prescription_coverage', ''),
-                        'mentalHealthCoverage': summary.get('mental_health_coverage', '')
-                    }
-                })
+                    return jsonify({'error': f"File {plan['label']} is not a valid insurance document"}), 400
 
-            file_index += 1
+        # LLM benefit extraction is I/O bound, so a bounded thread pool runs the plans side by side
+        with stage('extract_benefits'), ThreadPoolExecutor(max_workers=max(1, min(COMPARE_MAX_WORKERS, len(texts)))) as pool:
+            summaries = list(pool.map(extract_benefits_summary, texts))
+
+        results = []
+        for plan, summary in zip(plans, summaries):
+            results.append({
+                'label': plan['label'],
+                'filename': plan['filename'],
+                'summary': {
+                    'deductibles': {
+                        'individual': summary.get('individual_deductible', ''),
+                        'family': summary.get('family_deductible', '')
+                    },
+                    'outOfPocketMax': {
+                        'individual': summary.get('individual_out_of_pocket_max', ''),
+                        'family': summary.get('family_out_of_pocket_max', '')
+                    },
+                    'copays': {
+                        'primaryCare': summary.get('primary_care_copay', ''),
+                        'specialist': summary.get('specialist_copay', ''),
+                        'emergencyRoom': summary.get('emergency_room_copay', ''),
+                        'urgentCare': summary.get('urgent_care_copay', '')
+                    },
+                    'prescriptionCoverage': summary.get('prescription_coverage', ''),
+                    'mentalHealthCoverage': summary.get('mental_health_coverage', '')
+                }
+            })
 
         return jsonify(results)
 
@@ -988,18 +1933,6 @@ def serve(path):
     else:
         return send_from_directory(app.static_folder, 'index.html')
 
-def extract_text_from_pdf(pdf_path):
-    """Extract text from a PDF file."""
-    try:
-        text = ""
-        with fitz.open(pdf_path) as doc:
-            for page in doc:
-                text += page.get_text()
-        return text
-    except Exception as e:
-        print(f"Error extracting text from PDF: {str(e)}")
-        return ""
-
 def extract_benefits_summary(text):
     """Extract benefits summary from the document text."""
     try:
@@ -1056,6 +1989,8 @@ def process_document(text, chunk_size=500, chunk_overlap=50):
         sanitized_text = sanitize_text(text)
         
         # Split text into chunks
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        from langchain.docstore.document import Document
         text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
@@ -1069,7 +2004,8 @@ def process_document(text, chunk_size=500, chunk_overlap=50):
         docs = [Document(page_content=chunk) for chunk in chunks]
         
         # Create embeddings for the chunks
-        vectorstore = FAISS.from_documents(docs, embeddings)
+        from langchain_community.vectorstores import FAISS
+        vectorstore = FAISS.from_documents(docs, embeddings.get())
         
         return {
             'chunks': chunks,
@@ -1082,6 +2018,25 @@ def process_document(text, chunk_size=500, chunk_overlap=50):
             'embeddings': None
         }
 
+def warm_up():
+    """Build the lazily created clients and import the modules requests load on
+    first use, so the first request of a worker does not pay for them.
+
+    Call it from a server hook (e.g. gunicorn's post_worker_init), or set
+    WARM_UP=1 to run it in a background thread once the app is imported.
+    """
+    start = time.perf_counter()
+    for client in lazy_clients:
+        client.get()
+    import langchain.text_splitter  # noqa: F401  for chunking uploads
+    import fitz  # noqa: F401  PyMuPDF, for uploads
+    import docx  # noqa: F401
+    import reportlab.platypus  # noqa: F401  for /export-report
+    record_stage('warm_up', time.perf_counter() - start, endpoint='startup')
+
+if os.getenv('WARM_UP', '0') == '1':
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
 if __name__ == '__main__':
     os.makedirs('./flask_session', exist_ok=True)
     app.run(debug=True)
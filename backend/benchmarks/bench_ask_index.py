@@ -0,0 +1,102 @@
+# backend/benchmarks/bench_ask_index.py
+"""
+Per-question retrieval cost of /ask as the document grows.
+
+Compares the old behaviour (FAISS rebuilt from every chunk on each question)
+with the persistent per-document index. Embeddings are a local counting
+stand-in so no API calls are made.
+
+Run from the backend folder:
+    python -m benchmarks.bench_ask_index
+"""
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+from langchain.docstore.document import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from rag.document_index import build_document_index
+from typing import List
+import hashlib
+import time
+
+QUESTIONS = [
+    "What is my deductible?",
+    "How much is an emergency room visit?",
+    "Is mental health covered?",
+    "What is the out-of-pocket maximum for a family?",
+    "Do I need a referral to see a specialist?",
+]
+
+SBC_PARAGRAPH = (
+    "The overall deductible is $1,500 individual / $3,000 family. Specialist visit "
+    "copay is $50 in-network and 40% coinsurance out-of-network. Emergency room care "
+    "costs $250 copay per visit. Preventive care is covered with no charge in-network. "
+)
+
+
+class CountingEmbeddings(Embeddings):
+    """Deterministic hash vectors that count how many texts were embedded."""
+
+    def __init__(self, dim: int = 64):
+        self.dim = dim
+        self.texts_embedded = 0
+
+    def _vector(self, text: str) -> List[float]:
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [digest[i % len(digest)] / 255.0 for i in range(self.dim)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.texts_embedded += len(texts)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.texts_embedded += 1
+        return self._vector(text)
+
+
+def make_chunks(pages: int) -> List[str]:
+    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+    text = "\n\n".join(f"Page {p}. " + SBC_PARAGRAPH * 6 for p in range(pages))
+    return splitter.split_text(text)
+
+
+def rebuild_per_question(chunks: List[str], embeddings: CountingEmbeddings):
+    for question in QUESTIONS:
+        documents = [
+            Document(page_content=chunk, metadata={"source": "plan.pdf", "chunk_id": i})
+            for i, chunk in enumerate(chunks)
+        ]
+        vectorstore = FAISS.from_documents(documents, embeddings)
+        vectorstore.similarity_search(question, k=3)
+
+
+def persistent_index(vectorstore: FAISS):
+    for question in QUESTIONS:
+        vectorstore.similarity_search(question, k=3)
+
+
+def main():
+    print(f"{'pages':>6} {'chunks':>7} | {'rebuild texts/q':>16} {'rebuild ms/q':>13} | {'index texts/q':>14} {'index ms/q':>11}")
+    for pages in (5, 20, 40, 80, 160):
+        chunks = make_chunks(pages)
+
+        old = CountingEmbeddings()
+        start = time.perf_counter()
+        rebuild_per_question(chunks, old)
+        old_ms = (time.perf_counter() - start) * 1000 / len(QUESTIONS)
+
+        new = CountingEmbeddings()
+        # Upload-time cost, paid once per document
+        vectorstore = build_document_index(chunks, new.embed_documents(chunks), "plan.pdf", new)
+        new.texts_embedded = 0
+        start = time.perf_counter()
+        persistent_index(vectorstore)
+        new_ms = (time.perf_counter() - start) * 1000 / len(QUESTIONS)
+
+        print(
+            f"{pages:>6} {len(chunks):>7} | {old.texts_embedded / len(QUESTIONS):>16.1f} {old_ms:>13.2f} | "
+            f"{new.texts_embedded / len(QUESTIONS):>14.1f} {new_ms:>11.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+# backend/benchmarks/bench_benefit_extraction.py
+"""
+Accuracy, latency and prompt size of benefit extraction on sample SBCs.
+
+For each labelled sample document, compares the rule-based extractor
+(utils/benefit_rules.py) with asking the LLM for every field from the full
+text, with asking it for every field from the chunks retrieved per field
+("scoped"), and with the hybrid the app uses (rules, then a scoped prompt for
+the fields they miss). A field counts as correct when every amount,
+percentage or "No charge" in the label appears in the extracted value;
+"evidence" counts the fields whose retrieved chunks contain their label.
+The last sample pads an SBC to 100 pages with an unrelated regulation, to
+show how prompt size scales with document length. Tokens are estimated as
+characters / 4.
+
+Without --llm only the rules and retrieval run. --llm fake adds the offline
+stand-in with a simulated --llm-latency-ms; --llm openai calls the real model
+(needs OPENAI_API_KEY) and also scores its answers.
+
+Run from the backend folder:
+    python -m benchmarks.bench_benefit_extraction [--llm fake|openai]
+"""
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from rag.hybrid_search import BM25Index
+from utils.benefit_rules import (
+    BENEFIT_FIELDS,
+    build_fallback_prompt,
+    extract_benefit_fields,
+    field_excerpts,
+    parse_fallback_response,
+    retrieve_field_chunks,
+)
+from utils.text_extraction import PAGE_SEPARATOR, extract_document, extract_document_text
+import argparse
+import re
+import statistics
+import time
+
+# In-network values, read off each document by hand; None means the document does not say
+SBC_NETWORK = {
+    "individual_deductible": "$500",
+    "family_deductible": "$1,000",
+    "individual_out_of_pocket_max": "$2,500",
+    "family_out_of_pocket_max": "$5,000",
+    "primary_care_copay": "$35 copay/office visit and 20% coinsurance for other outpatient services",
+    "specialist_copay": "$50 copay/visit",
+    "emergency_room_copay": "20% coinsurance",
+    "urgent_care_copay": "$30 copay/visit",
+    "prescription_coverage": "$10 generic, $30 preferred brand, 40% non-preferred brand, 50% specialty",
+    "mental_health_coverage": "$35 copay/office visit and 20% coinsurance",
+    "inpatient_hospitalization": "20% coinsurance",
+    "outpatient_surgery": "$100/day copay",
+}
+SAMPLES = {
+    "pdfs/Sample-Completed-SBC-Accessible-Format 060723_0.pdf": SBC_NETWORK,
+    # Same plan with an Indian Health Care Provider column before the network one
+    "pdfs/AIAN-Limited-Cost-Sharing 060723.pdf": SBC_NETWORK,
+    "pdfs/AIAN-Zero-Cost-Sharing 060723_0.pdf": {
+        "individual_deductible": "$0",
+        "family_deductible": "$0",
+        "individual_out_of_pocket_max": "Not applicable",
+        "family_out_of_pocket_max": "Not applicable",
+        "primary_care_copay": "No charge",
+        "specialist_copay": "No charge",
+        "emergency_room_copay": "No charge",
+        "urgent_care_copay": "No charge",
+        "prescription_coverage": "No charge",
+        "mental_health_coverage": "No charge",
+        "inpatient_hospitalization": "No charge",
+        "outpatient_surgery": "No charge",
+    },
+    # A one-page coverage summary in "Label: value" list form rather than an SBC chart
+    "uploads/1dc2f0a5-6df4-46b5-9e2a-5eb639477eb3_sample_health_ins_cov.pdf": {
+        "individual_deductible": "$1,000",
+        "family_deductible": "$2,500",
+        "individual_out_of_pocket_max": "$4,500",
+        "family_out_of_pocket_max": "$9,000",
+        "primary_care_copay": "$20 copay",
+        "specialist_copay": "$40 copay",
+        "emergency_room_copay": "$100 copay + 20% coinsurance",
+        "urgent_care_copay": None,
+        "prescription_coverage": "$10, $35, $70, 25% coinsurance",
+        "mental_health_coverage": "$30 copay/session",
+        "inpatient_hospitalization": "20% coinsurance",
+        "outpatient_surgery": "15% coinsurance",
+    },
+}
+PADDED_SAMPLE = "Sample SBC padded to 100 pages"
+PADDING_PDF = "pdfs/2024-07274.pdf"
+SAMPLES[PADDED_SAMPLE] = SBC_NETWORK
+
+# Narrative, so it is not scored
+SCORED_FIELDS = [field for field in BENEFIT_FIELDS if field != "coverage_details"]
+
+_COST = re.compile(r"\$\s?\d+(?:,\d{3})*(?:\.\d{2})?|\d+(?:\.\d+)?\s?%|no charge|not applicable", re.IGNORECASE)
+
+
+def cost_tokens(value) -> set:
+    return {" ".join(token.lower().replace("$ ", "$").split()) for token in _COST.findall(str(value or ""))}
+
+
+def is_correct(expected, value) -> bool:
+    if expected is None:
+        return not cost_tokens(value)
+    return bool(value) and cost_tokens(expected) <= cost_tokens(value)
+
+
+def accuracy(expected: dict, values: dict) -> int:
+    return sum(is_correct(expected.get(field), values.get(field)) for field in SCORED_FIELDS)
+
+
+def timed(fn, runs=1):
+    """(result of the last run, median seconds)"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times)
+
+
+def load_text(name):
+    if name != PADDED_SAMPLE:
+        return extract_document_text(name)
+    sbc = extract_document("pdfs/Sample-Completed-SBC-Accessible-Format 060723_0.pdf").pages
+    return PAGE_SEPARATOR.join(sbc + extract_document(PADDING_PDF).pages[:100 - len(sbc)])
+
+
+def chunk(text):
+    # Same splitting as the app's chunk_text()
+    return RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50).split_text(text)
+
+
+def estimate_tokens(prompt):
+    return len(prompt) // 4
+
+
+def full_prompt(text):
+    return build_fallback_prompt(list(BENEFIT_FIELDS), text)
+
+
+def scoped_prompt(fields, chunks, candidates):
+    return build_fallback_prompt(fields, field_excerpts(chunks, {field: candidates[field] for field in fields}))
+
+
+def ask(llm, prompt, fields):
+    return parse_fallback_response(str(llm.invoke(prompt).content), fields)
+
+
+def hybrid(llm, text, chunks, bm25):
+    values = extract_benefit_fields(text)
+    candidates = retrieve_field_chunks(bm25, BENEFIT_FIELDS)
+    missing = [field for field in BENEFIT_FIELDS if field not in values and candidates[field]]
+    if missing:
+        values.update(ask(llm, scoped_prompt(missing, chunks, candidates), missing))
+    return values
+
+
+def evidence(expected, chunks, candidates):
+    """Fields (with a label) whose retrieved chunks contain every cost in the label"""
+    found = 0
+    for field in SCORED_FIELDS:
+        label = expected.get(field)
+        if label is not None:
+            retrieved = " ".join(chunks[chunk_id] for chunk_id in candidates[field])
+            found += cost_tokens(label) <= cost_tokens(retrieved)
+    return found, sum(expected.get(field) is not None for field in SCORED_FIELDS)
+
+
+def create_llm(kind, latency_ms):
+    if kind == "fake":
+        from llm.fakes import FakeChatModel
+        return FakeChatModel(latency=latency_ms / 1000)
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm", choices=["fake", "openai"], help="also time (and for openai, score) the LLM paths")
+    parser.add_argument("--llm-latency-ms", type=float, default=1500.0, help="simulated latency of --llm fake")
+    parser.add_argument("--runs", type=int, default=20, help="rule runs per document; the median is reported")
+    args = parser.parse_args()
+    llm = create_llm(args.llm, args.llm_latency_ms) if args.llm else None
+    scored = args.llm == "openai"
+    fields = list(BENEFIT_FIELDS)
+
+    header = (f"{'document':<36} {'chunks':>6} {'rules ms':>8} {'correct':>8} {'to LLM':>6} {'evidence':>8} "
+              f"| {'full tok':>8} {'scoped tok':>10} {'hybrid tok':>10}")
+    if llm:
+        header += f" | {'full ms':>7} {'scoped ms':>9} {'hybrid ms':>9}"
+        if scored:
+            header += f" | {'full ok':>7} {'scoped ok':>9} {'hybrid ok':>9}"
+    print(header)
+
+    totals = dict.fromkeys(["fields", "rules", "full", "scoped", "hybrid"], 0)
+    for name, expected in SAMPLES.items():
+        text = load_text(name)
+        chunks = chunk(text)
+        bm25 = BM25Index(chunks)
+        values, rules_seconds = timed(lambda: extract_benefit_fields(text), args.runs)
+        candidates = retrieve_field_chunks(bm25, fields)
+        missing = [field for field in fields if field not in values and candidates[field]]
+        found, labelled = evidence(expected, chunks, candidates)
+        correct = accuracy(expected, values)
+        totals["fields"] += len(SCORED_FIELDS)
+        totals["rules"] += correct
+
+        prompts = {
+            "full": full_prompt(text),
+            "scoped": scoped_prompt(fields, chunks, candidates),
+            "hybrid": scoped_prompt(missing, chunks, candidates) if missing else "",
+        }
+        row = (f"{name.split('/')[-1][:36]:<36} {len(chunks):>6} {rules_seconds * 1000:>8.2f} "
+               f"{correct:>4}/{len(SCORED_FIELDS):<3} {len(missing):>6} {found:>4}/{labelled:<3} "
+               f"| {estimate_tokens(prompts['full']):>8} {estimate_tokens(prompts['scoped']):>10} "
+               f"{estimate_tokens(prompts['hybrid']):>10}")
+        if llm:
+            results = {
+                "full": timed(lambda: ask(llm, prompts["full"], fields)),
+                "scoped": timed(lambda: ask(llm, prompts["scoped"], fields)),
+                "hybrid": timed(lambda: hybrid(llm, text, chunks, bm25)),
+            }
+            row += " | " + " ".join(f"{results[path][1] * 1000:>{width}.0f}"
+                                    for path, width in [("full", 7), ("scoped", 9), ("hybrid", 9)])
+            if scored:
+                row += " |"
+                for path, width in [("full", 3), ("scoped", 5), ("hybrid", 5)]:
+                    path_correct = accuracy(expected, results[path][0])
+                    totals[path] += path_correct
+                    row += f" {path_correct:>{width}}/{len(SCORED_FIELDS):<3}"
+        print(row)
+        for field in SCORED_FIELDS:
+            if not is_correct(expected.get(field), values.get(field)):
+                print(f"  rules miss {field}: got {values.get(field)!r}, expected {expected.get(field)!r}")
+
+    print(f"\nrules accuracy: {totals['rules']}/{totals['fields']} fields")
+    if scored:
+        print(f"LLM accuracy: full text {totals['full']}/{totals['fields']}, scoped {totals['scoped']}/{totals['fields']}, "
+              f"hybrid {totals['hybrid']}/{totals['fields']}")
+
+
+if __name__ == "__main__":
+    main()
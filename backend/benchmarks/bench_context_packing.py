@@ -0,0 +1,99 @@
+# backend/benchmarks/bench_context_packing.py
+"""
+Context size and answer coverage of /ask contexts: fixed top-k vs packed.
+
+For each question about the sample SBC, ranks chunks with BM25 the way the
+lexical retrieval mode does and builds the prompt context from the top 3
+chunks (the old fixed k) and with pack_context() at several token budgets.
+"coverage" counts the facts the answer needs (amounts, percentages, key
+phrases, read off the document by hand) that appear in the context; "tok" is
+the context size from count_tokens().
+
+Run from the backend folder:
+    python -m benchmarks.bench_context_packing [--budgets 400 500 600]
+"""
+from langchain.docstore.document import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from rag.context_packer import count_tokens, pack_context
+from rag.hybrid_search import BM25Index
+from utils.text_extraction import extract_document_text
+import argparse
+
+SAMPLE = "pdfs/Sample-Completed-SBC-Accessible-Format 060723_0.pdf"
+# (question, facts a complete answer needs)
+QUESTIONS = [
+    ("What is the overall deductible?", ["$500", "$1,000"]),
+    ("Is acupuncture covered?", ["acupuncture"]),
+    ("What does an emergency room visit cost?", ["emergency room care", "20% coinsurance"]),
+    ("How much are generic drugs?", ["generic drugs", "$10 copay"]),
+    ("Compare in-network vs out-of-network specialist visit costs", ["specialist visit", "$50 copay", "40% coinsurance"]),
+    ("What is the out-of-pocket limit for in-network and out-of-network providers?",
+     ["$2,500", "$5,000", "$4,000", "$8,000"]),
+    ("What do I pay for outpatient surgery, both the facility fee and the surgeon?",
+     ["facility fee", "$100/day", "physician/surgeon fees"]),
+    ("What are all the costs if I have a baby?", ["having a baby", "delivery", "$12,700"]),
+    ("Which services need pre-authorization?", ["preauthorization"]),
+    ("What is not covered by this plan?", ["cosmetic surgery", "dental care", "long-term care"]),
+]
+FIXED_K = 3
+CANDIDATES = 8
+
+
+def normalize(text):
+    return " ".join(text.lower().replace("-", "").split())
+
+
+def coverage(facts, context):
+    context = normalize(context)
+    return sum(normalize(fact) in context for fact in facts)
+
+
+def candidates(bm25, chunks, question, k):
+    """Best-first Documents with the relevance retrieve_lexical() gives them"""
+    ranked = bm25.search(question, k=k)
+    top_score = ranked[0][1] if ranked else 0.0
+    return [Document(page_content=chunks[chunk_id],
+                     metadata={"source": SAMPLE, "chunk_id": chunk_id,
+                               "relevance": score / top_score if top_score else 1.0})
+            for chunk_id, score in ranked]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budgets", type=int, nargs="+", default=[400, 500, 600])
+    args = parser.parse_args()
+
+    # Same splitting as the app's chunk_text()
+    chunks = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50).split_text(extract_document_text(SAMPLE))
+    bm25 = BM25Index(chunks)
+    columns = [f"top-{FIXED_K}"] + [f"packed {budget}" for budget in args.budgets]
+
+    print(f"{'question':<44} " + " ".join(f"{column:>18}" for column in columns))
+    print(f"{'':<44} " + " ".join(f"{'chunks cover   tok':>18}" for _ in columns))
+    totals = {column: [0, 0, 0] for column in columns}
+    facts_total = 0
+    for question, facts in QUESTIONS:
+        ranked = candidates(bm25, chunks, question, CANDIDATES)
+        contexts = {f"top-{FIXED_K}": (ranked[:FIXED_K], "\n\n".join(doc.page_content for doc in ranked[:FIXED_K]))}
+        for budget in args.budgets:
+            packed = pack_context(ranked, token_budget=budget)
+            contexts[f"packed {budget}"] = (packed.documents, packed.text)
+        cells = []
+        for column in columns:
+            documents, text = contexts[column]
+            covered, tokens = coverage(facts, text), count_tokens(text)
+            totals[column][0] += len(documents)
+            totals[column][1] += covered
+            totals[column][2] += tokens
+            cells.append(f"{len(documents):>6} {covered:>2}/{len(facts):<2} {tokens:>5}")
+        facts_total += len(facts)
+        print(f"{question[:44]:<44} " + " ".join(f"{cell:>18}" for cell in cells))
+
+    print(f"{'total':<44} " + " ".join(
+        f"{chunks_used:>6} {covered:>2}/{facts_total:<2} {tokens:>5}".rjust(18)
+        for chunks_used, covered, tokens in totals.values()
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# backend/benchmarks/bench_retrieval.py
+"""
+Recall@3 and latency of /ask retrieval in lexical, vector and hybrid modes.
+
+Questions about the sample SBC are labelled with a phrase from the answer;
+a question is recalled if any of the top 3 chunks contains that phrase.
+Vector search uses the offline hashing embeddings by default (--openai uses
+the real ones) with a simulated query-embedding round trip, so the latency
+column shows what skipping the embedding call saves.
+
+Run from the backend folder:
+    python -m benchmarks.bench_retrieval --embedding-latency-ms 150
+"""
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.embeddings import Embeddings
+import argparse
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from llm.fakes import FakeEmbeddings
+from rag.document_index import build_document_index
+from rag.hybrid_search import BM25Index, reciprocal_rank_fusion
+from utils.text_extraction import extract_document
+
+DEFAULT_PDF = os.path.join(BACKEND_DIR, "pdfs", "Sample-Completed-SBC-Accessible-Format 060723_0.pdf")
+
+# (question, phrase that appears in a chunk answering it)
+LABELLED_QUESTIONS = [
+    ("What is the overall deductible?", "$500 / individual or $1,000 / family"),
+    ("Is the deductible $500?", "$500 / individual"),
+    ("What is the out-of-pocket limit for this plan?", "$2,500 individual / $5,000 family"),
+    ("How much is a specialist visit?", "$50 copay/visit"),
+    ("Do I need a referral to see a specialist?", "referral before you see the specialist"),
+    ("What is the ER copay?", "Emergency room care"),
+    ("How much does urgent care cost?", "$30 copay/visit"),
+    ("What do generic drugs cost?", "Generic drugs (Tier 1)"),
+    ("Is there a separate deductible for prescription drugs?", "$300 for prescription drug"),
+    ("How much do I pay for imaging like an MRI?", "Imaging (CT/PET scans"),
+    ("Does the plan cover cosmetic surgery?", "Cosmetic surgery"),
+    ("Is acupuncture covered?", "Acupuncture"),
+    ("How many home health care visits are covered per year?", "Home health care"),
+    ("What does a children's eye exam cost?", "eye exam"),
+    ("What would Peg pay for having a baby?", "The total Peg would pay"),
+    ("How much is the copay for a primary care visit?", "$35 copay/office visit"),
+    ("What is the cost for an outpatient surgery facility fee?", "$100/day copay"),
+    ("Is preauthorization required for hospice?", "Hospice services"),
+    ("What does a diagnostic x-ray cost?", "$10 copay/test"),
+    ("How do I file a grievance or appeal?", "Grievance and Appeals"),
+    ("Does this plan provide minimum essential coverage?", "Minimum Essential Coverage? Yes"),
+    ("What is OMB control number 0938-1146?", "0938-1146"),
+]
+
+
+class DelayedEmbeddings(Embeddings):
+    """Adds a fixed round trip to every query embedding, like a remote embeddings API"""
+
+    def __init__(self, wrapped, latency):
+        self.wrapped = wrapped
+        self.latency = latency
+
+    def embed_documents(self, texts):
+        return self.wrapped.embed_documents(texts)
+
+    def embed_query(self, text):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.wrapped.embed_query(text)
+
+
+def squash(text):
+    return " ".join(text.split())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default=DEFAULT_PDF)
+    parser.add_argument("--embedding-latency-ms", type=float, default=150.0)
+    parser.add_argument("--candidates", type=int, default=10)
+    parser.add_argument("--fast-path-confidence", type=float, default=0.9)
+    parser.add_argument("--openai", action="store_true", help="use OpenAIEmbeddings instead of the offline ones")
+    args = parser.parse_args()
+
+    text = extract_document(args.pdf).text
+    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50, length_function=len,
+                                              separators=["\n\n", "\n", " ", ""])
+    chunks = splitter.split_text(text)
+    squashed = [squash(chunk) for chunk in chunks]
+
+    if args.openai:
+        from langchain_openai import OpenAIEmbeddings
+        base_embeddings = OpenAIEmbeddings()
+    else:
+        base_embeddings = FakeEmbeddings()
+    embeddings = DelayedEmbeddings(base_embeddings, 0 if args.openai else args.embedding_latency_ms / 1000)
+    vectorstore = build_document_index(chunks, base_embeddings.embed_documents(chunks), "plan.pdf", embeddings)
+    bm25 = BM25Index(chunks)
+
+    def lexical(question):
+        return [chunk_id for chunk_id, _ in bm25.search(question, k=3)]
+
+    def vector(question):
+        return [doc.metadata["chunk_id"] for doc in vectorstore.similarity_search(question, k=3)]
+
+    def hybrid(question, fast_path=True):
+        lexical_results = bm25.search(question, k=args.candidates)
+        if fast_path and lexical_results and bm25.confidence(question, lexical_results[:3]) >= args.fast_path_confidence:
+            return [chunk_id for chunk_id, _ in lexical_results[:3]], True
+        vector_ids = [doc.metadata["chunk_id"] for doc in vectorstore.similarity_search(question, k=args.candidates)]
+        fused = reciprocal_rank_fusion([vector_ids, [chunk_id for chunk_id, _ in lexical_results]])
+        return fused[:3], False
+
+    modes = {
+        "lexical": lambda q: (lexical(q), False),
+        "vector": lambda q: (vector(q), False),
+        "hybrid (RRF only)": lambda q: hybrid(q, fast_path=False),
+        "hybrid": hybrid,
+    }
+
+    print(f"{len(chunks)} chunks, {len(LABELLED_QUESTIONS)} labelled questions, "
+          f"{'OpenAI' if args.openai else 'offline hashing'} embeddings"
+          + ("" if args.openai else f" + {args.embedding_latency_ms:.0f} ms simulated query embedding"))
+    print(f"{'mode':<20} {'recall@3':>9} {'p50 ms':>8} {'mean ms':>8} {'no-embed':>9}")
+    for name, retrieve in modes.items():
+        hits, latencies, skipped = 0, [], 0
+        for question, phrase in LABELLED_QUESTIONS:
+            start = time.perf_counter()
+            chunk_ids, fast = retrieve(question)
+            latencies.append((time.perf_counter() - start) * 1000)
+            skipped += fast or name == "lexical"
+            hits += any(phrase in squashed[chunk_id] for chunk_id in chunk_ids)
+        print(f"{name:<20} {hits / len(LABELLED_QUESTIONS):>9.2f} {statistics.median(latencies):>8.2f} "
+              f"{statistics.mean(latencies):>8.2f} {skipped:>5}/{len(LABELLED_QUESTIONS)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# backend/benchmarks/bench_validation.py
+"""
+Which upload validation tier decides each sample document, and whether the
+local (regex) tiers decide it correctly.
+
+Every labelled sample is extracted and sanitized the way uploads are and run
+through regex_validation_tier(). The SBCs must be accepted locally or left to
+the LLM; the negatives (a Federal Register rule, CMS methodology and report
+documents and an FAQ about health plans, which share much of the insurance
+vocabulary of an SBC) must never be accepted locally. "llm" rows are the
+uploads that would pay for a validator call; no LLM is called here. Exits
+non-zero if any local decision is wrong.
+
+Run from the backend folder:
+    python -m benchmarks.bench_validation
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+
+from app import SBC_INDICATORS, insurance_indicator_score, regex_validation_tier, sanitize_text  # noqa: E402
+from utils.text_extraction import extract_document_text  # noqa: E402
+
+# file -> is it a health insurance document
+SAMPLES = {
+    "pdfs/Sample-Completed-SBC-Accessible-Format 060723_0.pdf": True,
+    "pdfs/AIAN-Limited-Cost-Sharing 060723.pdf": True,
+    "pdfs/AIAN-Zero-Cost-Sharing 060723_0.pdf": True,
+    "pdfs/2024-07274.pdf": False,
+    "pdfs/2018-2023 SBM Issuer-Level Enrollment PUF Methodology.pdf": False,
+    "pdfs/2025-qhp-premiums-choice-methodology.pdf": False,
+    "pdfs/2025-qhp-premiums-choice-report.pdf": False,
+    "pdfs/EHB-Benchmark-Coverage-of-COVID-19_0.pdf": False,
+}
+ROUNDS = 100
+
+
+def main():
+    print(f"{'document':<58} {'label':>8} {'score':>5} {'sbc':>3} {'tier':>13} {'us':>6}  verdict")
+    wrong = 0
+    tiers = {"regex_accept": 0, "regex_reject": 0, "llm": 0}
+    for path, expected in SAMPLES.items():
+        text = sanitize_text(extract_document_text(path))
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            tier, score = regex_validation_tier(text)
+        elapsed_us = (time.perf_counter() - start) / ROUNDS * 1e6
+        sbc_score, _ = insurance_indicator_score(text, SBC_INDICATORS)
+        tiers[tier] += 1
+
+        if tier == "llm":
+            verdict = "-"
+        elif (tier == "regex_accept") == expected:
+            verdict = "ok"
+        else:
+            verdict = "WRONG"
+            wrong += 1
+        label = "sbc" if expected else "negative"
+        print(f"{os.path.basename(path)[:58]:<58} {label:>8} {score:>5} {sbc_score:>3} {tier:>13} "
+              f"{elapsed_us:>6.0f}  {verdict}")
+
+    print(f"\nregex accept {tiers['regex_accept']}, regex reject {tiers['regex_reject']}, "
+          f"llm {tiers['llm']} of {len(SAMPLES)}; wrong local decisions: {wrong}")
+    return 1 if wrong else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
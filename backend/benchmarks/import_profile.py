@@ -0,0 +1,121 @@
+# backend/benchmarks/import_profile.py
+"""
+Startup import-time profile of the Flask app, as a regression check.
+
+Imports `app` in fresh interpreters with -X importtime, reports the total,
+the slowest direct imports and which heavy modules got loaded, and fails if
+startup exceeds the budget or a module that must stay lazy (OpenAI client,
+LangChain, pydantic, reportlab, PyMuPDF, ...) is imported at startup.
+
+The budget is on the whole process (interpreter start included), which is
+what a new worker pays: 900 ms, inside the one-second cold-start target with
+room for noisy hosts. It takes about 650-850 ms here, most of it Flask and
+flask_dance; langchain_core alone used to cost about 450 ms and is now only
+imported where the splitter, Documents and the embedding and callback
+wrappers are first built.
+
+Run from the backend folder:
+    python -m benchmarks.import_profile --output benchmarks/import_profile.txt
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use (or by app.warm_up()), never while a worker starts
+LAZY_MODULES = [
+    "langchain_openai",
+    "openai",
+    "langchain.chains",
+    "langchain_community.vectorstores",
+    "faiss",
+    "reportlab",
+    "pandas",
+    "fitz",
+    "docx",
+    "rag.rag_index",
+    "langchain",
+    "langchain_core",
+    "pydantic",
+]
+
+
+def profile_import(module, env):
+    """(wall seconds, [(self_us, cumulative_us, depth, name)]) of one cold import"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # "import time:  <self> | <cumulative> | <two spaces per nesting level><name>"
+        head, cumulative_us, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(head.split(":")[1]), int(cumulative_us), depth, name.strip()))
+    return wall, rows
+
+
+def module_time(rows, module):
+    return next(row[1] for row in rows if row[2] == 0 and row[3] == module)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--runs", type=int, default=5, help="cold imports; the fastest one is reported")
+    parser.add_argument("--budget-ms", type=float, default=900.0, help="fail above this process wall time")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    # The real startup path (OpenAI backend); nothing may call the API while importing
+    env.setdefault("OPENAI_API_KEY", "import-profile")
+    env.setdefault("LLM_BACKEND", "openai")
+    env.pop("WARM_UP", None)
+
+    runs = [profile_import(args.module, env) for _ in range(args.runs)]
+    wall, rows = min(runs, key=lambda run: run[0])
+    total_ms = module_time(rows, args.module) / 1000
+    loaded = {row[3] for row in rows}
+    eager = [name for name in LAZY_MODULES if name in loaded]
+
+    lines = [
+        f"import {args.module}: {total_ms:.0f} ms, process wall {wall * 1000:.0f} ms "
+        f"(budget {args.budget_ms:.0f} ms), fastest of {args.runs}, {len(rows)} modules",
+        "",
+        f"slowest direct imports of {args.module}:",
+        f"{'cumulative ms':>14} {'self ms':>8}  module",
+    ]
+    direct = sorted((row for row in rows if row[2] == 1), key=lambda row: row[1], reverse=True)
+    for self_us, cumulative_us, _, name in direct[:args.top]:
+        lines.append(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>8.1f}  {name}")
+    lines += ["", "modules that must stay lazy:"]
+    for name in LAZY_MODULES:
+        lines.append(f"  {'IMPORTED' if name in loaded else 'lazy':<9} {name}")
+
+    report = "\n".join(lines)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+
+    failures = []
+    if wall * 1000 > args.budget_ms:
+        failures.append(f"startup took {wall * 1000:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+    if eager:
+        failures.append(f"imported at startup: {', '.join(eager)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
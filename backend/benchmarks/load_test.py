@@ -0,0 +1,167 @@
+# backend/benchmarks/load_test.py
+"""
+End-to-end load test of the Flask app with offline LLM/embedding stand-ins.
+
+Each simulated user gets its own session (Google OAuth is bypassed) and runs
+upload -> ask x N -> summarize -> compare-plans. Latency percentiles and
+throughput are reported per endpoint. No network access is needed.
+
+Run from the backend folder:
+    python -m benchmarks.load_test --users 8 --iterations 3 --llm-latency-ms 200
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PDF = os.path.join(BACKEND_DIR, "pdfs", "Sample-Completed-SBC-Accessible-Format 060723_0.pdf")
+DEFAULT_COMPARE_PDF = os.path.join(BACKEND_DIR, "pdfs", "AIAN-Zero-Cost-Sharing 060723_0.pdf")
+
+QUESTIONS = [
+    "What is the overall deductible?",
+    "How much is an emergency room visit?",
+    "Do I need a referral to see a specialist?",
+    "What is the out-of-pocket limit for this plan?",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def load_app(args):
+    """Import the app with fake backends, isolated in a scratch working directory."""
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["FAKE_EMBEDDING_LATENCY_MS"] = str(args.embedding_latency_ms)
+    os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+    os.environ.setdefault("OPENAI_API_KEY", "offline")
+
+    workdir = tempfile.mkdtemp(prefix="coveredai-load-")
+    os.chdir(workdir)
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+    import app as backend
+    backend.app.config["LOGIN_DISABLED"] = True
+    backend.app.config["TESTING"] = True
+    return backend
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def timed(self, endpoint, fn):
+        start = time.perf_counter()
+        response = fn()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append(elapsed)
+            if response.status_code >= 400:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        return response
+
+
+def upload_and_wait(client, plan_bytes, filename, poll_interval=0.05):
+    """POST /upload and poll the ingestion job; returns the final status response."""
+    response = client.post(
+        "/upload",
+        data={"file": (io.BytesIO(plan_bytes), filename)},
+        content_type="multipart/form-data",
+    )
+    if response.status_code != 202:
+        return response
+    job_id = response.get_json()["job_id"]
+    while True:
+        status = client.get(f"/upload-status/{job_id}")
+        job = status.get_json()
+        if status.status_code != 200 or job["status"] == "done":
+            return status
+        if job["status"] == "failed":
+            status.status_code = job.get("status_code") or 500
+            return status
+        time.sleep(poll_interval)
+
+
+def simulated_user(backend, recorder, user_index, args):
+    client = backend.app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = f"load-user-{user_index}"
+
+    with open(args.pdf, "rb") as f:
+        plan_bytes = f.read()
+    with open(args.compare_pdf, "rb") as f:
+        compare_bytes = f.read()
+
+    for iteration in range(args.iterations):
+        filename = f"plan_{user_index}_{iteration}.pdf"
+        recorder.timed("/upload", lambda: upload_and_wait(client, plan_bytes, filename))
+
+        for question in QUESTIONS[:args.questions]:
+            recorder.timed("/ask", lambda: client.post("/ask", json={"filename": filename, "question": question}))
+
+        recorder.timed("/summarize", lambda: client.post("/summarize", json={"filename": filename}))
+
+        recorder.timed("/api/compare-plans", lambda: client.post(
+            "/api/compare-plans",
+            data={
+                "file0": (io.BytesIO(plan_bytes), f"a_{filename}"),
+                "label0": "Plan A",
+                "file1": (io.BytesIO(compare_bytes), f"b_{filename}"),
+                "label1": "Plan B",
+            },
+            content_type="multipart/form-data",
+        ))
+
+        client.post("/delete-file", json={"filename": filename})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=4, help="concurrent simulated users")
+    parser.add_argument("--iterations", type=int, default=2, help="upload/ask/summarize/compare rounds per user")
+    parser.add_argument("--questions", type=int, default=3, help="questions asked per upload")
+    parser.add_argument("--llm-latency-ms", type=float, default=100.0)
+    parser.add_argument("--embedding-latency-ms", type=float, default=20.0)
+    parser.add_argument("--pdf", default=DEFAULT_PDF)
+    parser.add_argument("--compare-pdf", default=DEFAULT_COMPARE_PDF)
+    args = parser.parse_args()
+    args.pdf = os.path.abspath(args.pdf)
+    args.compare_pdf = os.path.abspath(args.compare_pdf)
+
+    backend = load_app(args)
+    recorder = Recorder()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        futures = [pool.submit(simulated_user, backend, recorder, i, args) for i in range(args.users)]
+        for future in futures:
+            future.result()
+    wall = time.perf_counter() - start
+
+    print(f"{args.users} users x {args.iterations} iterations, "
+          f"LLM latency {args.llm_latency_ms:.0f} ms, embedding latency {args.embedding_latency_ms:.0f} ms, "
+          f"wall {wall:.2f} s")
+    print(f"{'endpoint':<20} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}")
+    for endpoint, samples in recorder.samples.items():
+        print(
+            f"{endpoint:<20} {len(samples):>6} {recorder.errors.get(endpoint, 0):>6} "
+            f"{percentile(samples, 50) * 1000:>9.1f} {percentile(samples, 95) * 1000:>9.1f} "
+            f"{percentile(samples, 99) * 1000:>9.1f} {len(samples) / wall:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# backend/benchmarks/multiworker_check.py
+"""
+Runs several app worker processes against one shared state directory, the way
+gunicorn -w N would, and checks that they all see the same documents, upload
+jobs and conversations. Then measures /ask throughput with 1 and N workers.
+
+Each worker imports the app with offline LLM/embedding stand-ins in a common
+scratch working directory and serves requests sent over a pipe through its
+own Flask test client. The LLM response and answer caches are off, so every
+/ask in the throughput runs retrieves and calls the (simulated) LLM. Exits
+non-zero if any consistency check fails.
+
+Run from the backend folder:
+    python -m benchmarks.multiworker_check --workers 4 --asks 40
+"""
+import argparse
+import io
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PDF = os.path.join(BACKEND_DIR, "pdfs", "Sample-Completed-SBC-Accessible-Format 060723_0.pdf")
+USER_ID = "multiworker-user"
+
+
+def worker_main(conn, workdir, llm_latency_ms):
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(llm_latency_ms)
+    # Cache hits would measure the caches rather than how /ask scales with workers
+    os.environ["LLM_CACHE_ENABLED"] = "0"
+    os.environ["SEMANTIC_CACHE_ENABLED"] = "0"
+    os.environ.setdefault("OPENAI_API_KEY", "offline")
+    os.chdir(workdir)
+    sys.path.insert(0, BACKEND_DIR)
+
+    import app as backend
+    backend.app.config["LOGIN_DISABLED"] = True
+    backend.app.config["TESTING"] = True
+    client = backend.app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = USER_ID
+    conn.send(("ready", os.getpid()))
+
+    while True:
+        command = conn.recv()
+        if command is None:
+            break
+        method, path, kwargs, repeat = command
+        if "upload" in kwargs:
+            name, data = kwargs.pop("upload")
+            kwargs = {"data": {"file": (io.BytesIO(data), name)}, "content_type": "multipart/form-data"}
+        start = time.perf_counter()
+        for _ in range(repeat):
+            response = client.open(path, method=method, **kwargs)
+        elapsed = time.perf_counter() - start
+        conn.send((response.status_code, response.get_json(silent=True), elapsed))
+
+
+class Worker:
+    def __init__(self, workdir, llm_latency_ms):
+        self.conn, child = mp.Pipe()
+        self.process = mp.Process(target=worker_main, args=(child, workdir, llm_latency_ms), daemon=True)
+        self.process.start()
+
+    def wait_ready(self):
+        return self.conn.recv()
+
+    def send(self, method, path, repeat=1, **kwargs):
+        self.conn.send((method, path, kwargs, repeat))
+
+    def call(self, method, path, **kwargs):
+        self.send(method, path, **kwargs)
+        status, body, _ = self.conn.recv()
+        return status, body
+
+    def stop(self):
+        self.conn.send(None)
+        self.process.join(timeout=10)
+
+
+failures = []
+
+
+def check(description, condition):
+    print(f"  [{'ok' if condition else 'FAIL'}] {description}")
+    if not condition:
+        failures.append(description)
+
+
+def wait_for_job(worker, job_id):
+    while True:
+        status, job = worker.call("GET", f"/upload-status/{job_id}")
+        if status != 200 or job["status"] in ("done", "failed"):
+            return status, job
+        time.sleep(0.05)
+
+
+def consistency_checks(workers, pdf_bytes):
+    first, second, last = workers[0], workers[1 % len(workers)], workers[-1]
+    print("Consistency across workers:")
+
+    status, accepted = first.call("POST", "/upload", upload=("plan.pdf", pdf_bytes))
+    check("upload accepted by worker 0", status == 202)
+    status, job = wait_for_job(second, accepted["job_id"])
+    check("upload job status visible on another worker", status == 200 and job["status"] == "done")
+
+    for i, worker in enumerate(workers):
+        status, body = worker.call("GET", "/get-user-files")
+        check(f"worker {i} lists the uploaded file", status == 200 and "plan.pdf" in body["files"])
+
+    for i, worker in enumerate(workers):
+        status, _ = worker.call("POST", "/ask", json={"filename": "plan.pdf", "question": f"Question {i}?"})
+        check(f"worker {i} answers from the shared document", status == 200)
+
+    status, _ = last.call("POST", "/export-report")
+    check("conversation from every worker exported by one", status == 200)
+
+    status, _ = second.call("POST", "/delete-file", json={"filename": "plan.pdf"})
+    check("delete on another worker", status == 200)
+    status, _ = first.call("POST", "/ask", json={"filename": "plan.pdf", "question": "Still there?"})
+    check("deleted document is gone on the worker that cached it", status == 404)
+
+    status, accepted = last.call("POST", "/upload", upload=("plan.pdf", pdf_bytes))
+    wait_for_job(last, accepted["job_id"])
+    status, _ = first.call("POST", "/ask", json={"filename": "plan.pdf", "question": "Back again?"})
+    check("re-uploaded document is visible on every worker", status == 200)
+
+
+def ask_throughput(workers, asks):
+    per_worker = max(1, asks // len(workers))
+    start = time.perf_counter()
+    for worker in workers:
+        worker.send("POST", "/ask", repeat=per_worker, json={"filename": "plan.pdf", "question": "What is the deductible?"})
+    statuses = [worker.conn.recv()[0] for worker in workers]
+    wall = time.perf_counter() - start
+    return per_worker * len(workers) / wall, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--asks", type=int, default=40, help="/ask requests per throughput run")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--pdf", default=DEFAULT_PDF)
+    args = parser.parse_args()
+
+    with open(args.pdf, "rb") as f:
+        pdf_bytes = f.read()
+
+    workdir = tempfile.mkdtemp(prefix="coveredai-workers-")
+    workers = [Worker(workdir, args.llm_latency_ms) for _ in range(max(2, args.workers))]
+    try:
+        pids = [worker.wait_ready()[1] for worker in workers]
+        print(f"{len(workers)} worker processes {pids} sharing {workdir}")
+
+        consistency_checks(workers, pdf_bytes)
+
+        print(f"/ask throughput, LLM latency {args.llm_latency_ms:.0f} ms:")
+        for count in (1, len(workers)):
+            rate, statuses = ask_throughput(workers[:count], args.asks)
+            print(f"  {count} worker(s): {rate:.1f} req/s (status {sorted(set(statuses))})")
+    finally:
+        for worker in workers:
+            worker.stop()
+
+    if failures:
+        print(f"{len(failures)} check(s) failed")
+        sys.exit(1)
+    print("All checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# backend/llm/answer_cache.py
+from typing import Optional
+import hashlib
+import json
+import numpy as np
+import os
+import sqlite3
+import threading
+import time
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
+
+class SemanticAnswerCache:
+    """
+    SQLite-backed cache of /ask answers per document, matched by question similarity.
+
+    Each entry holds the question's embedding with its answer and sources. A new
+    question is served from the cache when its cosine similarity to an earlier
+    question about the same document (and retrieval mode) reaches `threshold`;
+    an identical question after normalization is matched without embedding it.
+    The cache never embeds questions itself: callers pass the vector they
+    already computed for retrieval, and entries stored without one (questions
+    answered without a vector search) are only matched exactly.
+    Entries expire after ttl_seconds, each document keeps at most
+    max_entries_per_document and the least recently used entries are evicted
+    once there are more than max_entries.
+    """
+
+    def __init__(self, path: str, threshold: float = 0.95, max_entries: int = 20000,
+                 max_entries_per_document: int = 500, ttl_seconds: int = 7 * 24 * 3600):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_entries_per_document = max_entries_per_document
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.exact_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                document TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                question_hash TEXT NOT NULL,
+                question TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                sources TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_document ON answers (document, mode)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_last_access ON answers (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def question_hash(question: str) -> str:
+        return hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype="float32")
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _oldest(self) -> float:
+        return time.time() - self.ttl_seconds if self.ttl_seconds else 0.0
+
+    def lookup_exact(self, document: str, mode: str, question: str) -> Optional[dict]:
+        """The cached entry for the same question after normalization, without embedding it"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, question, answer, sources FROM answers "
+                "WHERE document = ? AND mode = ? AND question_hash = ? AND created_at >= ? "
+                "ORDER BY id DESC LIMIT 1",
+                (document, mode, self.question_hash(question), self._oldest()),
+            ).fetchone()
+            if row is None:
+                return None
+            self.hits += 1
+            self.exact_hits += 1
+            return self._touch(row, 1.0)
+
+    def lookup_similar(self, document: str, mode: str, vector=None) -> Optional[dict]:
+        """
+        The cached {question, answer, sources, similarity} closest to the
+        question's vector, or None. Call it after lookup_exact() missed; without
+        a vector only exact matches were possible, so it just counts the miss.
+        """
+        if vector is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        unit = self.unit(vector)
+        oldest = self._oldest()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, question, answer, sources, vector FROM answers "
+                "WHERE document = ? AND mode = ? AND created_at >= ? AND length(vector) > 0",
+                (document, mode, oldest),
+            ).fetchall()
+            if rows:
+                matrix = np.stack([np.frombuffer(row[4], dtype="float32") for row in rows])
+                similarities = matrix @ unit
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self.hits += 1
+                    return self._touch(rows[best][:4], float(similarities[best]))
+            self.misses += 1
+        return None
+
+    def _touch(self, row, similarity):
+        entry_id, question, answer, sources = row
+        self._conn.execute("UPDATE answers SET last_access = ? WHERE id = ?", (time.time(), entry_id))
+        self._conn.commit()
+        return {"question": question, "answer": answer, "sources": json.loads(sources), "similarity": similarity}
+
+    def store(self, document: str, mode: str, question: str, answer: str, sources: list,
+              vector: Optional[np.ndarray] = None):
+        """Cache an answer; without the question's vector it is only found by lookup_exact()"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO answers (document, mode, question_hash, question, vector, answer, sources, "
+                "created_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (document, mode, self.question_hash(question), question,
+                 self.unit(vector).tobytes() if vector is not None else b"",
+                 answer, json.dumps(sources), now, now),
+            )
+            # Bound the rows scanned per lookup, then the whole cache
+            per_document = self._conn.execute(
+                "SELECT COUNT(*) FROM answers WHERE document = ? AND mode = ?", (document, mode)
+            ).fetchone()[0]
+            if per_document > self.max_entries_per_document:
+                self._evict("WHERE document = ? AND mode = ?", (document, mode),
+                            per_document - self.max_entries_per_document)
+            count = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+            if count > self.max_entries:
+                self._evict("", (), count - self.max_entries)
+            if self.ttl_seconds:
+                cursor = self._conn.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl_seconds,))
+                self.evictions += cursor.rowcount
+            self._conn.commit()
+
+    def _evict(self, where, params, excess):
+        self._conn.execute(
+            f"DELETE FROM answers WHERE id IN (SELECT id FROM answers {where} ORDER BY last_access LIMIT ?)",
+            (*params, excess),
+        )
+        self.evictions += excess
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "exact_hits": self.exact_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "threshold": self.threshold,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,161 @@
+# backend/llm/fakes.py
+"""
+Offline, deterministic stand-ins for ChatOpenAI and OpenAIEmbeddings.
+
+They answer every prompt the app sends with well-formed output of the shape
+that call site expects, with configurable simulated latency, so the Flask app
+can be exercised and load-tested without network access or API spend.
+"""
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from typing import Any, Iterator, List, Optional
+import hashlib
+import json
+import math
+import re
+import time
+
+# Flat benefit fields, for the excerpt prompt asking for whatever the SBC rules missed
+FAKE_BENEFIT_FIELDS = {
+    "individual_deductible": "$1,500",
+    "family_deductible": "$3,000",
+    "individual_out_of_pocket_max": "$6,000",
+    "family_out_of_pocket_max": "$12,000",
+    "primary_care_copay": "$20 copay",
+    "specialist_copay": "$50 copay",
+    "emergency_room_copay": "$250 copay",
+    "urgent_care_copay": "$75 copay",
+    "prescription_coverage": "$10 generic / $40 preferred brand",
+    "mental_health_coverage": "$20 copay",
+    "inpatient_hospitalization": "20% coinsurance",
+    "outpatient_surgery": "20% coinsurance",
+    "coverage_details": ["Preventive care covered at no cost in-network"],
+}
+
+FAKE_VALIDATION = {
+    "is_insurance": True,
+    "document_type": "Summary of Benefits and Coverage",
+    "confidence_score": 90,
+    "found_elements": ["Health plan benefits", "Medical coverage information"],
+    "found_indicators": ["deductible", "copay", "in-network"],
+    "reason": "The document describes health plan cost sharing.",
+}
+
+FAKE_QUESTIONS = [
+    "What is my deductible?",
+    "What is my out-of-pocket maximum?",
+    "How much is a specialist visit?",
+]
+
+
+def fake_response_for(prompt: str) -> str:
+    """Deterministic response in the format the given app prompt asks for."""
+    if '"is_insurance"' in prompt:
+        return json.dumps(FAKE_VALIDATION)
+    fields = re.search(r"exactly these keys:\n(\{.*?\})\n", prompt)
+    if fields:
+        return json.dumps({key: FAKE_BENEFIT_FIELDS.get(key, "Not specified") for key in json.loads(fields.group(1))})
+    if "JSON array" in prompt:
+        return json.dumps(FAKE_QUESTIONS)
+    if '{"answers"' in prompt:
+        # Packed /ask-batch prompt: one answer per numbered question
+        questions = re.findall(r"^(\d+)\. (.+?) \(excerpts", prompt, re.MULTILINE)
+        return json.dumps({"answers": [
+            {"id": int(number), "answer": f"The plan documents answer '{question}' with a $50 copay after the deductible."}
+            for number, question in questions
+        ]})
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+    return (
+        "Based on the plan documents, the in-network deductible is $1,500 per person "
+        f"and specialist visits cost a $50 copay after the deductible. [ref {digest}]"
+    )
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that sleeps for `latency` seconds and returns a canned answer."""
+
+    model_name: str = "fake-chat"
+    temperature: float = 0
+    latency: float = 0.0
+    token_latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _prompt_text(self, messages: List[BaseMessage]) -> str:
+        return "\n".join(str(message.content) for message in messages)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = self._prompt_text(messages)
+        content = fake_response_for(prompt)
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=content))],
+            llm_output={
+                "token_usage": {
+                    "prompt_tokens": len(prompt) // 4,
+                    "completion_tokens": len(content) // 4,
+                    "total_tokens": (len(prompt) + len(content)) // 4,
+                },
+                "model_name": self.model_name,
+            },
+        )
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        if self.latency:
+            time.sleep(self.latency)
+        content = fake_response_for(self._prompt_text(messages))
+        for token in re.findall(r"\S+\s*", content):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Fixed-dimension feature-hashing embeddings: every word is hashed into a
+    signed bucket and the vector is L2-normalised, so texts sharing words get
+    similar vectors. Deterministic across processes.
+    """
+
+    def __init__(self, dim: int = 256, latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+        self.calls = 0
+        self.texts_embedded = 0
+
+    def _vector(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        for word in re.findall(r"[a-z0-9$%]+", text.lower()):
+            digest = hashlib.md5(word.encode("utf-8")).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        self.texts_embedded += len(texts)
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
@@ -0,0 +1,27 @@
+# backend/llm/map_reduce.py
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+import os
+
+# Largest piece of a document sent to the LLM in one map call, in characters
+GROUP_CHARS = int(os.getenv("SUMMARIZE_GROUP_CHARS", "12000"))
+# How many map calls run at the same time
+MAX_WORKERS = int(os.getenv("SUMMARIZE_MAX_WORKERS", "4"))
+
+
+def split_into_groups(text: str, group_chars: int = GROUP_CHARS, overlap: int = 200) -> List[str]:
+    """Split a document into groups that each fit comfortably in one prompt."""
+    if len(text) <= group_chars:
+        return [text]
+    # Imported on first use; langchain's text splitter is slow to import
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=group_chars, chunk_overlap=overlap)
+    return splitter.split_text(text)
+
+
+def map_groups(fn: Callable, items: List, max_workers: int = MAX_WORKERS) -> List:
+    """Run fn over every item in parallel and return the results in input order."""
+    if len(items) == 1:
+        return [fn(items[0])]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as pool:
+        return list(pool.map(fn, items))
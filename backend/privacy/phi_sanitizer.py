@@ -0,0 +1,142 @@
+# backend/privacy/phi_sanitizer.py
+from typing import Iterable, Iterator, List, Tuple
+import re
+
+# Applied in this order; on overlapping matches the earlier type wins
+PHI_PATTERNS = {
+    'ssn': r'\b\d{3}[-.]?\d{2}[-.]?\d{4}\b',
+    'email': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+    'phone': r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b',
+    'dob': r'\b(0[1-9]|1[0-2])[-/](0[1-9]|[12]\d|3[01])[-/](\d{2}|\d{4})\b',
+    'name': r'\b(?:Mr\.|Mrs\.|Ms\.|Dr\.|Prof\.) [A-Z][a-z]+ [A-Z][a-z]+\b',
+    'address': r'\b\d{1,5} [A-Za-z\s]{1,30}(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd)\b',
+    'mrn': r'\b(?:MRN|Medical Record Number):\s*\d{6,}\b'
+}
+
+# Text kept around each detected match when resolving it. Longer than any
+# bounded PHI pattern, so overlapping matches of other types and matches that
+# only appear once a neighbour has been redacted fall inside the same window.
+MATCH_CONTEXT = 64
+
+# Characters held back between streamed chunks before text is committed
+STREAM_WINDOW = 256
+
+
+class PHISanitizer:
+    """
+    Redacts PHI/PII, replacing each match with its type in brackets (e.g. [SSN]).
+
+    The whole text is scanned once with a precompiled alternation of every
+    pattern. Only the small windows around its hits are then resolved with the
+    per-type patterns in order, which keeps the output identical to applying
+    each pattern over the full text one after another, while text without PHI
+    is passed through after the single scan.
+    """
+
+    def __init__(self, patterns: dict = PHI_PATTERNS):
+        self.patterns = [(re.compile(pattern), f'[{phi_type.upper()}]') for phi_type, pattern in patterns.items()]
+
+        # Detection only needs to hit every match, not pick its type, so the
+        # shared leading \b is factored out of the alternation
+        bodies = list(patterns.values())
+        if all(body.startswith(r'\b') for body in bodies):
+            self.detector = re.compile(r'\b(?:' + '|'.join(f'(?:{body[2:]})' for body in bodies) + ')')
+        else:
+            self.detector = re.compile('|'.join(f'(?:{body})' for body in bodies))
+        self._whitespace = re.compile(r'\s')
+
+    def _resolve(self, text: str) -> str:
+        for pattern, label in self.patterns:
+            text = pattern.sub(label, text)
+        return text
+
+    def _space_before(self, text: str, i: int) -> int:
+        if i <= 0:
+            return 0
+        while i > 0 and not text[i].isspace():
+            i -= 1
+        return i
+
+    def _space_after(self, text: str, i: int) -> int:
+        if i >= len(text):
+            return len(text)
+        match = self._whitespace.search(text, i)
+        return match.end() if match else len(text)
+
+    def _windows(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Merged, whitespace-aligned regions of text around detected PHI"""
+        current = None
+        for match in self.detector.finditer(text):
+            start = self._space_before(text, match.start() - MATCH_CONTEXT)
+            end = self._space_after(text, match.end() + MATCH_CONTEXT)
+            if current is not None and start <= current[1]:
+                current[1] = max(current[1], end)
+                continue
+            if current is not None:
+                yield current[0], current[1]
+            current = [start, end]
+        if current is not None:
+            yield current[0], current[1]
+
+    def sanitize(self, text: str) -> str:
+        parts: List[str] = []
+        position = 0
+        for start, end in self._windows(text):
+            parts.append(text[position:start])
+            parts.append(self._resolve(text[start:end]))
+            position = end
+        if not parts:
+            return text
+        parts.append(text[position:])
+        return ''.join(parts)
+
+    def sanitize_stream(self, chunks: Iterable[str], window: int = STREAM_WINDOW) -> Iterator[str]:
+        """
+        Sanitize text arriving in pieces, yielding redacted output as it becomes
+        final. The joined output equals sanitize("".join(chunks)).
+
+        window must be at least 2 * MATCH_CONTEXT: a smaller one can commit
+        text before a match that reaches into it has fully arrived.
+        """
+        if window < 2 * MATCH_CONTEXT:
+            raise ValueError(f"window must be at least {2 * MATCH_CONTEXT} characters, got {window}")
+        return self._sanitize_stream(chunks, window)
+
+    def _sanitize_stream(self, chunks: Iterable[str], window: int) -> Iterator[str]:
+        buffer = ''
+        for chunk in chunks:
+            buffer += chunk
+            if len(buffer) < 2 * window:
+                continue
+
+            # Windows that end a full stream window before the buffer end can't
+            # change with more input; anything after them waits for the next chunk
+            safe = len(buffer) - window
+            parts: List[str] = []
+            position = 0
+            limit = safe
+            for start, end in self._windows(buffer):
+                if end > safe:
+                    limit = min(safe, start)
+                    break
+                parts.append(buffer[position:start])
+                parts.append(self._resolve(buffer[start:end]))
+                position = end
+
+            # Commit up to a whitespace character, which the next buffer starts with
+            cut = limit
+            while cut > position and not buffer[cut].isspace():
+                cut -= 1
+            parts.append(buffer[position:cut])
+            yield ''.join(parts)
+            buffer = buffer[cut:]
+
+        yield self.sanitize(buffer)
+
+
+default_sanitizer = PHISanitizer()
+
+
+def sanitize_text(text: str) -> str:
+    """Enhanced HIPAA-compliant PII/PHI sanitization"""
+    return default_sanitizer.sanitize(text)
@@ -0,0 +1,51 @@
+# backend/rag/cached_embeddings.py
+"""
+Embeddings that read through an EmbeddingStore. Kept out of
+rag/embedding_store.py because it subclasses langchain_core's Embeddings,
+which is slow to import; the app builds it on first use.
+"""
+from langchain_core.embeddings import Embeddings
+from rag.embedding_store import EMBEDDING_BATCH_SIZE, EmbeddingStore, embeddings_namespace
+from typing import List, Optional
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings that look every chunk up in an EmbeddingStore first and send
+    only the misses to the wrapped model, in batches of batch_size. Identical
+    chunks within one call are embedded once. Queries are passed through.
+    """
+
+    def __init__(self, wrapped: Embeddings, store: EmbeddingStore, batch_size: int = EMBEDDING_BATCH_SIZE,
+                 namespace: Optional[str] = None):
+        self.wrapped = wrapped
+        self.store = store
+        self.batch_size = batch_size
+        self.namespace = namespace or embeddings_namespace(wrapped)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [EmbeddingStore.make_key(self.namespace, text) for text in texts]
+        vectors = self.store.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+        if missing:
+            missing_keys = list(missing)
+            computed = {}
+            for start in range(0, len(missing_keys), self.batch_size):
+                batch = missing_keys[start:start + self.batch_size]
+                for key, vector in zip(batch, self.wrapped.embed_documents([missing[key] for key in batch])):
+                    computed[key] = vector
+            self.store.put_many(computed)
+            vectors.update(computed)
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.wrapped.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Several queries in one call to the model; like embed_query they bypass the store"""
+        return self.wrapped.embed_documents(texts) if texts else []
@@ -0,0 +1,148 @@
+# backend/rag/context_packer.py
+"""
+Token-aware context for /ask.
+
+Retrieval hands over more ranked candidates than a prompt needs, each with a
+`relevance` in its metadata (1.0 for the best). pack_context() picks from them
+MMR-style, trading relevance against word overlap with the chunks already
+picked, skips near-duplicates and candidates far less relevant than the best,
+and stops when the next chunk would overflow a token budget. A narrow question
+may end up with one chunk, while a broad one gets as many as fit.
+render_context() then puts the picked chunks in document order and sends the
+text that neighbouring chunks share (the splitter's overlap) once.
+"""
+from rag.hybrid_search import tokenize
+from typing import TYPE_CHECKING, List, Sequence
+import os
+import threading
+
+if TYPE_CHECKING:
+    from langchain.docstore.document import Document
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("ASK_CONTEXT_TOKEN_BUDGET", "500"))
+# Candidates scoring below this fraction of the best one are left out
+CONTEXT_MIN_RELEVANCE = float(os.getenv("ASK_CONTEXT_MIN_RELEVANCE", "0.5"))
+# 1.0 ranks by relevance alone; lower values favour chunks that add new words
+CONTEXT_MMR_LAMBDA = float(os.getenv("ASK_CONTEXT_MMR_LAMBDA", "0.7"))
+# Word-set (Jaccard) similarity above which a candidate repeats an already picked chunk
+CONTEXT_DUPLICATE_SIMILARITY = float(os.getenv("ASK_CONTEXT_DUPLICATE_SIMILARITY", "0.8"))
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "cl100k_base")
+
+# Shortest shared text between neighbouring chunks that is treated as splitter overlap
+MIN_OVERLAP_CHARS = 20
+MAX_OVERLAP_CHARS = 200
+
+_encoder = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder():
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        with _encoder_lock:
+            if not _encoder_loaded:
+                try:
+                    import tiktoken
+                    _encoder = tiktoken.get_encoding(TOKEN_ENCODING)
+                except Exception as e:
+                    print(f"Token counts are estimated from length, could not load {TOKEN_ENCODING}: {str(e)}")
+                _encoder_loaded = True
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in text with the model's tokenizer, or about one per four characters without it"""
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is None:
+        return max(1, len(text) // 4)
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def _similarity(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _overlap(previous: str, text: str) -> int:
+    """Length of the longest start of text that previous ends with (the splitter's overlap)"""
+    for length in range(min(len(previous), len(text), MAX_OVERLAP_CHARS), MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(text[:length]):
+            return length
+    return 0
+
+
+def render_context(documents: Sequence["Document"]) -> str:
+    """Chunks as prompt context in document order, neighbouring chunks merged without their shared overlap"""
+    ordered = sorted(documents, key=lambda doc: (doc.metadata.get("source", ""), doc.metadata.get("chunk_id", -1)))
+    passages = []
+    previous = None
+    for doc in ordered:
+        chunk_id = doc.metadata.get("chunk_id")
+        overlap = 0
+        if (previous is not None and chunk_id is not None
+                and previous.metadata.get("source") == doc.metadata.get("source")
+                and previous.metadata.get("chunk_id") == chunk_id - 1):
+            overlap = _overlap(previous.page_content, doc.page_content)
+        if overlap:
+            passages[-1] += doc.page_content[overlap:]
+        else:
+            passages.append(doc.page_content)
+        previous = doc
+    return "\n\n".join(passages)
+
+
+class PackedContext:
+    """The chunks picked for a prompt, their rendered text and its size in tokens"""
+
+    def __init__(self, documents: List["Document"], text: str, tokens: int, candidates: int, duplicates: int):
+        self.documents = documents
+        self.text = text
+        self.tokens = tokens
+        self.candidates = candidates
+        self.duplicates = duplicates
+
+
+def pack_context(candidates: Sequence["Document"], token_budget: int = CONTEXT_TOKEN_BUDGET,
+                 min_relevance: float = CONTEXT_MIN_RELEVANCE, mmr_lambda: float = CONTEXT_MMR_LAMBDA,
+                 duplicate_similarity: float = CONTEXT_DUPLICATE_SIMILARITY) -> PackedContext:
+    """
+    Pick chunks from best-first candidates until the token budget is spent.
+
+    The most relevant candidate is always kept, even over budget, so every
+    question gets some context. Candidates without a `relevance` in their
+    metadata score by rank.
+    """
+    relevance = [doc.metadata.get("relevance", 1.0 / (rank + 1)) for rank, doc in enumerate(candidates)]
+    best = max(relevance, default=0.0) or 1.0
+    relevance = [score / best for score in relevance]
+    words = [set(tokenize(doc.page_content)) for doc in candidates]
+
+    picked: List[int] = []
+    used = 0
+    duplicates = 0
+    remaining = [i for i in range(len(candidates)) if relevance[i] >= min_relevance]
+    while remaining:
+        scored = []
+        for i in remaining:
+            similarity = max((_similarity(words[i], words[j]) for j in picked), default=0.0)
+            scored.append((mmr_lambda * relevance[i] - (1 - mmr_lambda) * similarity, -i, similarity))
+        _, i, similarity = max(scored)
+        i = -i
+        remaining.remove(i)
+        if similarity >= duplicate_similarity:
+            duplicates += 1
+            continue
+        # Neighbouring chunks share their overlap, so charge what rendering them together adds
+        text = render_context([candidates[j] for j in picked + [i]])
+        tokens = count_tokens(text)
+        if picked and tokens > token_budget:
+            continue
+        picked.append(i)
+        used = tokens
+
+    documents = [candidates[i] for i in picked]
+    return PackedContext(documents, render_context(documents), used, len(candidates), duplicates)
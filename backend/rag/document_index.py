@@ -0,0 +1,96 @@
+# backend/rag/document_index.py
+from typing import TYPE_CHECKING, List, Optional, Tuple
+import numpy as np
+import hashlib
+import json
+import os
+import shutil
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+DOCUMENT_INDEX_PATH = "rag/document_indexes"
+
+
+def document_index_dir(user_id: str, filename: str) -> str:
+    """Folder holding the saved index of one user's document."""
+    user_key = hashlib.sha256(str(user_id).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(DOCUMENT_INDEX_PATH, user_key, filename)
+
+
+def build_document_index(chunks: List[str], vectors: List[List[float]], filename: str, embeddings,
+                         pages: Optional[List[int]] = None) -> "FAISS":
+    """Build a FAISS index from already-computed chunk vectors (no embedding calls)."""
+    # Imported on first use; langchain_community.vectorstores is slow to import
+    from langchain_community.vectorstores import FAISS
+    metadatas = [{"source": filename, "chunk_id": i} for i in range(len(chunks))]
+    if pages:
+        for metadata, page in zip(metadatas, pages):
+            metadata["page"] = page
+    return FAISS.from_embeddings(list(zip(chunks, vectors)), embeddings, metadatas=metadatas)
+
+
+def save_document_index(user_id: str, filename: str, chunks: List[str], vectors: List[List[float]],
+                        pages: Optional[List[int]] = None):
+    """Persist chunks and their vectors so the index can be rebuilt without re-embedding."""
+    folder = document_index_dir(user_id, filename)
+    os.makedirs(folder, exist_ok=True)
+
+    vectors_tmp = os.path.join(folder, "vectors.tmp.npy")
+    chunks_tmp = os.path.join(folder, "chunks.tmp.json")
+    np.save(vectors_tmp, np.asarray(vectors, dtype="float32"))
+    with open(chunks_tmp, "w", encoding="utf-8") as f:
+        json.dump({"chunks": chunks, "pages": pages}, f)
+
+    os.replace(vectors_tmp, os.path.join(folder, "vectors.npy"))
+    os.replace(chunks_tmp, os.path.join(folder, "chunks.json"))
+
+
+def load_document_vectors(user_id: str, filename: str) -> Optional[Tuple[List[str], List[List[float]], Optional[List[int]]]]:
+    """(chunks, vectors, pages) saved for a document, or None if there are none."""
+    folder = document_index_dir(user_id, filename)
+    vectors_path = os.path.join(folder, "vectors.npy")
+    chunks_path = os.path.join(folder, "chunks.json")
+    if not (os.path.exists(vectors_path) and os.path.exists(chunks_path)):
+        return None
+
+    try:
+        vectors = np.load(vectors_path)
+        with open(chunks_path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+    except Exception as e:
+        print(f"Error loading document index for {filename}: {str(e)}")
+        return None
+
+    # Older saves hold a plain list of chunks without page numbers
+    chunks = saved["chunks"] if isinstance(saved, dict) else saved
+    pages = saved.get("pages") if isinstance(saved, dict) else None
+    if not chunks or len(chunks) != len(vectors):
+        return None
+    return chunks, vectors.tolist(), pages
+
+
+def search_by_vectors(index: "FAISS", vectors: List[List[float]], k: int) -> List[list]:
+    """similarity_search_by_vector for many queries at once: one FAISS search over the stacked vectors"""
+    if not vectors or not index.index.ntotal:
+        return [[] for _ in vectors]
+    _, positions = index.index.search(np.asarray(vectors, dtype="float32"), min(k, index.index.ntotal))
+    return [
+        [index.docstore.search(index.index_to_docstore_id[position]) for position in row if position != -1]
+        for row in positions
+    ]
+
+
+def load_document_index(user_id: str, filename: str, embeddings) -> Optional["FAISS"]:
+    """Rebuild a saved document index from disk, or return None if there is none."""
+    saved = load_document_vectors(user_id, filename)
+    if saved is None:
+        return None
+    chunks, vectors, pages = saved
+    return build_document_index(chunks, vectors, filename, embeddings, pages)
+
+
+def delete_document_index(user_id: str, filename: str):
+    folder = document_index_dir(user_id, filename)
+    if os.path.isdir(folder):
+        shutil.rmtree(folder, ignore_errors=True)
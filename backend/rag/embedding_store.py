@@ -0,0 +1,113 @@
+# backend/rag/embedding_store.py
+from typing import Dict, List, Sequence
+import hashlib
+import numpy as np
+import os
+import sqlite3
+import threading
+import time
+
+# Shared by the Flask app and rag/rag_index.py; both run from the backend folder.
+# The Embeddings wrapper that reads through the store is in rag/cached_embeddings.py.
+EMBEDDING_STORE_PATH = os.getenv("EMBEDDING_STORE_PATH", os.path.join("cache", "embeddings.sqlite3"))
+EMBEDDING_STORE_MAX_ENTRIES = int(os.getenv("EMBEDDING_STORE_MAX_ENTRIES", "200000"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+
+
+def normalize_chunk(text: str) -> str:
+    """Whitespace-insensitive form of a chunk, so re-extracted boilerplate hashes the same"""
+    return " ".join(text.split())
+
+
+def embeddings_namespace(embeddings) -> str:
+    """Identifies the model behind an Embeddings object; vectors of different models never mix"""
+    model = getattr(embeddings, "model", None) or getattr(embeddings, "model_name", None) or ""
+    dim = getattr(embeddings, "dim", None) or ""
+    return f"{type(embeddings).__name__}:{model}:{dim}"
+
+
+class EmbeddingStore:
+    """
+    SQLite-backed store of chunk vectors keyed by the hash of the normalized
+    chunk text, shared across users and documents. Least recently used
+    vectors are evicted once there are more than max_entries.
+    """
+
+    def __init__(self, path: str = EMBEDDING_STORE_PATH, max_entries: int = EMBEDDING_STORE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS vectors (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS vectors_last_access ON vectors (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(namespace: str, text: str) -> str:
+        return hashlib.sha256(f"{namespace}\n{normalize_chunk(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM vectors WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype="float32").tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE vectors SET last_access = ? WHERE key = ?",
+                                       [(now, key) for key in found])
+                self._conn.commit()
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vectors (key, vector, last_access) VALUES (?, ?, ?)",
+                [(key, np.asarray(vector, dtype="float32").tobytes(), now) for key, vector in items.items()],
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+            if count > self.max_entries:
+                excess = count - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM vectors WHERE key IN (SELECT key FROM vectors ORDER BY last_access LIMIT ?)",
+                    (excess,),
+                )
+                self.evictions += excess
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,116 @@
+# backend/rag/hybrid_search.py
+"""
+Lexical (BM25) retrieval over a document's chunks and reciprocal-rank fusion
+with the vector search results.
+
+Insurance questions lean on exact terms ("deductible", "ER copay", "$1,500",
+CPT codes) that embeddings blur, so /ask fuses both rankings. When BM25 alone
+is confident the query embedding call is skipped altogether.
+"""
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+import math
+import re
+
+# Dollar amounts, percentages and codes stay whole tokens: "$1,500", "20%", "99213"
+TOKEN_PATTERN = re.compile(r"\$?\d[\d,]*(?:\.\d+)?%?|[a-z][a-z0-9]*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it my of on or "
+    "the this to what when where which who will with you your".split()
+)
+
+# Common abbreviations in plan documents and questions
+SYNONYMS = {
+    "er": ["emergency", "room"],
+    "oop": ["out", "pocket"],
+    "rx": ["prescription"],
+    "pcp": ["primary", "care"],
+    "copayment": ["copay"],
+}
+
+RRF_K = 60
+
+
+def _normalize(token: str) -> str:
+    token = token.rstrip(",")
+    if token[0].isalpha() and len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+        token = token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        token = _normalize(token)
+        tokens.extend(SYNONYMS.get(token, [token]))
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of chunks, with an inverted index for sparse scoring"""
+
+    def __init__(self, chunks: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = len(chunks)
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.lengths = []
+        self.doc_terms = []
+        for chunk_id, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk))
+            self.lengths.append(sum(counts.values()))
+            self.doc_terms.append(frozenset(counts))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((chunk_id, tf))
+        self.avg_length = (sum(self.lengths) / self.size) if self.size else 0.0
+        self.idf = {
+            term: math.log(1 + (self.size - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+        # Weight given to query terms that never occur in the document
+        self.unseen_idf = math.log(1 + (self.size + 0.5) / 0.5)
+        self.approx_bytes = 64 * sum(len(posting) for posting in self.postings.values()) + 100 * len(self.postings)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """Top-k (chunk_id, score) pairs, best first; chunks sharing no term are left out"""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for chunk_id, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[chunk_id] / (self.avg_length or 1))
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+    def confidence(self, query: str, results: List[Tuple[int, float]]) -> float:
+        """
+        Share of the query's IDF mass found in the top results (0..1). Close to
+        1 means every informative query term occurs in the retrieved chunks, so
+        lexical results alone are good enough.
+        """
+        terms = set(tokenize(query))
+        if not terms or not results:
+            return 0.0
+        found = set().union(*(self.doc_terms[chunk_id] for chunk_id, _ in results))
+        total = sum(self.idf.get(term, self.unseen_idf) for term in terms)
+        matched = sum(self.idf[term] for term in terms if term in found)
+        return matched / total if total else 0.0
+
+
+def reciprocal_rank_scores(rankings: Sequence[Sequence[int]], k: int = RRF_K) -> Dict[int, float]:
+    """Fused score of every chunk id in several best-first rankings: score(d) = sum 1 / (k + rank)"""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, 1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return scores
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = RRF_K) -> List[int]:
+    """Fuse several best-first rankings of chunk ids, best first"""
+    scores = reciprocal_rank_scores(rankings, k)
+    return sorted(scores, key=lambda chunk_id: (-scores[chunk_id], chunk_id))
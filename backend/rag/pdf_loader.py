@@ -1,19 +1,91 @@
 # backend/rag/pdf_loader.py
+from concurrent.futures import FIRST_COMPLETED, wait
 from langchain_community.document_loaders import PyPDFLoader
+from langchain.docstore.document import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from typing import List
+from typing import Iterable, Iterator, List, Optional
+from utils.process_pool import new_process_pool
 import os
 
-def load_pdfs_from_directory(directory: str) -> List[str]:
-    all_docs = []
+LOADER_MAX_WORKERS = int(os.getenv("PDF_LOADER_MAX_WORKERS", str(os.cpu_count() or 1)))
+
+
+class LoadedPdf:
+    """Chunks of one source PDF, or the error that kept it from loading"""
+
+    def __init__(self, path: str, chunks: Optional[List[Document]] = None, error: Optional[str] = None):
+        self.path = path
+        self.filename = os.path.basename(path)
+        self.chunks = chunks or []
+        self.error = error
+
+
+def load_pdf(path: str) -> List[Document]:
+    """Chunks of one PDF, with its source path and page in the metadata"""
     splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+    loader = PyPDFLoader(path)
+    pages = loader.load_and_split()
+    return splitter.split_documents(pages)
+
+
+def _load_pdf_safely(path: str) -> LoadedPdf:
+    # Runs in a worker process; errors come back as data so one bad file does not stop the rest
+    try:
+        return LoadedPdf(path, load_pdf(path))
+    except Exception as e:
+        return LoadedPdf(path, error=str(e))
 
-    for filename in os.listdir(directory):
-        if filename.endswith(".pdf"):
-            path = os.path.join(directory, filename)
-            loader = PyPDFLoader(path)
-            pages = loader.load_and_split()
-            chunks = splitter.split_documents(pages)
-            all_docs.extend(chunks)
 
+def iter_pdf_chunks(paths: Iterable[str], max_workers: Optional[int] = None,
+                    window: Optional[int] = None) -> Iterator[LoadedPdf]:
+    """
+    Parse PDFs across a process pool and yield each one's chunks as soon as it
+    is ready (completion order, not input order).
+
+    At most `window` files (default twice the workers) are in flight or
+    waiting to be consumed, so memory stays bounded however many paths are
+    given, and the caller can embed one file while the next ones are parsed.
+    Closing the generator early cancels the files not yet started and waits
+    for those being parsed, so no worker outlives it; a caller resumes by
+    passing only the paths it has not processed. max_workers=0 parses in this
+    process.
+    """
+    if max_workers is None:
+        max_workers = LOADER_MAX_WORKERS
+    if max_workers <= 0:
+        for path in paths:
+            yield _load_pdf_safely(path)
+        return
+
+    window = window or 2 * max_workers
+    pending = iter(paths)
+    pool = new_process_pool(max_workers)
+    in_flight = set()
+    try:
+        for path in pending:
+            in_flight.add(pool.submit(_load_pdf_safely, path))
+            if len(in_flight) >= window:
+                break
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                for path in pending:
+                    in_flight.add(pool.submit(_load_pdf_safely, path))
+                    break
+                yield future.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def list_pdfs(directory: str) -> List[str]:
+    return [os.path.join(directory, filename) for filename in sorted(os.listdir(directory))
+            if filename.endswith(".pdf")]
+
+
+def load_pdfs_from_directory(directory: str) -> List[Document]:
+    all_docs = []
+    for loaded in iter_pdf_chunks(list_pdfs(directory)):
+        if loaded.error:
+            print(f"Error loading {loaded.filename}: {loaded.error}")
+        all_docs.extend(loaded.chunks)
     return all_docs
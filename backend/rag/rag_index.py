@@ -1,20 +1,149 @@
 # backend/rag/rag_index.py
 from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import OpenAIEmbeddings
-from rag.pdf_loader import load_pdfs_from_directory
+from rag.pdf_loader import iter_pdf_chunks
+from rag.cached_embeddings import CachedEmbeddings
+from rag.embedding_store import EmbeddingStore, EMBEDDING_BATCH_SIZE
+from rag.user_index import chunk_vector_id
+from typing import Dict, Optional
+import hashlib
+import json
 import os
+import shutil
 
 INDEX_PATH = "rag/faiss_index"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+# While building, the index and manifest are saved every this many PDFs, so an
+# interrupted build resumes from the last checkpoint instead of starting over
+CHECKPOINT_FILES = int(os.getenv("RAG_INDEX_CHECKPOINT_FILES", "50"))
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(index_path: str = INDEX_PATH) -> Optional[dict]:
+    """{filename: {hash, size, mtime, ids}} of the PDFs in the saved index, or None if unusable"""
+    try:
+        with open(os.path.join(index_path, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest["files"]
+
+
+def save_index(db: FAISS, files: Dict[str, dict], index_path: str = INDEX_PATH):
+    """
+    Write the index and its manifest to a fresh folder and swap it in, so a
+    crash mid-save leaves either the old or the new index, never a mix.
+    """
+    staging = f"{index_path}.tmp-{os.getpid()}"
+    previous = f"{index_path}.old"
+    shutil.rmtree(staging, ignore_errors=True)
+    db.save_local(staging)
+    with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+        json.dump({"version": MANIFEST_VERSION, "files": files}, f)
+
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(index_path):
+        os.rename(index_path, previous)
+    os.rename(staging, index_path)
+    shutil.rmtree(previous, ignore_errors=True)
+
+
+def recover_index_folder(index_path: str = INDEX_PATH):
+    # A crash between the two renames in save_index leaves only the old folder
+    previous = f"{index_path}.old"
+    if not os.path.exists(index_path) and os.path.exists(previous):
+        os.rename(previous, index_path)
+
 
 def build_or_load_faiss_index(pdf_folder: str):
-    if os.path.exists(os.path.join(INDEX_PATH, "index.faiss")):
-        return FAISS.load_local(INDEX_PATH, OpenAIEmbeddings(), allow_dangerous_deserialization=True)
+    """
+    Load the saved index and reconcile it with pdf_folder: only added or
+    changed PDFs are embedded and removed ones are deleted from the store.
+    Files whose size and mtime match the manifest are not even re-hashed.
+    PDFs are parsed in worker processes and embedded one batch at a time as
+    they arrive, so memory does not grow with the size of the folder.
+    """
+    # Chunks already embedded by the app (or a previous build) are not sent to OpenAI again
+    embedding = CachedEmbeddings(OpenAIEmbeddings(), EmbeddingStore())
+
+    recover_index_folder()
+    db = None
+    files = load_manifest()
+    if files is not None and os.path.exists(os.path.join(INDEX_PATH, "index.faiss")):
+        db = FAISS.load_local(INDEX_PATH, embedding, allow_dangerous_deserialization=True)
+    else:
+        # No manifest (or an index saved before manifests existed): chunk ids are unknown, start over
+        files = {}
+
+    on_disk = {}
+    for filename in sorted(os.listdir(pdf_folder)):
+        if filename.endswith(".pdf"):
+            stat = os.stat(os.path.join(pdf_folder, filename))
+            on_disk[filename] = (stat.st_size, stat.st_mtime)
+
+    changed = False
+    for filename in [name for name in files if name not in on_disk]:
+        if files[filename]["ids"]:
+            db.delete(files.pop(filename)["ids"])
+        else:
+            files.pop(filename)
+        changed = True
+        print(f"Removed {filename} from the knowledge base index")
+
+    to_load = {}
+    for filename, (size, mtime) in on_disk.items():
+        entry = files.get(filename)
+        if entry is not None and entry["size"] == size and entry["mtime"] == mtime:
+            continue
+        path = os.path.join(pdf_folder, filename)
+        digest = file_sha256(path)
+        if entry is not None and entry["hash"] == digest:
+            # Touched but identical; remember the new mtime so it is not hashed again
+            entry.update(size=size, mtime=mtime)
+            changed = True
+            continue
+        to_load[path] = (digest, size, mtime)
 
-    docs = load_pdfs_from_directory(pdf_folder)
-    embedding = OpenAIEmbeddings()
-    db = FAISS.from_documents(docs, embedding)
+    since_checkpoint = 0
+    for loaded in iter_pdf_chunks(to_load):
+        filename = loaded.filename
+        if loaded.error:
+            print(f"Error loading {filename} into the knowledge base: {loaded.error}")
+            continue
+        digest, size, mtime = to_load[loaded.path]
+        entry = files.get(filename)
+        if entry is not None and entry["ids"]:
+            db.delete(entry["ids"])
+        docs = loaded.chunks
+        ids = [chunk_vector_id(filename, i) for i in range(len(docs))]
+        for start in range(0, len(docs), EMBEDDING_BATCH_SIZE):
+            batch, batch_ids = docs[start:start + EMBEDDING_BATCH_SIZE], ids[start:start + EMBEDDING_BATCH_SIZE]
+            if db is None:
+                db = FAISS.from_documents(batch, embedding, ids=batch_ids)
+            else:
+                db.add_documents(batch, ids=batch_ids)
+        files[filename] = {"hash": digest, "size": size, "mtime": mtime, "ids": ids}
+        changed = True
+        print(f"{'Updated' if entry is not None else 'Added'} {filename} in the knowledge base index ({len(ids)} chunks)")
 
-    os.makedirs(INDEX_PATH, exist_ok=True)
-    db.save_local(INDEX_PATH)
+        since_checkpoint += 1
+        if db is not None and since_checkpoint >= CHECKPOINT_FILES:
+            save_index(db, files)
+            since_checkpoint = 0
+            changed = False
 
+    if db is None:
+        raise ValueError(f"No PDF content found in {pdf_folder}")
+    if changed:
+        save_index(db, files)
     return db
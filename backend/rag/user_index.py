@@ -0,0 +1,96 @@
+# backend/rag/user_index.py
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+import threading
+
+if TYPE_CHECKING:
+    from langchain.docstore.document import Document
+    from langchain_community.vectorstores import FAISS
+
+
+def chunk_vector_id(filename: str, chunk_id: int) -> str:
+    return f"{filename}#{chunk_id}"
+
+
+class UserIndex:
+    """
+    One FAISS index over all of a user's documents, maintained per document:
+    adding a document appends its saved vectors and removing one deletes only
+    its ids, so nothing is re-embedded or rebuilt. Chunk metadata carries the
+    source filename, chunk id and page.
+    """
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.store: Optional["FAISS"] = None
+        # filename -> (document version, vector ids)
+        self.documents: Dict[str, Tuple[float, List[str]]] = {}
+        self.lock = threading.RLock()
+
+    def add_document(self, filename: str, version: float, chunks: List[str], vectors: List[List[float]],
+                     pages: Optional[List[int]] = None):
+        with self.lock:
+            if filename in self.documents:
+                self.remove_document(filename)
+            ids = [chunk_vector_id(filename, i) for i in range(len(chunks))]
+            if not ids:
+                self.documents[filename] = (version, ids)
+                return
+            metadatas = [{"source": filename, "chunk_id": i} for i in range(len(chunks))]
+            if pages:
+                for metadata, page in zip(metadatas, pages):
+                    metadata["page"] = page
+            if self.store is None:
+                from langchain_community.vectorstores import FAISS
+                self.store = FAISS.from_embeddings(list(zip(chunks, vectors)), self.embeddings,
+                                                   metadatas=metadatas, ids=ids)
+            else:
+                self.store.add_embeddings(list(zip(chunks, vectors)), metadatas=metadatas, ids=ids)
+            self.documents[filename] = (version, ids)
+
+    def remove_document(self, filename: str):
+        with self.lock:
+            entry = self.documents.pop(filename, None)
+            if entry is None:
+                return
+            if not any(ids for _, ids in self.documents.values()):
+                self.store = None
+            elif entry[1]:
+                self.store.delete(entry[1])
+
+    def sync(self, versions: Dict[str, float],
+             load: Callable[[str], Optional[Tuple[List[str], List[List[float]], Optional[List[int]]]]]) -> Tuple[int, int]:
+        """
+        Bring the index in line with the user's current documents ({filename: version}).
+        New or replaced documents are added through load(filename) -> (chunks, vectors, pages);
+        returns how many documents were added and removed.
+        """
+        with self.lock:
+            removed = [filename for filename in self.documents if filename not in versions]
+            for filename in removed:
+                self.remove_document(filename)
+            added = 0
+            for filename, version in versions.items():
+                current = self.documents.get(filename)
+                if current is not None and current[0] == version:
+                    continue
+                saved = load(filename)
+                if saved is None:
+                    continue
+                chunks, vectors, pages = saved
+                self.add_document(filename, version, chunks, vectors, pages)
+                added += 1
+            return added, len(removed)
+
+    def search(self, question: str, k: int) -> List["Document"]:
+        if self.store is None:
+            return []
+        # Embed outside the lock so one user's concurrent questions only serialise on the FAISS lookup
+        query_vector = self.embeddings.embed_query(question)
+        with self.lock:
+            if self.store is None:
+                return []
+            return self.store.similarity_search_by_vector(query_vector, k=k)
+
+    def size(self) -> int:
+        with self.lock:
+            return self.store.index.ntotal if self.store is not None else 0
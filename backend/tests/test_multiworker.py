@@ -0,0 +1,179 @@
+# backend/tests/test_multiworker.py
+"""
+Several worker processes against one SQLite state file, the way gunicorn -w N
+runs the app: upload jobs, document records and their versions, and the
+answer and LLM response caches must look the same from every process.
+
+Workers are spawned (not forked) and use the same classes the app builds on
+that file. benchmarks/multiworker_check.py drives whole app workers and
+measures /ask throughput.
+
+Run from the backend folder:
+    python -m pytest tests
+"""
+import multiprocessing
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm.answer_cache import SemanticAnswerCache  # noqa: E402
+from llm.response_cache import LLMResponseCache  # noqa: E402
+from utils.job_queue import JobQueue  # noqa: E402
+from utils.shared_state import SQLiteStateBackend  # noqa: E402
+from utils.user_store import UserDataStore, document_key  # noqa: E402
+
+WORKERS = 3
+
+
+@pytest.fixture
+def spawn():
+    return multiprocessing.get_context("spawn")
+
+
+@pytest.fixture
+def state_path(tmp_path):
+    return str(tmp_path / "state.sqlite3")
+
+
+def rewrite_document(state_path, worker, rounds):
+    """Rewrite one shared document and add one of the worker's own; the versions each put produced"""
+    store = UserDataStore(SQLiteStateBackend(state_path))
+    versions = []
+    for i in range(rounds):
+        store.put_document("alice", "shared.pdf", {"full_text": f"{worker}:{i}", "chunks": [f"{worker}:{i}"]})
+        versions.append(store.backend.version("documents", document_key("alice", "shared.pdf")))
+    store.put_document("alice", f"worker-{worker}.pdf", {"full_text": str(worker), "chunks": [str(worker)]})
+    return versions
+
+
+def list_documents(state_path, user_id):
+    return UserDataStore(SQLiteStateBackend(state_path)).list_documents(user_id)
+
+
+def run_job(state_path, job_ids, seconds=0.5, heartbeat_seconds=10):
+    """Accept a job on this worker's queue and run it to completion here"""
+    queue = JobQueue(SQLiteStateBackend(state_path), max_workers=1, heartbeat_seconds=heartbeat_seconds)
+
+    def work(job):
+        job.set_stage("work")
+        time.sleep(seconds)
+        return {"pid": os.getpid()}
+
+    job = queue.submit("alice", "test", work)
+    job_ids.put(job.id)
+    while queue.get(job.id)["status"] not in ("done", "failed"):
+        time.sleep(0.05)
+
+
+def store_answers(cache_path, worker, count, max_entries):
+    cache = SemanticAnswerCache(cache_path, max_entries=max_entries, max_entries_per_document=max_entries)
+    for i in range(count):
+        cache.store("content-hash", "hybrid", f"worker {worker} question {i}", f"answer {worker}.{i}",
+                    [{"text": "excerpt", "page": i}], vector=[1.0, float(worker), float(i)])
+
+
+def store_responses(cache_path, worker, count):
+    cache = LLMResponseCache(cache_path)
+    for i in range(count):
+        cache.put(LLMResponseCache.make_key("model", 0, f"{worker}:{i}"), f"response {worker}.{i}")
+
+
+def test_document_versions_agree_across_workers(spawn, state_path):
+    reader = UserDataStore(SQLiteStateBackend(state_path))
+    reader.put_document("alice", "shared.pdf", {"full_text": "initial", "chunks": ["initial"]})
+    assert reader.get_document("alice", "shared.pdf")["full_text"] == "initial"
+
+    with spawn.Pool(WORKERS) as pool:
+        versions = pool.starmap(rewrite_document, [(state_path, worker, 40) for worker in range(WORKERS)])
+
+    every_version = [version for worker_versions in versions for version in worker_versions]
+    assert len(set(every_version)) == len(every_version)
+    for worker_versions in versions:
+        assert worker_versions == sorted(worker_versions)
+
+    # The copy this process kept in memory is replaced by the last write of any worker
+    final_version = reader.backend.version("documents", document_key("alice", "shared.pdf"))
+    assert final_version == max(every_version)
+    last_writer = next(worker for worker, worker_versions in enumerate(versions) if final_version in worker_versions)
+    assert reader.get_document("alice", "shared.pdf")["full_text"] == f"{last_writer}:39"
+    assert sorted(reader.list_documents("alice")) == sorted(
+        ["shared.pdf"] + [f"worker-{worker}.pdf" for worker in range(WORKERS)]
+    )
+
+    reader.delete_document("alice", "worker-0.pdf")
+    with spawn.Pool(1) as pool:
+        seen = pool.apply(list_documents, (state_path, "alice"))
+    assert "worker-0.pdf" not in seen
+
+
+def test_job_status_is_visible_from_other_workers(spawn, state_path):
+    job_ids = spawn.Queue()
+    worker = spawn.Process(target=run_job, args=(state_path, job_ids))
+    worker.start()
+    try:
+        job_id = job_ids.get(timeout=60)
+        queue = JobQueue(SQLiteStateBackend(state_path))
+        statuses = []
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            job = queue.get(job_id, owner="alice")
+            statuses.append(job["status"])
+            if job["status"] in ("done", "failed"):
+                break
+            time.sleep(0.05)
+    finally:
+        worker.join(timeout=60)
+
+    assert statuses[-1] == "done"
+    assert "running" in statuses
+    assert job["result"] == {"pid": worker.pid}
+    assert [stage["stage"] for stage in job["stages"]] == ["work"]
+    assert queue.get(job_id, owner="bob") is None
+
+
+def test_job_of_a_stopped_worker_fails(spawn, state_path):
+    job_ids = spawn.Queue()
+    worker = spawn.Process(target=run_job, args=(state_path, job_ids, 600, 0.2))
+    worker.start()
+    try:
+        job_id = job_ids.get(timeout=60)
+        queue = JobQueue(SQLiteStateBackend(state_path), stale_seconds=1)
+        # The worker's heartbeat keeps a long job running past stale_seconds
+        time.sleep(2)
+        assert queue.get(job_id, owner="alice")["status"] == "running"
+    finally:
+        worker.kill()
+        worker.join(timeout=60)
+
+    time.sleep(1.5)
+    job = queue.get(job_id, owner="alice")
+    assert job["status"] == "failed"
+    assert job["status_code"] == 500
+    # Saved as failed, so workers with a longer stale_seconds agree
+    assert JobQueue(SQLiteStateBackend(state_path)).get(job_id)["status"] == "failed"
+
+
+def test_cache_entries_are_shared_and_bounded(spawn, tmp_path):
+    answers_path = str(tmp_path / "answers.sqlite3")
+    responses_path = str(tmp_path / "responses.sqlite3")
+    with spawn.Pool(WORKERS) as pool:
+        pool.starmap(store_answers, [(answers_path, worker, 20, 50) for worker in range(WORKERS)])
+        pool.starmap(store_responses, [(responses_path, worker, 20) for worker in range(WORKERS)])
+
+    answers = SemanticAnswerCache(answers_path, max_entries=50, max_entries_per_document=50)
+    # 60 entries were written concurrently; eviction kept the newest 50 and nothing else
+    assert answers.stats()["entries"] == 50
+    for worker in range(WORKERS):
+        entry = answers.lookup_exact("content-hash", "hybrid", f"Worker {worker} question 19?")
+        assert entry["answer"] == f"answer {worker}.19"
+        assert entry["sources"] == [{"text": "excerpt", "page": 19}]
+    assert answers.lookup_similar("content-hash", "hybrid", [1.0, 2.0, 19.0])["answer"] == "answer 2.19"
+
+    responses = LLMResponseCache(responses_path)
+    for worker in range(WORKERS):
+        for i in range(20):
+            assert responses.get(LLMResponseCache.make_key("model", 0, f"{worker}:{i}")) == f"response {worker}.{i}"
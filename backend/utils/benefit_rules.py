@@ -0,0 +1,387 @@
+# backend/utils/benefit_rules.py
+"""
+Rule-based extraction of plan cost-sharing fields from SBC text.
+
+Summary of Benefits and Coverage documents follow a fixed template: the
+deductible and out-of-pocket limit answer the "Important Questions" rows, and
+copays sit in the first cells after a service name in the "Common Medical
+Event" chart, one column per provider tier. The extracted text keeps table
+cells on their own lines, so the values can be read with a few layout-aware
+rules instead of sending the whole document to the LLM. Fields the rules
+cannot resolve are left out; for those, retrieve_field_chunks() finds the
+document chunks that mention each one and field_excerpts() packs just those
+chunks into the LLM prompt.
+"""
+from bisect import bisect_right
+from rag.hybrid_search import BM25Index
+from typing import Dict, Iterable, List, Optional, Sequence
+import json
+import os
+import re
+
+NOT_SPECIFIED = "Not specified"
+NOT_APPLICABLE = "Not applicable"
+
+# What each field holds, as described to the LLM for the ones left unresolved
+BENEFIT_FIELDS = {
+    "individual_deductible": "individual deductible amount",
+    "family_deductible": "family deductible amount",
+    "individual_out_of_pocket_max": "individual out-of-pocket maximum",
+    "family_out_of_pocket_max": "family out-of-pocket maximum",
+    "primary_care_copay": "primary care visit copay or coinsurance",
+    "specialist_copay": "specialist visit copay or coinsurance",
+    "emergency_room_copay": "emergency room copay or coinsurance",
+    "urgent_care_copay": "urgent care copay or coinsurance",
+    "prescription_coverage": "prescription drug cost sharing per tier",
+    "mental_health_coverage": "outpatient mental health copay or coinsurance",
+    "inpatient_hospitalization": "inpatient hospital stay (facility) copay or coinsurance",
+    "outpatient_surgery": "outpatient surgery (facility) copay or coinsurance",
+    "coverage_details": "list of key coverage points such as excluded and other covered services",
+}
+
+# Short BM25 queries that find the chunks holding each field
+FIELD_QUERIES = {
+    "individual_deductible": "overall deductible individual",
+    "family_deductible": "overall deductible family",
+    "individual_out_of_pocket_max": "out-of-pocket limit maximum individual",
+    "family_out_of_pocket_max": "out-of-pocket limit maximum family",
+    "primary_care_copay": "primary care visit injury illness provider office clinic",
+    "specialist_copay": "specialist visit health care provider office clinic",
+    "emergency_room_copay": "emergency room care immediate medical attention",
+    "urgent_care_copay": "urgent care immediate medical attention",
+    "prescription_coverage": "generic preferred brand specialty drugs prescription tier",
+    "mental_health_coverage": "mental health behavioral health substance abuse outpatient services",
+    "inpatient_hospitalization": "hospital stay facility fee inpatient",
+    "outpatient_surgery": "outpatient surgery ambulatory surgery center facility fee",
+    "coverage_details": "services plan generally does not cover excluded other covered services",
+}
+
+# Chunks retrieved per field
+FIELD_TOP_K = int(os.getenv("BENEFIT_FIELD_TOP_K", "2"))
+# Largest amount of document text sent to the LLM for the unresolved fields
+EXCERPT_MAX_CHARS = int(os.getenv("BENEFIT_EXCERPT_MAX_CHARS", "6000"))
+
+_AMOUNT = r"\$\s?\d+(?:,\d{3})*(?:\.\d{2})?"
+_LABELED_AMOUNT = re.compile(
+    rf"({_AMOUNT})\s*(?:/|per|each)?\s*(individual|person|member|family)"
+    rf"|(individual|person|member|family)\s*(?:deductible|limit|maximum)?\s*[:=]?\s*({_AMOUNT})",
+    re.IGNORECASE,
+)
+_NO_VALUE = re.compile(r"^(?:not\s+applicable|n/a|none|no)\b", re.IGNORECASE)
+# First line of a cost cell in the services chart
+_COST_CELL = re.compile(
+    rf"^(?:{_AMOUNT}|\d+(?:\.\d+)?\s?%|no\s+charge|not\s+covered|not\s+applicable|n/a|covered\b|free\b)",
+    re.IGNORECASE,
+)
+# A cost anywhere in a "Label: value" line
+_COST_IN_TEXT = re.compile(rf"{_AMOUNT}|\d+(?:\.\d+)?\s?%|no\s+charge|not\s+covered", re.IGNORECASE)
+
+# The SBC question first, then a "Deductibles:" heading, then any mention
+_DEDUCTIBLE_ANCHORS = [r"What\s+is\s+the\s+overall\s+deductible\?", r"\bdeductibles?\s*:", r"\bdeductibles?\b"]
+_OUT_OF_POCKET_ANCHORS = [
+    r"What\s+is\s+the\s+out-of-\s?pocket\s+limit\s+for\s+this\s+plan\?",
+    r"\bout[-\s]of[-\s]\s?pocket\s+(?:limits?|maximums?)\s*:",
+    r"\bout[-\s]of[-\s]\s?pocket\s+(?:limits?|maximums?)\b",
+]
+
+# field: [(event anchor or None, service row label)], tried in order
+_SERVICE_ROWS = {
+    "primary_care_copay": [(None, r"Primary\s+care\s+visit(?:\s+to\s+treat\s+an\s+injury\s+or\s+illness)?"),
+                           (None, r"Primary\s+care(?:\s+visits?)?")],
+    "specialist_copay": [(None, r"Specialist\s+visits?")],
+    "emergency_room_copay": [(None, r"Emergency\s+room\s+care"), (None, r"Emergency\s+room(?:\s+visits?)?")],
+    "urgent_care_copay": [(None, r"Urgent\s+care(?:\s+visits?)?")],
+    "mental_health_coverage": [(r"If\s+you\s+need\s+mental\s+health", r"Outpatient\s+services"),
+                               (None, r"(?:Outpatient\s+)?mental\s+health(?:\s+(?:services|visits?|counseling))?")],
+    "inpatient_hospitalization": [(r"If\s+you\s+have\s+a\s+hospital\s+stay",
+                                   r"Facility\s+fee\s*\(e\.g\.,\s*hospital\s+room\)"),
+                                  (None, r"Inpatient\s+hospital(?:\s+stay|ization)?")],
+    "outpatient_surgery": [(r"If\s+you\s+have\s+outpatient\s+surgery",
+                            r"Facility\s+fee\s*\(e\.g\.,\s*ambulatory\s+surgery\s+center\)"),
+                           (None, r"Outpatient\s+surgery")],
+}
+
+_DRUG_TIERS = [
+    ("Generic drugs", [r"(?<![\w-])Generic\s+drugs(?:\s*\(Tier\s*1\))?", r"Tier\s*1\b[^:\n]*"]),
+    ("Preferred brand drugs", [r"(?<![\w-])Preferred\s+brand\s+drugs(?:\s*\(Tier\s*2\))?", r"Tier\s*2\b[^:\n]*"]),
+    ("Non-preferred brand drugs", [r"Non-\s?preferred\s+brand\s+drugs(?:\s*\(Tier\s*3\))?", r"Tier\s*3\b[^:\n]*"]),
+    ("Specialty drugs", [r"Specialty(?:\s+drugs)?(?:\s*\(Tier\s*4\))?"]),
+]
+
+
+def _clean(value: str) -> str:
+    value = re.sub(r"(\w)-\s+(\w)", r"\1-\2", value)
+    value = " ".join(value.split()).strip(" ;,:")
+    # Keep the period of abbreviations such as "U.S."
+    return re.sub(r"(?<![A-Z])\.$", "", value)
+
+
+class SbcText:
+    """Document text as non-empty stripped lines, with the chart's provider columns."""
+
+    def __init__(self, text: str):
+        self.lines = [line.strip() for line in text.splitlines() if line.strip()]
+        self.text = "\n".join(self.lines)
+        self._line_starts = []
+        offset = 0
+        for line in self.lines:
+            self._line_starts.append(offset)
+            offset += len(line) + 1
+        self.column = self._preferred_column()
+
+    def _line_at(self, offset: int) -> int:
+        return max(bisect_right(self._line_starts, offset) - 1, 0)
+
+    def _preferred_column(self) -> int:
+        """
+        Index of the in-network cost column. SBC charts have one column per
+        provider tier, each headed "... Provider (You will pay ...)"; plans with
+        an IHCP or preferred tier put it before the regular network column.
+        """
+        header = re.search(r"What\s+You\s+Will\s+Pay(.+?)\nIf\s+you\b", self.text, re.IGNORECASE | re.DOTALL)
+        if not header:
+            return 0
+        columns = [_clean(column) for column in re.split(r"\(You\s+will\s+pay[^)]*\)", header.group(1))[:-1]]
+        for index, column in enumerate(columns):
+            lowered = column.lower()
+            if re.search(r"network\s+provider", lowered) and "out-of-network" not in lowered:
+                return index
+        return 0
+
+    def answer_after(self, anchors: Iterable[str], window: int = 300) -> Optional[str]:
+        """Text following the first matching anchor (an SBC question or a label)"""
+        for anchor in anchors:
+            match = re.search(anchor, self.text, re.IGNORECASE)
+            if match:
+                # Finish the line the window ends in, so no amount is cut in half
+                end = self.text.find("\n", match.end() + window)
+                return self.text[match.end():end if end != -1 else len(self.text)]
+        return None
+
+    def row_cells(self, label: str, start: int = 0) -> Optional[List[str]]:
+        """
+        Cost cells of the first chart row named `label` after offset `start`:
+        each cell starts with an amount, a percentage or "No charge" and may
+        wrap onto lower-case continuation lines. In list layouts ("Label: $20
+        copay, ...") the rest of the label's line is the only cell. Mentions of
+        the label in prose are skipped because no cost cell follows them.
+        """
+        for match in re.finditer(rf"(?:{label})(?!\w)", self.text[start:], re.IGNORECASE):
+            end = start + match.end()
+            line = self._line_at(end)
+            rest = self.text[end:self._line_starts[line] + len(self.lines[line])].strip(" :-\t")
+            if rest:
+                if _COST_IN_TEXT.search(rest):
+                    return [_clean(rest)]
+                continue
+            cells = []
+            for text in self.lines[line + 1:line + 12]:
+                if _COST_CELL.match(text):
+                    cells.append(text)
+                elif cells and (text[0].islower() or text[0] == "("):
+                    cells[-1] += " " + text
+                else:
+                    break
+            if cells:
+                return [_clean(cell) for cell in cells]
+        return None
+
+    def row_value(self, label: str, start: int = 0) -> Optional[str]:
+        cells = self.row_cells(label, start)
+        if not cells:
+            return None
+        return cells[self.column] if self.column < len(cells) else cells[0]
+
+
+def _split_amounts(answer: str) -> Dict[str, str]:
+    """Individual and family amounts stated in an Important Questions answer"""
+    found = {}
+    for match in _LABELED_AMOUNT.finditer(answer):
+        amount = match.group(1) or match.group(4)
+        label = (match.group(2) or match.group(3)).lower()
+        kind = "family" if label == "family" else "individual"
+        found.setdefault(kind, _clean(amount).replace(" ", ""))
+    if found:
+        return found
+    first = answer.strip()
+    if _NO_VALUE.match(first):
+        return {"individual": NOT_APPLICABLE, "family": NOT_APPLICABLE}
+    single = re.match(rf"({_AMOUNT})(?![\d,])", first)
+    # "$0" means there is no deductible at all; any other lone amount is ambiguous for families
+    if single and re.fullmatch(r"\$\s?0(?:\.00)?", single.group(1)):
+        return {"individual": "$0", "family": "$0"}
+    return {}
+
+
+def _bullets(sbc: SbcText, start: str, end: str) -> List[str]:
+    """Items of the "•" list between the start and end headings (items may wrap)"""
+    match = re.search(rf"{start}[^\n]*\n(.*?)(?:{end})", sbc.text, re.IGNORECASE | re.DOTALL)
+    if not match:
+        return []
+    return [_clean(item) for item in match.group(1).split("•") if _clean(item)]
+
+
+def _dash_list(sbc: SbcText, heading: str) -> List[str]:
+    """Items of a "- item" list right under a heading line such as "Exclusions:" """
+    match = re.search(rf"^{heading}\s*:\s*\n((?:[-•*]\s*.+\n?)+)", sbc.text, re.IGNORECASE | re.MULTILINE)
+    if not match:
+        return []
+    return [_clean(line.lstrip("-•* ")) for line in match.group(1).splitlines() if _clean(line.lstrip("-•* "))]
+
+
+def _coverage_details(sbc: SbcText) -> List[str]:
+    details = []
+    referral = sbc.answer_after([r"Do\s+you\s+need\s+a\s+referral\s+to\s+see\s+a\s+specialist\?"], window=20)
+    if referral and referral.strip().lower().startswith("yes"):
+        details.append("Referral required to see a specialist")
+    elif referral and referral.strip().lower().startswith("no"):
+        details.append("No referral needed to see a specialist")
+    excluded = _bullets(sbc, r"Services\s+Your\s+Plan\s+Generally\s+Does\s+NOT\s+Cover",
+                        r"Other\s+Covered\s+Services\s*\(")
+    excluded = excluded or _dash_list(sbc, r"(?:Exclusions|Excluded\s+services)")
+    if excluded:
+        details.append("Not covered: " + ", ".join(excluded))
+    other = _bullets(sbc, r"Other\s+Covered\s+Services\s*\(", r"Your\s+Rights\s+to\s+Continue|\Z")
+    if other:
+        details.append("Other covered services (limitations may apply): " + ", ".join(other))
+    preauthorized = _dash_list(sbc, r"Pre-?\s?authorization\s+required(?:\s+for)?")
+    if preauthorized:
+        details.append("Pre-authorization required for: " + ", ".join(preauthorized))
+    return details
+
+
+def extract_benefit_fields(text: str, fields: Optional[Iterable[str]] = None) -> Dict[str, object]:
+    """
+    {field: value} for the requested BENEFIT_FIELDS (all by default) that the
+    rules resolve from the document text; unresolved fields are omitted.
+    Costs are taken from the in-network column of the services chart.
+    """
+    wanted = list(fields or BENEFIT_FIELDS)
+    sbc = SbcText(text)
+    resolved = {}
+
+    if {"individual_deductible", "family_deductible"} & set(wanted):
+        answer = sbc.answer_after(_DEDUCTIBLE_ANCHORS)
+        for kind, amount in (_split_amounts(answer) if answer else {}).items():
+            resolved[f"{kind}_deductible"] = amount
+    if {"individual_out_of_pocket_max", "family_out_of_pocket_max"} & set(wanted):
+        answer = sbc.answer_after(_OUT_OF_POCKET_ANCHORS)
+        for kind, amount in (_split_amounts(answer) if answer else {}).items():
+            resolved[f"{kind}_out_of_pocket_max"] = amount
+
+    for field, rows in _SERVICE_ROWS.items():
+        if field not in wanted:
+            continue
+        for anchor, label in rows:
+            start = 0
+            if anchor:
+                match = re.search(anchor, sbc.text, re.IGNORECASE)
+                if not match:
+                    continue
+                start = match.end()
+            value = sbc.row_value(label, start)
+            if value:
+                resolved[field] = value
+                break
+
+    if "prescription_coverage" in wanted:
+        tiers = []
+        for name, labels in _DRUG_TIERS:
+            value = next(filter(None, (sbc.row_value(label) for label in labels)), None)
+            if value:
+                tiers.append(f"{name}: {value}")
+        if tiers:
+            resolved["prescription_coverage"] = "; ".join(tiers)
+
+    if "coverage_details" in wanted:
+        details = _coverage_details(sbc)
+        if details:
+            resolved["coverage_details"] = details
+
+    return {field: value for field, value in resolved.items() if field in wanted}
+
+
+def retrieve_field_chunks(bm25: BM25Index, fields: Iterable[str], k: int = FIELD_TOP_K) -> Dict[str, List[int]]:
+    """{field: ids of the top-k chunks for its query}; empty when the document never mentions it"""
+    return {field: [chunk_id for chunk_id, _ in bm25.search(FIELD_QUERIES[field], k=k)] for field in fields}
+
+
+def field_excerpts(chunks: Sequence[str], field_chunks: Dict[str, List[int]],
+                   max_chars: int = EXCERPT_MAX_CHARS) -> str:
+    """
+    The retrieved chunks, each once, tagged with its id and in document order.
+    Fields take turns by rank, so every field gets its best chunk before any
+    gets a second one, until max_chars is reached.
+    """
+    selected, total = set(), 0
+    for rank in range(max((len(ids) for ids in field_chunks.values()), default=0)):
+        for ids in field_chunks.values():
+            if rank < len(ids) and ids[rank] not in selected and total + len(chunks[ids[rank]]) <= max_chars:
+                selected.add(ids[rank])
+                total += len(chunks[ids[rank]])
+    return "\n\n".join(f"[chunk {chunk_id}] {chunks[chunk_id].strip()}" for chunk_id in sorted(selected))
+
+
+def locate_sources(value, candidates: List[int], chunks: Sequence[str]) -> List[int]:
+    """
+    The chunk the value was read from: the best ranked candidate, or else the
+    first chunk of the document, containing the value's first amount,
+    percentage or "No charge" (its text when it has none). Empty when no chunk
+    contains it, rather than pointing at one that does not. Each item of a
+    list (coverage details such as "Not covered: a, b") is located by the
+    first thing it lists.
+    """
+    if isinstance(value, list):
+        return list(dict.fromkeys(
+            chunk_id for item in value
+            for chunk_id in locate_sources(item.split(": ", 1)[-1].split(", ")[0], candidates, chunks)
+        ))
+    if not isinstance(value, str) or value == NOT_SPECIFIED:
+        return []
+    first = _COST_IN_TEXT.search(value)
+    needle = " ".join((first.group(0) if first else value).lower().split())
+    if not needle:
+        return []
+    # "$50" is not found in "$500" nor "20%" in "120%"
+    pattern = re.compile(rf"(?<![\d.,]){re.escape(needle)}(?!,?\d)")
+    for chunk_id in list(candidates) + [i for i in range(len(chunks)) if i not in candidates]:
+        if pattern.search(" ".join(chunks[chunk_id].lower().split())):
+            return [chunk_id]
+    return []
+
+
+def build_fallback_prompt(fields: Iterable[str], excerpts: str) -> str:
+    """Prompt asking the LLM for just the given fields, from field_excerpts() of the document"""
+    template = {
+        field: (f"{BENEFIT_FIELDS[field]} as a JSON array of strings, or []" if field == "coverage_details"
+                else f"{BENEFIT_FIELDS[field]} or '{NOT_SPECIFIED}'")
+        for field in fields
+    }
+    return (
+        "These are excerpts of an insurance plan document, each tagged with its chunk id. "
+        "Return a JSON object with exactly these keys:\n"
+        f"{json.dumps(template)}\n"
+        "Extract exact amounts when available, for in-network providers if the plan has several tiers. "
+        "Include dollar signs and any relevant notes about limitations.\n\n"
+        f"Excerpts:\n{excerpts}"
+    )
+
+
+def parse_fallback_response(content: str, fields: Iterable[str]) -> Dict[str, object]:
+    """The requested fields found in the LLM's JSON answer; anything else is dropped"""
+    match = re.search(r"\{.*\}", content, re.DOTALL)
+    if not match:
+        return {}
+    try:
+        values = json.loads(match.group(0))
+    except ValueError:
+        return {}
+    found = {}
+    for field in fields:
+        value = values.get(field)
+        if field == "coverage_details":
+            if isinstance(value, list) and value:
+                found[field] = [str(item) for item in value]
+        elif value and str(value).strip().lower() not in ("not specified", "not found", "null", "none"):
+            found[field] = str(value)
+    return found
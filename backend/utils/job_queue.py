@@ -0,0 +1,161 @@
+# backend/utils/job_queue.py
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from utils.shared_state import StateBackend
+import os
+import socket
+import threading
+import time
+import uuid
+
+
+class Job:
+    """State of one background job, updated by the worker and read by status requests."""
+
+    def __init__(self, owner: str, kind: str, on_change: Callable[['Job'], None] = None, **details):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.kind = kind
+        self.details = details
+        self.status = 'queued'
+        self.stage = None
+        self.stages = []
+        self.result = None
+        self.error = None
+        self.status_code = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._stage_started = None
+        self._on_change = on_change
+
+    def save(self):
+        if self._on_change is not None:
+            self._on_change(self)
+
+    def set_stage(self, name: str):
+        """Mark the start of a named stage; the previous stage is closed with its duration."""
+        now = time.perf_counter()
+        if self.stage is not None and self._stage_started is not None:
+            self.stages.append({'stage': self.stage, 'seconds': round(now - self._stage_started, 4)})
+        self.stage = name
+        self._stage_started = now
+        self.save()
+
+    def fail(self, error: dict, status_code: int = 500):
+        """End the job with an error payload (same shape as the synchronous error responses)."""
+        self.error = error
+        self.status_code = status_code
+
+    def to_dict(self) -> dict:
+        data = {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'stage': self.stage,
+            'stages': list(self.stages),
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            **self.details
+        }
+        if self.status == 'done':
+            data['result'] = self.result
+        if self.status == 'failed':
+            data['error'] = self.error
+            data['status_code'] = self.status_code
+        return data
+
+
+class JobQueue:
+    """
+    Bounded local worker pool for long-running request work (no outside broker).
+    Jobs are queued FIFO on the executor of the process that accepted them.
+    Their status is written to the shared state backend, so any worker process
+    can answer a status poll, and kept for `ttl_seconds` after the last update.
+
+    The accepting process re-saves its unfinished jobs every `heartbeat_seconds`.
+    A queued or running job of another process whose last save is older than
+    `stale_seconds` lost its worker (it was restarted or killed) and is
+    reported, and saved, as failed.
+    """
+
+    def __init__(self, backend: StateBackend, max_workers: int = 2, ttl_seconds: int = 3600,
+                 heartbeat_seconds: float = 10, stale_seconds: float = 60):
+        self.backend = backend
+        self.max_workers = max_workers
+        self.ttl_seconds = ttl_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stale_seconds = stale_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        # Unfinished jobs of this process; saves are serialized so a heartbeat never
+        # writes an older snapshot over a job's final status
+        self._active = {}
+        self._lock = threading.Lock()
+        threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True).start()
+
+    def submit(self, owner: str, kind: str, fn: Callable[[Job], Optional[dict]], **details) -> Job:
+        """Queue fn(job). Its return value becomes the job result unless it called job.fail()."""
+        self.backend.prune('jobs', time.time() - self.ttl_seconds)
+        job = Job(owner, kind, on_change=self._save, **details)
+        with self._lock:
+            self._active[job.id] = job
+        job.save()
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def _save(self, job: Job):
+        with self._lock:
+            self.backend.put('jobs', job.id, {'owner': job.owner, 'worker': self.worker_id,
+                                              'heartbeat': time.time(), 'job': job.to_dict()})
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            with self._lock:
+                jobs = list(self._active.values())
+            for job in jobs:
+                try:
+                    job.save()
+                except Exception as e:
+                    print(f"Error saving heartbeat of {job.kind} job {job.id}: {str(e)}")
+
+    def _run(self, job: Job, fn: Callable[[Job], Optional[dict]]):
+        job.status = 'running'
+        job.started_at = time.time()
+        job.save()
+        try:
+            result = fn(job)
+            job.set_stage(None)
+            if job.error is not None:
+                job.status = 'failed'
+            else:
+                job.result = result
+                job.status = 'done'
+        except Exception as e:
+            print(f"Error in {job.kind} job {job.id}: {str(e)}")
+            job.set_stage(None)
+            job.fail({'error': str(e)})
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._active.pop(job.id, None)
+            job.save()
+
+    def get(self, job_id: str, owner: str = None) -> Optional[dict]:
+        """Status of a job as returned by Job.to_dict(); jobs of another owner are not visible."""
+        record = self.backend.get('jobs', job_id)
+        if record is None:
+            return None
+        saved, version = record
+        if owner is not None and saved['owner'] != owner:
+            return None
+        job = saved['job']
+        if (job['status'] in ('queued', 'running') and saved.get('worker') != self.worker_id
+                and time.time() - saved.get('heartbeat', version) > self.stale_seconds):
+            job = {**job, 'status': 'failed', 'finished_at': time.time(), 'status_code': 500,
+                   'error': {'error': 'The worker running this job stopped before it finished'}}
+            self.backend.put('jobs', job_id, {**saved, 'job': job})
+        return job
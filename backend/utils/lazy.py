@@ -0,0 +1,34 @@
+# backend/utils/lazy.py
+from typing import Any, Callable
+import threading
+
+
+class Lazy:
+    """
+    Stand-in for an object that is expensive to import or construct (API
+    clients, indexes, chains). The factory runs on first attribute access,
+    once, even under concurrent first use; after that every attribute is
+    forwarded to the real object.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self) -> Any:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._value = self._factory()
+                    self._loaded = True
+        return self._value
+
+    def __getattr__(self, name):
+        # Only called for attributes Lazy itself does not have
+        return getattr(self.get(), name)
@@ -0,0 +1,41 @@
+# backend/utils/llm_tracing.py
+"""
+LangChain hooks that feed the metrics of utils/tracing.py: token usage per
+LLM call and embedding calls. They subclass langchain_core classes, which are
+slow to import, so they live apart from utils/tracing.py and are imported
+where they are first built.
+"""
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+from typing import List
+from utils.tracing import metrics
+
+
+class TokenUsageHandler(BaseCallbackHandler):
+    """Collects the token usage reported by one LLM call."""
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def on_llm_end(self, response, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.completion_tokens += usage.get("completion_tokens", 0)
+
+
+class TracedEmbeddings(Embeddings):
+    """Counts calls and texts sent to the wrapped embeddings backend."""
+
+    def __init__(self, wrapped: Embeddings):
+        self.wrapped = wrapped
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        metrics.inc("coveredai_embedding_calls_total", kind="documents")
+        metrics.inc("coveredai_embedding_texts_total", len(texts), kind="documents")
+        return self.wrapped.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        metrics.inc("coveredai_embedding_calls_total", kind="query")
+        metrics.inc("coveredai_embedding_texts_total", kind="query")
+        return self.wrapped.embed_query(text)
@@ -0,0 +1,24 @@
+# backend/utils/process_pool.py
+"""
+Process pools for CPU-bound parsing (PDF pages, compared plans, the RAG
+index build). Workers are started with forkserver, or spawn where that is
+missing, never forked: the app process has live threads (Flask, upload
+jobs) and a forked worker can inherit one of their locks held. A spawned
+worker re-imports the main module, so scripts that use these pools need an
+`if __name__ == "__main__":` guard.
+
+Long-lived pools are created on first use with Lazy, e.g.
+`Lazy(lambda: new_process_pool(4))`, so concurrent first requests share one.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+
+def process_start_context():
+    """multiprocessing context that starts workers without forking this process"""
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def new_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=max(1, max_workers), mp_context=process_start_context())
@@ -0,0 +1,195 @@
+# backend/utils/shared_state.py
+"""
+Shared state for running the app as several worker processes (e.g. gunicorn -w N).
+
+Everything that must look the same from every worker (documents, conversations,
+upload job status) goes through a StateBackend. SQLiteStateBackend works for
+any number of processes on one host. A networked store (Redis or similar) can
+be plugged in by subclassing StateBackend, whose methods are all abstract, and
+registering it with register_state_backend().
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class StateBackend(ABC):
+    """Namespaced JSON key/value records and append-only lists"""
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[Tuple[dict, float]]:
+        """(value, version) of a record, or None. The version changes on every put."""
+
+    @abstractmethod
+    def version(self, namespace: str, key: str) -> Optional[float]:
+        """Version of a record without reading its value, or None if it does not exist"""
+
+    @abstractmethod
+    def put(self, namespace: str, key: str, value: dict) -> float:
+        ...
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def keys(self, namespace: str, prefix: str = "") -> List[str]:
+        """Keys of a namespace starting with prefix, oldest first"""
+
+    @abstractmethod
+    def versions(self, namespace: str, prefix: str = "") -> Dict[str, float]:
+        """{key: version} of the records whose key starts with prefix"""
+
+    @abstractmethod
+    def append(self, namespace: str, key: str, value: dict):
+        ...
+
+    @abstractmethod
+    def items(self, namespace: str, key: str) -> List[dict]:
+        """Values appended to a list, in order"""
+
+    @abstractmethod
+    def count(self, namespace: str) -> int:
+        ...
+
+    @abstractmethod
+    def prune(self, namespace: str, older_than: float):
+        """Delete records of a namespace last written before the given timestamp"""
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    StateBackend in one SQLite file in WAL mode: readers never block the writer
+    and every process opening the same path sees committed writes immediately.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS records (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                version REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )"""
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS lists (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS lists_key ON lists (namespace, key, id)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; SQLite serialises writers across processes
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key):
+        row = self._conn().execute(
+            "SELECT value, version FROM records WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def version(self, namespace, key):
+        row = self._conn().execute(
+            "SELECT version FROM records WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, namespace, key, value):
+        conn = self._conn()
+        with conn:
+            # Read the previous version inside the write transaction, so processes rewriting
+            # the same key at once still get strictly increasing versions
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT version FROM records WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            # Strictly increasing, so a rewrite within the same clock tick still looks new
+            version = max(time.time(), (row[0] if row else 0.0) + 1e-6)
+            conn.execute(
+                "INSERT OR REPLACE INTO records (namespace, key, value, version) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), version),
+            )
+        return version
+
+    def delete(self, namespace, key):
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute("DELETE FROM records WHERE namespace = ? AND key = ?", (namespace, key))
+            conn.execute("DELETE FROM lists WHERE namespace = ? AND key = ?", (namespace, key))
+        return cursor.rowcount > 0
+
+    def keys(self, namespace, prefix=""):
+        rows = self._conn().execute(
+            "SELECT key FROM records WHERE namespace = ? AND substr(key, 1, ?) = ? ORDER BY version",
+            (namespace, len(prefix), prefix),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def versions(self, namespace, prefix=""):
+        rows = self._conn().execute(
+            "SELECT key, version FROM records WHERE namespace = ? AND substr(key, 1, ?) = ?",
+            (namespace, len(prefix), prefix),
+        ).fetchall()
+        return dict(rows)
+
+    def append(self, namespace, key, value):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO lists (namespace, key, value) VALUES (?, ?, ?)", (namespace, key, json.dumps(value))
+            )
+
+    def items(self, namespace, key):
+        rows = self._conn().execute(
+            "SELECT value FROM lists WHERE namespace = ? AND key = ? ORDER BY id", (namespace, key)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self, namespace):
+        return self._conn().execute("SELECT COUNT(*) FROM records WHERE namespace = ?", (namespace,)).fetchone()[0]
+
+    def prune(self, namespace, older_than):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM records WHERE namespace = ? AND version < ?", (namespace, older_than))
+
+
+STATE_BACKENDS: Dict[str, type] = {"sqlite": SQLiteStateBackend}
+
+
+def register_state_backend(scheme: str, backend_class: type):
+    """Make a StateBackend implementation available as STATE_BACKEND_URL=<scheme>://..."""
+    STATE_BACKENDS[scheme] = backend_class
+
+
+def create_state_backend(url: str) -> StateBackend:
+    """Build the backend named by a URL such as sqlite:///path/to/state.sqlite3"""
+    scheme, _, location = url.partition("://")
+    if scheme not in STATE_BACKENDS:
+        raise ValueError(f"Unknown state backend '{scheme}' (available: {', '.join(sorted(STATE_BACKENDS))})")
+    if scheme == "sqlite":
+        # sqlite:///relative/path and sqlite:////absolute/path, as in SQLAlchemy URLs
+        return SQLiteStateBackend(location[1:] if location.startswith("/") else location)
+    return STATE_BACKENDS[scheme](location)
@@ -0,0 +1,190 @@
+# backend/utils/text_extraction.py
+from bisect import bisect_right
+from typing import Callable, Iterator, List, Optional, Tuple
+from utils.lazy import Lazy
+from utils.process_pool import new_process_pool
+import os
+
+# Separator placed between pages in the joined document text
+PAGE_SEPARATOR = "\n\n"
+# PDFs with at least this many pages are split across worker processes
+PARALLEL_PAGE_THRESHOLD = int(os.getenv("EXTRACTION_PARALLEL_PAGES", "32"))
+MAX_WORKERS = int(os.getenv("EXTRACTION_MAX_WORKERS", str(os.cpu_count() or 1)))
+# Text waiting for PageChunker is split once it reaches this many characters
+CHUNK_BUFFER_CHARS = int(os.getenv("CHUNK_BUFFER_CHARS", "8000"))
+
+# Shared by every extraction, created on first use
+_page_pool = Lazy(lambda: new_process_pool(MAX_WORKERS))
+
+
+class ExtractedDocument:
+    """Page-indexed document text with the offset where each page starts."""
+
+    def __init__(self, pages: List[str]):
+        self.pages = pages
+        self.text = PAGE_SEPARATOR.join(pages)
+        self.page_offsets = []
+        offset = 0
+        for page in pages:
+            self.page_offsets.append(offset)
+            offset += len(page) + len(PAGE_SEPARATOR)
+
+
+def page_for_offset(page_offsets: List[int], offset: int) -> int:
+    """1-based page number containing the given character offset."""
+    return max(bisect_right(page_offsets, offset), 1)
+
+
+def locate_chunk_pages(text: str, chunks: List[str], page_offsets: List[int]) -> List[int]:
+    """Page number where each chunk (in document order) starts."""
+    pages = []
+    cursor = 0
+    for chunk in chunks:
+        start = text.find(chunk, cursor)
+        if start == -1:
+            start = cursor
+        pages.append(page_for_offset(page_offsets, start))
+        cursor = start + 1
+    return pages
+
+
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> List[str]:
+    import fitz  # PyMuPDF
+    with fitz.open(pdf_path) as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+
+def iter_pdf_pages(pdf_path: str, parallel: bool = True) -> Iterator[str]:
+    """
+    Yield the text of each PDF page, in order, as soon as it is parsed. Large
+    documents are split into page ranges parsed across processes; a range is
+    yielded once it is done while later ranges are still being parsed.
+    """
+    import fitz  # PyMuPDF
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+        if not parallel or page_count < PARALLEL_PAGE_THRESHOLD or MAX_WORKERS <= 1:
+            for page in doc:
+                yield page.get_text()
+            return
+
+    step = -(-page_count // MAX_WORKERS)
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    futures = [_page_pool.get().submit(_extract_page_range, pdf_path, start, stop) for start, stop in ranges]
+    for future in futures:
+        yield from future.result()
+
+
+def extract_pdf_pages(pdf_path: str, parallel: bool = True) -> List[str]:
+    """Text of every PDF page."""
+    return list(iter_pdf_pages(pdf_path, parallel=parallel))
+
+
+def extract_docx_pages(docx_path: str) -> List[str]:
+    """DOCX has no fixed pages, so paragraphs and tables come back as a single page."""
+    import docx
+    document = docx.Document(docx_path)
+    parts = [paragraph.text + "\n" for paragraph in document.paragraphs]
+    for table in document.tables:
+        for row in table.rows:
+            parts.extend(cell.text + " " for cell in row.cells)
+            parts.append("\n")
+    return ["".join(parts)]
+
+
+def iter_document_pages(file_path: str, parallel: bool = True) -> Iterator[str]:
+    """Generator mode: yield pages of a PDF or DOCX file, so each can be processed
+    (e.g. sanitized) while later ones are still being parsed."""
+    if file_path.lower().endswith(".docx"):
+        yield from extract_docx_pages(file_path)
+    else:
+        yield from iter_pdf_pages(file_path, parallel=parallel)
+
+
+def extract_document(file_path: str, parallel: bool = True) -> ExtractedDocument:
+    """Extract a PDF or DOCX file into page-indexed text. Raises on unreadable files."""
+    return ExtractedDocument(list(iter_document_pages(file_path, parallel=parallel)))
+
+
+class PageChunker:
+    """
+    Chunks page-indexed text while pages are still arriving. Pages are joined
+    as ExtractedDocument joins them and the waiting text is split with `split`
+    once it reaches buffer_chars. The last chunk of each split may still grow
+    with the next page, so it is held back and the buffer restarts where it
+    starts; chunks keep their overlap across page boundaries and come out
+    almost exactly as splitting the whole text at once would give them.
+    """
+
+    def __init__(self, split: Callable[[str], List[str]], buffer_chars: int = CHUNK_BUFFER_CHARS):
+        self.split = split
+        self.buffer_chars = buffer_chars
+        self.pages: List[str] = []
+        self.page_offsets: List[int] = []
+        self.chunks: List[str] = []
+        self.chunk_pages: List[int] = []
+        self._buffer = ""
+        self._buffer_start = 0
+        self._length = 0
+
+    def add_page(self, page: str):
+        if self.pages:
+            self._buffer += PAGE_SEPARATOR
+            self._length += len(PAGE_SEPARATOR)
+        self.page_offsets.append(self._length)
+        self.pages.append(page)
+        self._buffer += page
+        self._length += len(page)
+        if len(self._buffer) >= self.buffer_chars:
+            self._split(final=False)
+
+    def finish(self) -> ExtractedDocument:
+        """Split what is left and return the whole document"""
+        self._split(final=True)
+        return ExtractedDocument(self.pages)
+
+    def _split(self, final: bool):
+        chunks = self.split(self._buffer)
+        starts = []
+        cursor = 0
+        for chunk in chunks:
+            start = self._buffer.find(chunk, cursor)
+            if start == -1:
+                start = cursor
+            starts.append(start)
+            cursor = start + 1
+
+        ready = len(chunks) if final else len(chunks) - 1
+        for chunk, start in zip(chunks[:ready], starts[:ready]):
+            self.chunks.append(chunk)
+            self.chunk_pages.append(page_for_offset(self.page_offsets, self._buffer_start + start))
+        if not final and ready > 0:
+            self._buffer = self._buffer[starts[ready]:]
+            self._buffer_start += starts[ready]
+
+
+def extract_document_chunks(file_path: str, split: Callable[[str], List[str]], parallel: bool = True,
+                            map_page: Optional[Callable[[str], str]] = None
+                            ) -> Tuple[ExtractedDocument, List[str], List[int]]:
+    """
+    (document, chunks, page of each chunk) of a PDF or DOCX file. Each page is
+    passed through map_page (e.g. sanitization) and chunked as it arrives,
+    while later pages are still being parsed. Raises on unreadable files.
+    """
+    chunker = PageChunker(split)
+    for page in iter_document_pages(file_path, parallel=parallel):
+        chunker.add_page(map_page(page) if map_page else page)
+    document = chunker.finish()
+    return document, chunker.chunks, chunker.chunk_pages
+
+
+def extract_document_text(file_path: str, parallel: bool = False) -> str:
+    """
+    Extract text from a PDF or DOCX file. Kept free of Flask/LangChain imports so it
+    can run cheaply in a process pool. Returns "" when the file can't be read.
+    """
+    try:
+        return extract_document(file_path, parallel=parallel).text
+    except Exception as e:
+        print(f"Error extracting text from {file_path}: {str(e)}")
+        return ""
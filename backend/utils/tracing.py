@@ -0,0 +1,186 @@
+# backend/utils/tracing.py
+"""
+Lightweight per-stage latency tracing and Prometheus metrics.
+
+Stages are timed with `with stage("extract"):` inside a route. Every stage is
+recorded in a histogram labelled by endpoint and stage, and the stages of the
+current request are returned in a Server-Timing header. All bookkeeping is
+in-process (a dict update under a lock per observation), so it can stay on
+in production. The LangChain hooks that feed these metrics are in
+utils/llm_tracing.py.
+"""
+from contextlib import contextmanager
+from flask import Response, g, has_request_context, request
+from typing import Callable, Dict, Iterable, List, Tuple
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labels: dict) -> Tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: Iterable[Tuple[str, object]]) -> str:
+    parts = []
+    for key, value in labels:
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsRegistry:
+    """Counters and histograms rendered in the Prometheus text exposition format."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._histograms: Dict[Tuple[str, Tuple], List] = {}
+        self._collectors: List[Callable] = []
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._meta[name] = (kind, help_text)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+                    break
+            histogram[1] += value
+            histogram[2] += 1
+
+    def add_collector(self, collector: Callable):
+        """Register fn() -> [(name, kind, help, labels_dict, value)] evaluated at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: [list(h[0]), h[1], h[2]] for key, h in self._histograms.items()}
+
+        def header(name, default_kind):
+            kind, help_text = self._meta.get(name, (default_kind, name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name in sorted({name for name, _ in counters}):
+            header(name, "counter")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for name in sorted({name for name, _ in histograms}):
+            header(name, "histogram")
+            for (metric, labels), (bucket_counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        for collector in self._collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                print(f"Error collecting metrics: {str(e)}")
+                continue
+            described = set()
+            for name, kind, help_text, labels, value in samples:
+                if name not in described:
+                    lines.append(f"# HELP {name} {help_text}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    described.add(name)
+                lines.append(f"{name}{_format_labels(sorted(labels.items()))} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+metrics.describe("coveredai_request_seconds", "histogram", "Total request latency by endpoint")
+metrics.describe("coveredai_requests_total", "counter", "Requests by endpoint and status code")
+metrics.describe("coveredai_stage_seconds", "histogram", "Latency of each traced stage of a request")
+metrics.describe("coveredai_llm_calls_total", "counter", "LLM calls by call site and whether the cache answered")
+metrics.describe("coveredai_llm_tokens_total", "counter", "LLM tokens by call site and kind (prompt or completion)")
+metrics.describe("coveredai_embedding_calls_total", "counter", "Calls made to the embeddings backend")
+metrics.describe("coveredai_embedding_texts_total", "counter", "Texts sent to the embeddings backend")
+metrics.describe("coveredai_retrieval_total", "counter", "/ask retrievals by mode, including BM25 fast-path answers")
+metrics.describe("coveredai_context_tokens_total", "counter", "Context tokens packed into /ask prompts")
+metrics.describe("coveredai_context_chunks_total", "counter", "Chunks packed into /ask prompts")
+metrics.describe("coveredai_context_duplicates_total", "counter", "Retrieved chunks left out of /ask prompts as near-duplicates")
+
+
+def _current_endpoint() -> str:
+    return (request.endpoint or "unknown") if has_request_context() else "background"
+
+
+def record_stage(name: str, elapsed: float, endpoint: str = None):
+    metrics.observe("coveredai_stage_seconds", elapsed, endpoint=endpoint or _current_endpoint(), stage=name)
+    if has_request_context():
+        g.setdefault("stage_timings", []).append((name, elapsed))
+
+
+@contextmanager
+def stage(name: str, endpoint: str = None):
+    """Time a block as one stage of the current request.
+
+    Background work has no request context, so it passes the endpoint it runs on behalf of.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start, endpoint)
+
+
+def record_llm_call(site: str, prompt_tokens: int = 0, completion_tokens: int = 0, cached: bool = False):
+    metrics.inc("coveredai_llm_calls_total", site=site, cached=str(cached).lower())
+    if prompt_tokens:
+        metrics.inc("coveredai_llm_tokens_total", prompt_tokens, site=site, kind="prompt")
+    if completion_tokens:
+        metrics.inc("coveredai_llm_tokens_total", completion_tokens, site=site, kind="completion")
+
+
+def init_tracing(app):
+    """Time every request, add a Server-Timing header and serve /metrics."""
+
+    @app.before_request
+    def _start_request_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.get("request_start")
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or "unknown"
+        if endpoint != "metrics_endpoint":
+            metrics.observe("coveredai_request_seconds", elapsed, endpoint=endpoint, method=request.method)
+            metrics.inc("coveredai_requests_total", endpoint=endpoint, method=request.method,
+                        status=response.status_code)
+        timings = [f"{name};dur={duration * 1000:.1f}" for name, duration in g.get("stage_timings", [])]
+        timings.append(f"total;dur={elapsed * 1000:.1f}")
+        response.headers["Server-Timing"] = ", ".join(timings)
+        return response
+
+    @app.route("/metrics", endpoint="metrics_endpoint")
+    def _metrics():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,55 @@
+# backend/utils/upload_cache.py
+from collections import OrderedDict
+import hashlib
+import threading
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class UploadCache:
+    """
+    Content-addressed cache of document processing results, keyed by the SHA-256
+    of the uploaded bytes and shared across users.
+
+    Entries only hold what is derived from the document itself (extracted text,
+    validation verdict, chunks, chunk vectors, suggested questions). Per-user
+    state such as conversations never goes in here.
+    """
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Hand out copies so one user's document entry can't mutate another's
+        result = dict(entry)
+        if result.get('chunks') is not None:
+            result['chunks'] = list(result['chunks'])
+        if result.get('suggested_questions') is not None:
+            result['suggested_questions'] = list(result['suggested_questions'])
+        return result
+
+    def put(self, key: str, **fields):
+        with self._lock:
+            entry = self._entries.get(key, {})
+            entry.update(fields)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
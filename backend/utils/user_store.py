@@ -0,0 +1,155 @@
+# backend/utils/user_store.py
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from utils.shared_state import StateBackend
+import sys
+import threading
+
+# Fields of a document record that are persisted; the vector index is kept on
+# disk separately by rag/document_index.py and only cached in memory here.
+DOCUMENT_FIELDS = ('full_text', 'chunks', 'chunk_pages', 'page_offsets', 'content_hash')
+
+
+def estimate_document_bytes(doc: dict) -> int:
+    """Rough resident size of a document record, including its vector and BM25 indexes"""
+    size = sys.getsizeof(doc.get('full_text') or '')
+    for chunk in doc.get('chunks') or []:
+        size += sys.getsizeof(chunk)
+    size += 8 * (len(doc.get('chunk_pages') or []) + len(doc.get('page_offsets') or []))
+    index = doc.get('index')
+    faiss_index = getattr(index, 'index', None)
+    if faiss_index is not None:
+        size += faiss_index.ntotal * faiss_index.d * 4
+    size += getattr(doc.get('bm25'), 'approx_bytes', 0)
+    return size
+
+
+def document_key(user_id: str, filename: str) -> str:
+    # filename comes from secure_filename and never contains '/'
+    return f"{user_id}/{filename}"
+
+
+class UserDataStore:
+    """
+    Per-user documents and conversations kept in a shared StateBackend.
+
+    Documents are written through to the backend on put and the most recently
+    used ones are also kept in memory, up to `memory_budget_bytes`. Cold
+    documents are dropped from memory and transparently reloaded on the next
+    access. Each memory hit is checked against the backend's record version,
+    so a document replaced or deleted by another worker process is never
+    served stale. Conversations live in the backend only.
+    """
+
+    def __init__(self, backend: StateBackend, memory_budget_bytes: int = 256 * 1024 * 1024):
+        self.backend = backend
+        self.memory_budget_bytes = memory_budget_bytes
+        self._memory = OrderedDict()
+        self._sizes = {}
+        self._versions = {}
+        self.resident_bytes = 0
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+
+    # Documents
+
+    def put_document(self, user_id: str, filename: str, doc: dict):
+        key = document_key(user_id, filename)
+        version = self.backend.put('documents', key, {field: doc.get(field) for field in DOCUMENT_FIELDS})
+        with self._lock:
+            self._remember(key, dict(doc), version)
+
+    def get_document(self, user_id: str, filename: str) -> Optional[dict]:
+        """The document record, reloaded from the backend if it was evicted. None if unknown."""
+        key = document_key(user_id, filename)
+        version = self.backend.version('documents', key)
+        with self._lock:
+            if version is None:
+                self._forget(key)
+                return None
+            doc = self._memory.get(key)
+            if doc is not None and self._versions.get(key) == version:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return doc
+
+        record = self.backend.get('documents', key)
+        if record is None:
+            return None
+        doc, version = record
+        doc['index'] = None
+        with self._lock:
+            self.loads += 1
+            self._remember(key, doc, version)
+        return doc
+
+    def update_document(self, user_id: str, filename: str, **fields):
+        """Attach in-memory only fields (e.g. the vector index) and re-account its size"""
+        key = document_key(user_id, filename)
+        with self._lock:
+            doc = self._memory.get(key)
+            if doc is None:
+                return
+            doc.update(fields)
+            self._remember(key, doc, self._versions[key])
+
+    def delete_document(self, user_id: str, filename: str) -> Optional[dict]:
+        """Remove a document, returning its record so a failed delete can restore it"""
+        doc = self.get_document(user_id, filename)
+        key = document_key(user_id, filename)
+        self.backend.delete('documents', key)
+        with self._lock:
+            self._forget(key)
+        return doc
+
+    def list_documents(self, user_id: str) -> List[str]:
+        prefix = document_key(user_id, '')
+        return [key[len(prefix):] for key in self.backend.keys('documents', prefix)]
+
+    def document_versions(self, user_id: str) -> Dict[str, float]:
+        """{filename: version} of the user's documents; the version changes whenever a document is replaced"""
+        prefix = document_key(user_id, '')
+        return {key[len(prefix):]: version for key, version in self.backend.versions('documents', prefix).items()}
+
+    def _remember(self, key, doc, version):
+        self._forget(key)
+        size = estimate_document_bytes(doc)
+        self._memory[key] = doc
+        self._sizes[key] = size
+        self._versions[key] = version
+        self.resident_bytes += size
+        # Keep at least the document just used, even if it alone exceeds the budget
+        while self.resident_bytes > self.memory_budget_bytes and len(self._memory) > 1:
+            cold_key, _ = self._memory.popitem(last=False)
+            self.resident_bytes -= self._sizes.pop(cold_key)
+            del self._versions[cold_key]
+            self.evictions += 1
+
+    def _forget(self, key):
+        if key in self._memory:
+            del self._memory[key]
+            del self._versions[key]
+            self.resident_bytes -= self._sizes.pop(key)
+
+    # Conversations
+
+    def append_conversation(self, user_id: str, entry: dict):
+        self.backend.append('conversations', user_id, entry)
+
+    def get_conversations(self, user_id: str) -> List[dict]:
+        return self.backend.items('conversations', user_id)
+
+    def stats(self) -> dict:
+        documents = self.backend.count('documents')
+        with self._lock:
+            return {
+                'documents': documents,
+                'resident_documents': len(self._memory),
+                'resident_bytes': self.resident_bytes,
+                'memory_budget_bytes': self.memory_budget_bytes,
+                'hits': self.hits,
+                'loads': self.loads,
+                'evictions': self.evictions
+            }
@@ -9,7 +9,7 @@ import {
   ChevronUpIcon,
   DocumentDuplicateIcon
 } from '@heroicons/react/24/outline';
-import { Benefits, Answer } from './types';
+import { Benefits, Answer, BatchAnswer } from './types';
 import Home from './components/Home';
 import Dashboard from './components/Dashboard';
 import MultiPlanComparison from './components/MultiPlanComparison';
@@ -21,6 +21,7 @@ const App: React.FC = () => {
   const [selectedFile, setSelectedFile] = useState<string | null>(null);
   const [question, setQuestion] = useState('');
   const [answer, setAnswer] = useState<Answer | null>(null);
+  const [batchAnswers, setBatchAnswers] = useState<BatchAnswer[]>([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | { error: string; message: string } | null>(null);
   const [benefits, setBenefits] = useState<Benefits | null>(null);
@@ -82,6 +83,30 @@ const App: React.FC = () => {
     }
   };
 
+  const waitForUploadJob = async (jobId: string) => {
+    while (true) {
+      await new Promise(resolve => setTimeout(resolve, 1000));
+      const response = await fetch(`http://localhost:5000/upload-status/${jobId}`, {
+        credentials: 'include'
+      });
+      const job = await response.json();
+
+      if (!response.ok) {
+        throw new Error(job.error || 'Failed to upload file');
+      }
+      if (job.status === 'done') {
+        return job.result;
+      }
+      if (job.status === 'failed') {
+        if (job.error?.message) {
+          setError(job.error);
+          return null;
+        }
+        throw new Error(job.error?.error || 'Failed to upload file');
+      }
+    }
+  };
+
   const handleFileUpload = async (selectedFile: File) => {
     setLoading(true);
     setError('');
@@ -105,10 +130,16 @@ const App: React.FC = () => {
         credentials: 'include'
       });
 
-      const data = await response.json();
+      const accepted = await response.json();
 
       if (!response.ok) {
-        throw new Error(data.error || 'Failed to upload file');
+        throw new Error(accepted.error || 'Failed to upload file');
+      }
+
+      // Ingestion runs in the background; poll the job until it finishes
+      const data = await waitForUploadJob(accepted.job_id);
+      if (!data) {
+        return;
       }
 
       // Check if the returned filename already exists in the files array
@@ -197,7 +228,7 @@ const App: React.FC = () => {
     setAnswer(null);
 
     try {
-      const response = await fetch('http://localhost:5000/ask', {
+      const response = await fetch('http://localhost:5000/ask-stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -209,15 +240,84 @@ const App: React.FC = () => {
         credentials: 'include'
       });
 
+      if (!response.ok || !response.body) {
+        const data = await response.json();
+        throw new Error(data.error || 'Failed to get answer');
+      }
+
+      // Sources arrive first, then the answer token by token
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let current: Answer = { answer: '', sources: [] };
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const events = buffer.split('\n\n');
+        buffer = events.pop() || '';
+        for (const raw of events) {
+          const eventLine = raw.split('\n').find(line => line.startsWith('event: '));
+          const dataLine = raw.split('\n').find(line => line.startsWith('data: '));
+          if (!eventLine || !dataLine) continue;
+          const event = eventLine.slice('event: '.length);
+          const data = JSON.parse(dataLine.slice('data: '.length));
+
+          if (event === 'error') {
+            throw new Error(data.error || 'Failed to get answer');
+          }
+          if (event === 'sources') {
+            current = { ...current, sources: data.sources };
+          } else if (event === 'token') {
+            current = { ...current, answer: current.answer + data.token };
+          } else if (event === 'done') {
+            current = { ...current, answer: data.answer };
+          }
+          setAnswer(current);
+          setLoading(false);
+        }
+      }
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'Failed to get answer');
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  // All suggested questions in one /ask-batch request instead of one /ask each
+  const handleAnswerAllSuggestions = async () => {
+    if (!selectedFile || suggestedQuestions.length === 0) {
+      return;
+    }
+
+    setLoading(true);
+    setError(null);
+    setBatchAnswers([]);
+
+    try {
+      const response = await fetch('http://localhost:5000/ask-batch', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+          filename: selectedFile,
+          questions: suggestedQuestions
+        }),
+        credentials: 'include'
+      });
+
       const data = await response.json();
 
       if (!response.ok) {
-        throw new Error(data.error || 'Failed to get answer');
+        throw new Error(data.error || 'Failed to get answers');
       }
 
-      setAnswer(data);
+      setBatchAnswers(data.results);
     } catch (err) {
-      setError(err instanceof Error ? err.message : 'Failed to get answer');
+      setError(err instanceof Error ? err.message : 'Failed to get answers');
     } finally {
       setLoading(false);
     }
@@ -337,6 +437,8 @@ const App: React.FC = () => {
                     onQuestionSubmit={handleQuestionSubmit}
                     answer={answer}
                     suggestedQuestions={suggestedQuestions}
+                    onAnswerAllSuggestions={handleAnswerAllSuggestions}
+                    batchAnswers={batchAnswers}
                     fileInputRef={fileInputRef}
                   />
                 } 
@@ -8,7 +8,7 @@ import {
   ChatBubbleLeftRightIcon,
   ArrowPathIcon
 } from '@heroicons/react/24/outline';
-import { Benefits, Answer, Source } from '../types';
+import { Benefits, Answer, BatchAnswer, Source } from '../types';
 
 interface DashboardProps {
   files: string[];
@@ -27,6 +27,8 @@ interface DashboardProps {
   onQuestionSubmit: () => void;
   answer: Answer | null;
   suggestedQuestions: string[];
+  onAnswerAllSuggestions: () => void;
+  batchAnswers: BatchAnswer[];
   fileInputRef: React.MutableRefObject<HTMLInputElement>;
 }
 
@@ -47,6 +49,8 @@ const Dashboard: React.FC<DashboardProps> = ({
   onQuestionSubmit,
   answer,
   suggestedQuestions,
+  onAnswerAllSuggestions,
+  batchAnswers,
   fileInputRef,
 }) => {
 
@@ -227,9 +231,18 @@ const Dashboard: React.FC<DashboardProps> = ({
           {/* Suggested Questions */}
           {suggestedQuestions.length > 0 && (
             <div className="mt-4">
-              <h3 className="text-sm font-medium text-gray-700 mb-2">
-                Suggested Questions:
-              </h3>
+              <div className="flex items-center justify-between mb-2">
+                <h3 className="text-sm font-medium text-gray-700">
+                  Suggested Questions:
+                </h3>
+                <button
+                  onClick={onAnswerAllSuggestions}
+                  disabled={loading || !selectedFile}
+                  className="text-sm font-medium text-blue-600 hover:text-blue-800 disabled:text-gray-400"
+                >
+                  Answer all
+                </button>
+              </div>
               <div className="flex flex-wrap gap-2">
                 {suggestedQuestions.map((q, index) => (
                   <button
@@ -247,6 +260,18 @@ const Dashboard: React.FC<DashboardProps> = ({
             </div>
           )}
 
+          {/* Answers to all suggested questions */}
+          {batchAnswers.length > 0 && (
+            <div className="mt-6 space-y-4">
+              {batchAnswers.map((item, index) => (
+                <div key={index} className="prose max-w-none">
+                  <h3 className="text-md font-medium text-gray-900">{item.question}</h3>
+                  <p className="text-gray-700">{item.answer}</p>
+                </div>
+              ))}
+            </div>
+          )}
+
           {/* Answer Display */}
           {answer && (
             <div className="mt-6">
@@ -16,9 +16,15 @@ export interface Benefits {
 export interface Source {
   document: string;
   text: string;
+  page?: number;
 }
 
 export interface Answer {
   answer: string;
   sources: (string | Source)[];
-} 
\ No newline at end of file
+}
+
+export interface BatchAnswer extends Answer {
+  question: string;
+  cached?: boolean;
+}